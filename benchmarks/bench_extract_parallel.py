@@ -0,0 +1,90 @@
+"""
+Бенчмарк параллельного извлечения блоков (extract_logic с workers > 1).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_extract_parallel --pages 5000 --blocks 300
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pypdf import PdfWriter, PdfReader
+from pypdf.generic import NameObject, StreamObject
+from core.operations import extract_logic
+
+
+def make_source(path, pages):
+    """Синтетический PDF: на каждой странице свой поток содержимого с текстом и графикой."""
+    writer = PdfWriter()
+    for i in range(pages):
+        page = writer.add_blank_page(width=595, height=842)
+        ops = [f"BT /F1 12 Tf 72 {800 - (j % 60) * 12} Td (Page {i + 1} line {j}) Tj ET" for j in range(80)]
+        ops += [f"{j} {j} 100 50 re S" for j in range(0, 400, 4)]
+        content = StreamObject()
+        content.set_data("\n".join(ops).encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(content)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def make_query(pages, blocks):
+    size = max(1, pages // blocks)
+    query = []
+    for b in range(blocks):
+        start = b * size + 1
+        end = min(pages, start + size - 1)
+        query.append((f"{start}-{end}", f"chapter_{b + 1}", False))
+    return query
+
+
+def run_once(source, query, workers):
+    out_dir = tempfile.mkdtemp(prefix="bench_extract_")
+    try:
+        started = time.perf_counter()
+        with open(source, "rb") as fh:
+            extract_logic(PdfReader(fh), out_dir, query, lambda v: None, workers=workers, source=source)
+        return time.perf_counter() - started
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5000)
+    parser.add_argument("--blocks", type=int, default=300)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_src_")
+    try:
+        source = os.path.join(work_dir, "source.pdf")
+        make_source(source, args.pages)
+        query = make_query(args.pages, args.blocks)
+
+        baseline = run_once(source, query, workers=1)
+        print(f"{args.pages} страниц, {len(query)} блоков, CPU: {os.cpu_count()}")
+        print(f"{'режим':<22}{'время, с':>10}{'ускорение':>12}")
+        print(f"{'последовательный':<22}{baseline:>10.2f}{1.0:>11.2f}x")
+        for workers in args.workers:
+            # workers=1 в extract_logic означает последовательный путь, поэтому пул
+            # из одного процесса запускается напрямую, чтобы оценить накладные расходы
+            if workers == 1:
+                from core.operations import _plan_extraction
+                from core.parallel import extract_blocks_parallel
+                out_dir = tempfile.mkdtemp(prefix="bench_extract_")
+                started = time.perf_counter()
+                with open(source, "rb") as fh:
+                    plan = _plan_extraction(out_dir, query, len(PdfReader(fh).pages))
+                extract_blocks_parallel(source, plan, 1, lambda v: None)
+                elapsed = time.perf_counter() - started
+                shutil.rmtree(out_dir, ignore_errors=True)
+            else:
+                elapsed = run_once(source, query, workers)
+            print(f"{f'пул, {workers} проц.':<22}{elapsed:>10.2f}{baseline / elapsed:>11.2f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Бенчмарк пиковой памяти склейки: обычный merge_logic против потокового (streaming=True).
+
+Каждый режим запускается в отдельном процессе, пиковый RSS берется из getrusage.
+Запуск из корня проекта (только Linux/macOS — нужен модуль resource):
+    python -m benchmarks.bench_merge_memory --files 200 --pages 5 --stream-kb 256
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pypdf import PdfWriter
+from pypdf.generic import NameObject, StreamObject
+
+
+def make_inputs(directory, files, pages, stream_kb):
+    """Входные файлы со страницами, несущими несжимаемый поток (имитация скана)."""
+    paths = []
+    for n in range(files):
+        writer = PdfWriter()
+        for _ in range(pages):
+            page = writer.add_blank_page(width=595, height=842)
+            content = StreamObject()
+            content.set_data(b"% scan\n" + os.urandom(stream_kb * 1024))
+            page[NameObject("/Contents")] = writer._add_object(content)
+        path = os.path.join(directory, f"scan_{n:05d}.pdf")
+        with open(path, "wb") as f:
+            writer.write(f)
+        paths.append(path)
+    return paths
+
+
+def child(mode, inputs_dir, out_dir):
+    from core.operations import merge_logic
+    files = sorted(os.path.join(inputs_dir, f) for f in os.listdir(inputs_dir))
+    started = time.perf_counter()
+    merge_logic(files, os.path.join(out_dir, f"{mode}.pdf"), lambda v: None, streaming=(mode == "streaming"))
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    print(json.dumps({"mode": mode, "seconds": elapsed, "peak_rss_mb": peak_kb / 1024}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--stream-kb", type=int, default=256)
+    parser.add_argument("--child", choices=["regular", "streaming"], help=argparse.SUPPRESS)
+    parser.add_argument("--inputs", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.inputs, args.out)
+
+    work_dir = tempfile.mkdtemp(prefix="bench_merge_")
+    try:
+        inputs_dir = os.path.join(work_dir, "in")
+        out_dir = os.path.join(work_dir, "out")
+        os.makedirs(inputs_dir)
+        os.makedirs(out_dir)
+        make_inputs(inputs_dir, args.files, args.pages, args.stream_kb)
+        total_mb = sum(os.path.getsize(os.path.join(inputs_dir, f)) for f in os.listdir(inputs_dir)) / 2 ** 20
+        print(f"{args.files} файлов x {args.pages} стр., всего {total_mb:.0f} МБ")
+        print(f"{'режим':<12}{'время, с':>10}{'пик RSS, МБ':>14}")
+        for mode in ("regular", "streaming"):
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_merge_memory", "--child", mode,
+                 "--inputs", inputs_dir, "--out", out_dir],
+                capture_output=True, text=True, check=True,
+            )
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{mode:<12}{result['seconds']:>10.2f}{result['peak_rss_mb']:>14.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Бенчмарк отражения страниц: add_transformation (распаковка, правка и повторное сжатие
+каждого потока содержимого) против быстрого пути fast_mirror (матрица в отдельном
+потоке, исходные потоки копируются как есть).
+
+Корпус — документ с крупными сжатыми потоками (имитация векторных чертежей).
+Каждый замер — отдельный процесс Python.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_mirror --pages 200 --stream-kb 256 --runs 3
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.corpus import cached, make_document
+
+_CHILD = r"""
+import json, os, sys, time
+from core.io_handler import get_reader
+from core.operations import rotate_mirror_logic
+source, out_dir, fast = sys.argv[1], sys.argv[2], sys.argv[3] == "1"
+started = time.perf_counter()
+with open(source, "rb") as fh:
+    reader = get_reader(fh)
+    result = rotate_mirror_logic(reader, os.path.join(out_dir, "mirrored.pdf"), f"1-{len(reader.pages)}",
+                                 "mirror", "h", lambda *a: None, fast_mirror=fast)
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "bytes": os.path.getsize(result["outputs"][0])}))
+"""
+
+
+def run_child(source, fast):
+    out_dir = tempfile.mkdtemp(prefix="bench_mirror_")
+    try:
+        proc = subprocess.run([sys.executable, "-c", _CHILD, source, out_dir, "1" if fast else "0"],
+                              capture_output=True, text=True, check=True)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--stream-kb", type=int, default=256, help="размер потока содержимого страницы до сжатия")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--corpus", help="папка для кэша корпуса (по умолчанию временная)")
+    args = parser.parse_args()
+
+    corpus = args.corpus or tempfile.mkdtemp(prefix="bench_corpus_")
+    os.makedirs(corpus, exist_ok=True)
+    try:
+        source = cached(corpus, f"drawing_{args.pages}_{args.stream_kb}.pdf",
+                        lambda path: make_document(path, args.pages, stream_kb=args.stream_kb, compress=True))
+        medians = {}
+        print(f"{'путь':<22}{'время, с':>10}{'размер, МБ':>13}")
+        for fast in (False, True):
+            runs = [run_child(source, fast) for _ in range(args.runs)]
+            medians[fast] = statistics.median(r["seconds"] for r in runs)
+            name = "fast_mirror" if fast else "add_transformation"
+            print(f"{name:<22}{medians[fast]:>10.3f}{runs[-1]['bytes'] / 2 ** 20:>13.2f}")
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+    if medians[True]:
+        print(f"Ускорение: x{medians[False] / medians[True]:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Бенчмарк холодного запуска интерфейса: ленивый режим (LAZY_STARTUP) против полной сборки.
+
+Каждый замер — отдельный процесс Python, поэтому кэш модулей не влияет на результат.
+Замеряются:
+  * import — время импорта ui.tkinter_gui и загружен ли при этом pypdf;
+  * startup — от начала процесса до показа окна (PdfProApp создан, очередь событий Tk
+    обработана). Нужен дисплей; без него замер пропускается.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup --runs 5 --target-ms 800
+
+Код завершения 1, если медиана запуска в ленивом режиме превышает --target-ms.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+DEFAULT_TARGET_MS = 800
+
+_CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import ui.tkinter_gui as gui
+imported = time.perf_counter()
+result = {"import_ms": (imported - started) * 1000, "pypdf_loaded": "pypdf" in sys.modules}
+try:
+    from tkinterdnd2 import TkinterDnD
+    root = TkinterDnD.Tk()
+except Exception as e:
+    result["startup_ms"] = None
+    result["error"] = type(e).__name__
+else:
+    app = gui.PdfProApp(root, lazy={lazy})
+    root.update()
+    result["startup_ms"] = (time.perf_counter() - started) * 1000
+    result["pypdf_loaded_after_show"] = "pypdf" in sys.modules
+    root.destroy()
+print(json.dumps(result))
+"""
+
+
+def run_child(lazy):
+    proc = subprocess.run([sys.executable, "-c", _CHILD.replace("{lazy}", repr(lazy))],
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def _fmt(value):
+    return "—" if value is None else f"{value:.0f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS)
+    args = parser.parse_args()
+
+    medians = {}
+    print(f"{'режим':<10}{'импорт, мс':>12}{'запуск, мс':>12}  pypdf при старте")
+    for lazy in (True, False):
+        runs = [run_child(lazy) for _ in range(args.runs)]
+        mode = "ленивый" if lazy else "полный"
+        import_ms = _median(r["import_ms"] for r in runs)
+        startup_ms = _median(r["startup_ms"] for r in runs)
+        loaded = runs[-1].get("pypdf_loaded_after_show", runs[-1]["pypdf_loaded"])
+        medians[lazy] = startup_ms
+        print(f"{mode:<10}{_fmt(import_ms):>12}{_fmt(startup_ms):>12}  {'да' if loaded else 'нет'}")
+        if startup_ms is None:
+            print(f"  окно не создано ({runs[-1].get('error')}): нет дисплея?")
+
+    if medians[True] is not None and medians[True] > args.target_ms:
+        print(f"Запуск {medians[True]:.0f} мс превышает цель {args.target_ms:.0f} мс")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
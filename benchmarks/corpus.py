@@ -0,0 +1,97 @@
+"""
+Генератор синтетического корпуса PDF для бенчмарков.
+
+Документы повторяют то, что встречается на практике: общий для всех страниц встроенный
+шрифт и логотип (изображение), собственный поток содержимого на каждой странице
+(при необходимости крупный — имитация векторных чертежей) и наборы из многих мелких файлов.
+Содержимое детерминировано (seed), поэтому корпус можно кэшировать между запусками.
+"""
+import os
+import random
+from pypdf import PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, NumberObject, StreamObject
+
+FONT_KB = 40
+IMAGE_SIDE = 256  # изображение IMAGE_SIDE x IMAGE_SIDE, 8 бит, оттенки серого
+
+
+def _shared_resources(writer, rnd):
+    """Встроенный шрифт и изображение, на которые ссылаются все страницы документа."""
+    font_file = StreamObject()
+    font_file.set_data(rnd.randbytes(FONT_KB * 1024))
+    descriptor = DictionaryObject({
+        NameObject("/Type"): NameObject("/FontDescriptor"),
+        NameObject("/FontName"): NameObject("/BenchSans"),
+        NameObject("/FontFile2"): writer._add_object(font_file),
+    })
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/TrueType"),
+        NameObject("/BaseFont"): NameObject("/BenchSans"),
+        NameObject("/FontDescriptor"): writer._add_object(descriptor),
+    })
+    image = StreamObject()
+    image.set_data(rnd.randbytes(IMAGE_SIDE * IMAGE_SIDE))
+    image.update({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Image"),
+        NameObject("/Width"): NumberObject(IMAGE_SIDE),
+        NameObject("/Height"): NumberObject(IMAGE_SIDE),
+        NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+        NameObject("/BitsPerComponent"): NumberObject(8),
+    })
+    return DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)}),
+        NameObject("/XObject"): DictionaryObject({NameObject("/Im1"): writer._add_object(image)}),
+    })
+
+
+def _page_content(number, stream_kb):
+    ops = [f"BT /F1 12 Tf 72 {800 - (j % 60) * 12} Td (Page {number} line {j}) Tj ET" for j in range(40)]
+    ops.append("q 64 0 0 64 500 760 cm /Im1 Do Q")
+    data = "\n".join(ops).encode("latin-1")
+    if stream_kb:
+        # Добиваем поток векторной графикой до нужного размера
+        line = b"10 10 m 200 300 l 400 100 l h S\n"
+        data += line * max(0, (stream_kb * 1024 - len(data)) // len(line))
+    return data
+
+
+def make_document(path, pages, stream_kb=0, seed=0, compress=False):
+    """PDF из pages страниц с общими шрифтом и изображением (compress — потоки страниц в FlateDecode)."""
+    rnd = random.Random(seed)
+    writer = PdfWriter()
+    resources = writer._add_object(_shared_resources(writer, rnd))
+    for i in range(pages):
+        page = writer.add_blank_page(width=595, height=842)
+        content = StreamObject()
+        content.set_data(_page_content(i + 1, stream_kb))
+        if compress:
+            content = content.flate_encode()
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = resources
+    with open(path, "wb") as f:
+        writer.write(f)
+    return path
+
+
+def make_small_files(directory, total_pages, pages_per_file=10, seed=0):
+    """Набор мелких файлов (как счета из одного шаблона), в сумме total_pages страниц."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n, start in enumerate(range(0, total_pages, pages_per_file)):
+        path = os.path.join(directory, f"small_{n:06d}.pdf")
+        # Одинаковый seed — одинаковые шрифт и логотип во всех файлах набора
+        make_document(path, min(pages_per_file, total_pages - start), seed=seed)
+        paths.append(path)
+    return paths
+
+
+def cached(corpus_dir, name, factory):
+    """Путь к элементу корпуса; factory(path) вызывается, только если его еще нет."""
+    path = os.path.join(corpus_dir, name)
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        factory(tmp)
+        os.replace(tmp, path)
+    return path
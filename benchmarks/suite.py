@@ -0,0 +1,224 @@
+"""
+Набор бенчмарков для отслеживания регрессий.
+
+Замеряет extract_logic и editor_logic (с копированием через pypdf и байтами исходного
+файла, raw_copy), merge_logic (обычная, потоковая и параллельная склейка),
+rotate_mirror_logic и parse_to_blocks на синтетическом корпусе (см. benchmarks/corpus.py)
+для документов от 10 до 100 000 страниц. Каждый замер выполняется в отдельном процессе,
+поэтому пиковая память (ru_maxrss) относится только к нему. Результат пишется в JSON
+и сравнивается с сохраненной базовой линией.
+
+Запуск из корня проекта:
+    python -m benchmarks.suite --sizes 10 1000 10000 --save-baseline
+    python -m benchmarks.suite --sizes 10 1000 10000              # сравнение с базовой линией
+    python -m benchmarks.suite --sizes 100000 --cases parse extract --corpus ~/.cache/pdf_bench
+
+Код завершения 1, если хотя бы один замер медленнее или тяжелее базовой линии больше,
+чем на --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import cached, make_document, make_small_files
+
+CASES = ("parse", "extract", "extract_raw", "merge", "merge_streaming", "merge_parallel", "editor", "editor_raw", "rotate")
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.25
+# Разница меньше этих порогов считается шумом, даже если в процентах она велика
+MIN_DELTA = {"seconds": 0.05, "peak_rss_mb": 5.0}
+
+# Сколько раз повторяется разбор запроса: одиночный вызов на малых документах слишком быстрый
+PARSE_REPEATS = 20
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows: пиковая память не измеряется
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak / 1024
+
+
+def _document(corpus, size):
+    return cached(corpus, f"doc_{size}.pdf", lambda path: make_document(path, size))
+
+
+def _small_files(corpus, size):
+    directory = cached(corpus, f"small_{size}", lambda path: make_small_files(path, size))
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory))
+
+
+def _parse_queries(size):
+    """
+    Запрос из тысячи отдельных страниц и пары широких диапазонов
+    и запрос на исключение (каждая вторая страница из выборки).
+    """
+    step = max(1, size // 1000)
+    singles = [str(p) for p in range(1, size + 1, step)]
+    return ", ".join(singles + [f"{size}-1", f"1-{size}"]), ", ".join(singles[1::2] or ["1"])
+
+
+def prepare(case, size, corpus):
+    """Генерирует входные данные заранее, чтобы в замер не попала генерация корпуса."""
+    if case.startswith("merge"):
+        _small_files(corpus, size)
+    elif case != "parse":
+        _document(corpus, size)
+
+
+def run_case(case, size, corpus, out_dir):
+    """Выполняет один замер в текущем процессе. Возвращает время в секундах."""
+    from core.io_handler import get_reader
+    from core.operations import editor_logic, extract_logic, merge_logic, rotate_mirror_logic
+    from utils.parser import parse_to_blocks
+
+    noop = lambda *args: None
+    if case == "parse":
+        query, exclude_query = _parse_queries(size)
+        started = time.perf_counter()
+        for _ in range(PARSE_REPEATS):
+            parse_to_blocks(query, size)
+            parse_to_blocks(exclude_query, size, exclude_mode=True)
+        return time.perf_counter() - started
+
+    if case.startswith("merge"):
+        files = _small_files(corpus, size)
+        workers = max(2, os.cpu_count() or 1) if case == "merge_parallel" else 1
+        started = time.perf_counter()
+        merge_logic(files, os.path.join(out_dir, "merged.pdf"), noop, streaming=(case == "merge_streaming"),
+                    workers=workers)
+        return time.perf_counter() - started
+
+    source = _document(corpus, size)
+    started = time.perf_counter()
+    with open(source, "rb") as fh:
+        reader = get_reader(fh)
+        raw_copy = case.endswith("_raw")
+        if case in ("extract", "extract_raw"):
+            # Десять блоков по 10% документа
+            chunk = max(1, size // 10)
+            query = [(f"{s}-{min(size, s + chunk - 1)}", f"part_{s}", False) for s in range(1, size + 1, chunk)]
+            extract_logic(reader, out_dir, query, noop, raw_copy=raw_copy)
+        elif case in ("editor", "editor_raw"):
+            # Первая половина в обратном порядке, остаток дописывается автоматически
+            editor_logic(reader, os.path.join(out_dir, "edited.pdf"), f"{max(1, size // 2)}-1", noop,
+                         raw_copy=raw_copy)
+        elif case == "rotate":
+            rotate_mirror_logic(reader, os.path.join(out_dir, "rotated.pdf"), f"1-{size}", "rotate", "90", noop)
+    return time.perf_counter() - started
+
+
+def child(case, size, corpus):
+    out_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        seconds = run_case(case, size, corpus, out_dir)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    print(json.dumps({"seconds": seconds, "peak_rss_mb": _peak_rss_mb()}))
+
+
+def measure(case, size, corpus):
+    prepare(case, size, corpus)
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.suite", "--child", case, "--child-size", str(size), "--corpus", corpus],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{case}@{size}: {proc.stderr.strip().splitlines()[-1:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Список регрессий: (ключ, метрика, базовое значение, текущее значение)."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for metric in ("seconds", "peak_rss_mb"):
+            old, new = base.get(metric), current.get(metric)
+            if old and new is not None and new > old * (1 + tolerance) and new - old > MIN_DELTA[metric]:
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+def _load_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--corpus", help="папка для кэша корпуса (по умолчанию временная)")
+    parser.add_argument("--out", default="bench_results.json", help="куда записать результаты")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как базовую линию")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--child", choices=CASES, help=argparse.SUPPRESS)
+    parser.add_argument("--child-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.child_size, args.corpus)
+
+    corpus = args.corpus or tempfile.mkdtemp(prefix="bench_corpus_")
+    os.makedirs(corpus, exist_ok=True)
+    results = {}
+    try:
+        print(f"{'замер':<28}{'время, с':>10}{'пик RSS, МБ':>14}")
+        for size in args.sizes:
+            for case in args.cases:
+                key = f"{case}@{size}"
+                results[key] = measure(case, size, corpus)
+                rss = results[key]["peak_rss_mb"]
+                print(f"{key:<28}{results[key]['seconds']:>10.3f}{'—' if rss is None else f'{rss:.1f}':>14}")
+    finally:
+        if not args.corpus:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "cpu_count": os.cpu_count(), "results": results}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты: {args.out}")
+
+    if args.save_baseline:
+        stored = _load_json(args.baseline) or {"results": {}}
+        stored.update({k: v for k, v in report.items() if k != "results"})
+        stored["results"].update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, ensure_ascii=False, indent=2)
+        print(f"Базовая линия обновлена: {args.baseline}")
+        return 0
+
+    baseline = _load_json(args.baseline)
+    if baseline is None:
+        print("Базовая линия не найдена, сравнение пропущено (см. --save-baseline)")
+        return 0
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for key, metric, old, new in regressions:
+        print(f"РЕГРЕССИЯ {key} {metric}: {old:.3f} -> {new:.3f} (+{(new / old - 1) * 100:.0f}%)")
+    if not regressions:
+        print(f"Регрессий нет (допуск {args.tolerance:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
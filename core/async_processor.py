@@ -0,0 +1,165 @@
+"""
+Асинхронный API поверх операций ядра для встраивания в сервисы на asyncio.
+
+    processor = AsyncPdfProcessor(max_concurrency=4)
+    progress = ProgressStream()
+    task = asyncio.create_task(processor.merge(files, "out/merged.pdf", progress=progress))
+    async for snap in progress:
+        print(snap.done, snap.rate)
+    result = await task
+
+Работа выполняется в исполнителе (по умолчанию — пул потоков на max_concurrency заданий),
+цикл событий не блокируется. Одновременно выполняется не больше max_concurrency заданий,
+остальные вызовы ждут своей очереди (обратное давление); max_pending ограничивает число
+ожидающих — сверх него вызов сразу завершается QueueFullError.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from core.jobs import run_job
+from core.progress import ProgressReporter
+from core.task_manager import CancellationToken, QueueFullError
+
+
+class ProgressStream:
+    """
+    Асинхронный итератор срезов прогресса (ProgressSnapshot) одного задания.
+    Хранится только последний срез: медленный потребитель пропускает промежуточные,
+    а не копит их в памяти. Итерация заканчивается вместе с заданием.
+    """
+    def __init__(self):
+        self._latest = None
+        self._closed = False
+        self._changed = asyncio.Event()
+
+    def _put(self, snapshot):
+        self._latest = snapshot
+        self._changed.set()
+
+    def _close(self):
+        self._closed = True
+        self._changed.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while self._latest is None:
+            if self._closed:
+                raise StopAsyncIteration
+            self._changed.clear()
+            await self._changed.wait()
+        snapshot, self._latest = self._latest, None
+        return snapshot
+
+
+class AsyncPdfProcessor:
+    """
+    Корутины extract, split, merge, edit, reverse и transform возвращают статистику
+    операции ({"pages": ..., "outputs": [...]}) так же, как core.jobs.run_job.
+    executor — свой исполнитель (например, ProcessPoolExecutor для обхода GIL);
+    в пуле процессов прогресс и кооперативная отмена во время работы недоступны.
+    """
+    def __init__(self, max_concurrency=4, max_pending=0, executor=None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency должен быть не меньше 1")
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_concurrency,
+                                                       thread_name_prefix="pdf-async")
+        self._slots = None
+        self._pending = 0
+
+    def _semaphore(self):
+        # Семафор создается в работающем цикле событий
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._slots
+
+    @property
+    def pending(self):
+        """Число вызовов, ожидающих свободного слота."""
+        return self._pending
+
+    async def run(self, job, progress=None, total=None):
+        """
+        Выполняет задание в формате core.jobs (словарь с ключом "op").
+        Отмена ожидающей корутины (task.cancel()) прерывает и саму операцию.
+        """
+        slots = self._semaphore()
+        if self.max_pending and slots.locked() and self._pending >= self.max_pending:
+            raise QueueFullError("Очередь заданий заполнена")
+        self._pending += 1
+        try:
+            await slots.acquire()
+        finally:
+            self._pending -= 1
+        try:
+            return await self._execute(job, progress, total)
+        finally:
+            slots.release()
+            if progress is not None:
+                progress._close()
+
+    async def _execute(self, job, progress, total):
+        loop = asyncio.get_running_loop()
+        if isinstance(self.executor, ProcessPoolExecutor):
+            return await loop.run_in_executor(self.executor, run_job, job)
+
+        token = CancellationToken()
+        reporter = None
+        if progress is not None:
+            reporter = ProgressReporter(lambda snap: loop.call_soon_threadsafe(progress._put, snap),
+                                        total=total, unit="")
+        future = loop.run_in_executor(self.executor, run_job, job, reporter, token)
+        try:
+            result = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Операция в потоке останавливается на ближайшей проверке токена; слот
+            # освобождается только после ее остановки
+            token.cancel()
+            try:
+                await future
+            except Exception:
+                pass
+            raise
+        if reporter is not None:
+            # Последний срез мог быть отброшен ограничением частоты
+            reporter.finish()
+        return result
+
+    async def extract(self, src, dest, blocks, progress=None, **options):
+        """blocks — список (страницы, имя[, исключить])."""
+        job = dict(options, op="extract", src=src, dest=dest, blocks=[list(b) for b in blocks])
+        return await self.run(job, progress, total=len(blocks))
+
+    async def split(self, src, dest, every=None, max_mb=None, progress=None, **options):
+        job = dict(options, op="split", src=src, dest=dest, every=every, max_mb=max_mb)
+        return await self.run(job, progress)
+
+    async def merge(self, files, out, progress=None, **options):
+        job = dict(options, op="merge", files=list(files), out=out)
+        return await self.run(job, progress, total=len(job["files"]))
+
+    async def edit(self, src, out, pages, progress=None, **options):
+        job = dict(options, op="edit", src=src, out=out, pages=pages)
+        return await self.run(job, progress)
+
+    async def reverse(self, src, out, progress=None, **options):
+        job = dict(options, op="reverse", src=src, out=out)
+        return await self.run(job, progress)
+
+    async def transform(self, src, out, pages, action, value, progress=None, **options):
+        job = dict(options, op="transform", src=src, out=out, pages=pages, action=action, value=value)
+        return await self.run(job, progress)
+
+    def shutdown(self, wait=True):
+        """Останавливает собственный исполнитель (переданный снаружи не трогается)."""
+        if self._own_executor:
+            self.executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await asyncio.get_running_loop().run_in_executor(None, self.shutdown)
@@ -0,0 +1,172 @@
+"""
+Консольный (headless) режим пакетной обработки без графического интерфейса.
+
+Запуск:
+    python -m core.cli run jobs.jsonl --workers 8
+
+Манифест — файл JSON Lines, по одному заданию в строке, например:
+    {"op": "extract", "src": "in.pdf", "dest": "out/", "blocks": [["1-3", "Глава_1", false]]}
+    {"op": "split", "src": "scan.pdf", "dest": "out/", "every": 10}
+    {"op": "split", "src": "scan.pdf", "dest": "out/", "max_mb": 20}
+    {"op": "merge", "files": ["a.pdf", "b.pdf"], "out": "out/merged.pdf"}
+    {"op": "edit", "src": "in.pdf", "out": "out/edited.pdf", "pages": "5, 1-3"}
+    {"op": "reverse", "src": "in.pdf", "out": "out/reversed.pdf"}
+    {"op": "transform", "src": "in.pdf", "out": "out/rot.pdf", "pages": "1-2", "action": "rotate", "value": "90"}
+
+Пустые строки и строки, начинающиеся с '#', пропускаются.
+
+HTTP-сервис с теми же заданиями (см. core.server):
+    python -m core.cli serve --port 8765 --workers 4 --max-queue 64
+
+Наблюдение за горячими папками по файлу правил (см. core.watcher):
+    python -m core.cli watch rules.json --workers 2 --state watch_state.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from core.jobs import run_job_safe
+from utils.constants import (
+    SERVER_HOST, SERVER_MAX_QUEUE, SERVER_PORT, SERVER_WORKERS, WATCH_DEBOUNCE_SECONDS,
+)
+
+# Сколько заданий держим в очереди пула на один процесс (ограничивает память на больших манифестах)
+INFLIGHT_PER_WORKER = 4
+
+
+def read_manifest(path):
+    """Читает манифест JSON Lines и возвращает список заданий."""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Строка {line_no}: некорректный JSON ({e.msg})")
+            if not isinstance(job, dict):
+                raise ValueError(f"Строка {line_no}: задание должно быть объектом JSON")
+            jobs.append(job)
+    return jobs
+
+
+def iter_results(jobs, workers):
+    """Выполняет задания и отдает результаты по мере готовности (порядок не гарантируется)."""
+    if workers <= 1:
+        for i, job in enumerate(jobs):
+            yield run_job_safe(i, job)
+        return
+
+    pending = set()
+    job_iter = iter(enumerate(jobs))
+    limit = workers * INFLIGHT_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            for i, job in job_iter:
+                pending.add(pool.submit(run_job_safe, i, job))
+                if len(pending) >= limit:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                yield fut.result()
+
+
+def run_manifest(path, workers, out=None, err=None):
+    """Выполняет все задания манифеста. Возвращает код завершения процесса."""
+    out = out or sys.stdout
+    err = err or sys.stderr
+    jobs = read_manifest(path)
+    started = time.perf_counter()
+    ok = failed = pages = 0
+
+    for result in iter_results(jobs, workers):
+        if result["status"] == "ok":
+            ok += 1
+            pages += result["pages"]
+        else:
+            failed += 1
+        out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        out.flush()
+
+    elapsed = time.perf_counter() - started
+    summary = {
+        "jobs": len(jobs),
+        "ok": ok,
+        "failed": failed,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "jobs_per_sec": round(len(jobs) / elapsed, 2) if elapsed > 0 else 0.0,
+        "pages_per_sec": round(pages / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    err.write(f"Итог: {json.dumps(summary, ensure_ascii=False)}\n")
+    return 0 if failed == 0 else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m core.cli", description="PDF Master Pro: пакетная обработка без GUI")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="выполнить задания из манифеста JSON Lines")
+    run.add_argument("manifest", help="путь к файлу манифеста (.jsonl)")
+    run.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                     help="число процессов-исполнителей (1 — выполнять в текущем процессе)")
+
+    serve = sub.add_parser("serve", help="HTTP-сервис заданий с очередью и /metrics")
+    serve.add_argument("--host", default=SERVER_HOST)
+    serve.add_argument("--port", type=int, default=SERVER_PORT)
+    serve.add_argument("-w", "--workers", type=int, default=SERVER_WORKERS,
+                       help="сколько заданий выполняется одновременно")
+    serve.add_argument("--max-queue", type=int, default=SERVER_MAX_QUEUE,
+                       help="сколько заданий может ждать в очереди (сверх — ответ 429)")
+    serve.add_argument("--work-dir", default=None,
+                       help="папка для загрузок и результатов (по умолчанию — временная)")
+
+    watch = sub.add_parser("watch", help="обрабатывать новые файлы в папках по правилам")
+    watch.add_argument("rules", help="путь к файлу правил (.json)")
+    watch.add_argument("-w", "--workers", type=int, default=1, help="сколько файлов обрабатывается одновременно")
+    watch.add_argument("--state", default="watch_state.json",
+                       help="файл с хешами обработанных файлов (чтобы не повторять работу после перезапуска)")
+    watch.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE_SECONDS,
+                       help="сколько секунд файл не должен меняться, чтобы считаться дописанным")
+    watch.add_argument("--poll", action="store_true", help="опрашивать папки вместо inotify")
+    return parser
+
+
+def watch_folders(args, out=None):
+    """Запускает наблюдение; результат каждого задания печатается строкой JSON."""
+    from core.watcher import FolderWatcher, load_rules
+    out = out or sys.stdout
+
+    def report(info):
+        out.write(json.dumps(info, ensure_ascii=False) + "\n")
+        out.flush()
+
+    watcher = FolderWatcher(load_rules(args.rules), state_path=args.state, workers=max(1, args.workers),
+                            debounce=args.debounce, poll=args.poll, on_result=report)
+    watcher.run()
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "serve":
+        # Импорт здесь: пакетному режиму http.server не нужен
+        from core.server import serve
+        return serve(args.host, args.port, max(1, args.workers), max(0, args.max_queue), args.work_dir)
+    try:
+        if args.command == "watch":
+            return watch_folders(args)
+        return run_manifest(args.manifest, max(1, args.workers))
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"Ошибка: {e}\n")
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
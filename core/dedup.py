@@ -0,0 +1,154 @@
+import hashlib
+import io
+import time
+from collections import namedtuple
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+
+# Результат дедупликации: удалено объектов, сэкономлено байт (оценка по сериализации), время хеширования
+DedupStats = namedtuple("DedupStats", "objects_removed bytes_saved hash_seconds")
+
+# Объекты структуры документа: у каждой страницы и каталога своя идентичность, их не объединяем
+_KEEP_TYPES = ("/Page", "/Pages", "/Catalog")
+
+# Предел проходов: за каждый проход схлопывается еще один уровень вложенных ссылок
+MAX_PASSES = 8
+
+
+def _is_mergeable(obj):
+    if not isinstance(obj, DictionaryObject):
+        return True
+    if obj.get("/Type") in _KEEP_TYPES:
+        return False
+    # Аннотации и поля форм (есть /Rect) по спецификации принадлежат одной странице
+    return "/Rect" not in obj
+
+
+def _resolve(canon, num):
+    """Номер представителя с учетом цепочек (дубликат дубликата)."""
+    while num in canon:
+        num = canon[num]
+    return num
+
+
+def feed_canonical(h, obj, ref_token, skip=()):
+    """
+    Каноническая сериализация объекта в хеш h — общее определение одинакового содержимого
+    для дедупликации объектов и отпечатков страниц (core.page_index).
+    Ключи словарей сортируются, данные потоков берутся в том виде, как лежат в файле
+    (без распаковки), /Length потока не учитывается. Ссылка заменяется байтами ref_token(ref),
+    ключи skip пропускаются.
+    """
+    if isinstance(obj, IndirectObject):
+        h.update(ref_token(obj))
+    elif isinstance(obj, StreamObject):
+        h.update(b"S<<")
+        for k in sorted(DictionaryObject.keys(obj)):
+            if k != "/Length" and k not in skip:
+                h.update(k.encode("utf-8", "surrogateescape"))
+                feed_canonical(h, obj.raw_get(k), ref_token, skip)
+        data = obj._data or b""
+        h.update(b">>%d:" % len(data))
+        h.update(data)
+    elif isinstance(obj, DictionaryObject):
+        h.update(b"<<")
+        for k in sorted(DictionaryObject.keys(obj)):
+            if k not in skip:
+                h.update(k.encode("utf-8", "surrogateescape"))
+                feed_canonical(h, obj.raw_get(k), ref_token, skip)
+        h.update(b">>")
+    elif isinstance(obj, ArrayObject):
+        h.update(b"[")
+        for v in obj:
+            feed_canonical(h, v, ref_token, skip)
+        h.update(b"]")
+    else:
+        h.update(type(obj).__name__.encode())
+        h.update(repr(obj).encode("utf-8", "surrogateescape"))
+        h.update(b";")
+
+
+def _digest(obj, canon):
+    """Хеш объекта; ссылки заменены номерами представителей."""
+    h = hashlib.sha256()
+    feed_canonical(h, obj, lambda ref: b"R%d;" % _resolve(canon, ref.idnum))
+    return h.digest()
+
+
+def _rewrite(obj, canon):
+    """Заменяет на месте ссылки на дубликаты ссылками на представителей."""
+    if isinstance(obj, DictionaryObject):
+        items = obj.items()
+    elif isinstance(obj, ArrayObject):
+        items = enumerate(obj)
+    else:
+        return
+    for k, v in list(items):
+        if isinstance(v, IndirectObject):
+            if v.idnum in canon:
+                obj[k] = IndirectObject(_resolve(canon, v.idnum), 0, v.pdf)
+        else:
+            _rewrite(v, canon)
+
+
+def _serialized_size(obj):
+    buf = io.BytesIO()
+    obj.write_to_stream(buf)
+    return buf.tell()
+
+
+def _protected_numbers(writer):
+    """Номера объектов, на которые ссылается трейлер (каталог, /Info, /Encrypt)."""
+    nums = set()
+    for obj in (writer._root_object, getattr(writer, "_info", None)):
+        ref = getattr(obj, "indirect_reference", None)
+        if ref is not None:
+            nums.add(ref.idnum)
+    return nums
+
+
+def deduplicate_objects(writer, max_passes=MAX_PASSES):
+    """
+    Схлопывает одинаковые косвенные объекты PdfWriter перед записью.
+    Одинаковыми считаются объекты с совпадающим содержимым (байты потока + словарь),
+    причем ссылки сравниваются по уже объединенным номерам: два шрифта, ссылающиеся
+    на разные, но одинаковые файлы шрифта, объединяются на следующем проходе.
+    Дубликаты удаляются из writer (в xref становятся свободными записями).
+    """
+    if getattr(writer, "_encryption", None) is not None:
+        return DedupStats(0, 0, 0.0)
+
+    objects = writer._objects
+    protected = _protected_numbers(writer)
+    candidates = [
+        i + 1 for i, obj in enumerate(objects)
+        if obj is not None and i + 1 not in protected and _is_mergeable(obj)
+    ]
+    canon = {}  # номер дубликата -> номер представителя
+    hash_seconds = 0.0
+    for _ in range(max_passes):
+        started = time.perf_counter()
+        seen = {}
+        merged = 0
+        for num in candidates:
+            if num in canon:
+                continue
+            key = _digest(objects[num - 1], canon)
+            first = seen.setdefault(key, num)
+            if first != num:
+                canon[num] = first
+                merged += 1
+        hash_seconds += time.perf_counter() - started
+        if not merged:
+            break
+
+    if not canon:
+        return DedupStats(0, 0, hash_seconds)
+
+    bytes_saved = 0
+    for num in canon:
+        bytes_saved += _serialized_size(objects[num - 1])
+        objects[num - 1] = None
+    for obj in objects:
+        if obj is not None:
+            _rewrite(obj, canon)
+    return DedupStats(len(canon), bytes_saved, hash_seconds)
@@ -0,0 +1,230 @@
+import os
+import time
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+from core.io_handler import WriteStats, atomic_output
+from core.page_transform import mirror_matrix, wrap_contents
+from core.streaming import _CountingStream
+from core.task_manager import check_cancelled
+from core.tracing import span
+
+# Сколько байт с конца файла просматривается в поиске startxref
+_TAIL_BYTES = 4096
+# Ключи трейлера, которые переносятся в секцию обновления
+_TRAILER_KEYS = ("/Root", "/Info", "/ID")
+# Размер блока при копировании исходного файла
+COPY_CHUNK = 8 * 1024 * 1024
+
+
+def copy_source(f_src, f_out, cancel_token=None):
+    """
+    Копирует файл f_src в начало f_out средствами ядра (os.copy_file_range): данные не проходят
+    через процесс, а на файловых системах с reflink (btrfs, XFS) блоки вообще не копируются.
+    Если вызов недоступен (другая ОС, разные файловые системы), копирует через буфер.
+    """
+    f_out.flush()
+    size = os.fstat(f_src.fileno()).st_size
+    copied = 0
+    copy_range = getattr(os, "copy_file_range", None)
+    if copy_range is not None:
+        try:
+            while copied < size:
+                check_cancelled(cancel_token)
+                n = copy_range(f_src.fileno(), f_out.fileno(), min(COPY_CHUNK, size - copied),
+                               copied, copied)
+                if n == 0:
+                    break
+                copied += n
+        except OSError:
+            pass
+    f_src.seek(copied)
+    f_out.seek(copied)
+    while True:
+        check_cancelled(cancel_token)
+        chunk = f_src.read(COPY_CHUNK)
+        if not chunk:
+            break
+        f_out.write(chunk)
+
+
+def find_startxref(path):
+    """Смещение последней таблицы xref исходного файла (из строки startxref) или None."""
+    with open(path, "rb") as fh:
+        fh.seek(0, os.SEEK_END)
+        size = fh.tell()
+        fh.seek(max(0, size - _TAIL_BYTES))
+        tail = fh.read()
+    pos = tail.rfind(b"startxref")
+    if pos < 0:
+        return None
+    digits = tail[pos + len(b"startxref"):].split()
+    try:
+        return int(digits[0])
+    except (IndexError, ValueError):
+        return None
+
+
+def source_path(reader, source=None):
+    """Путь к файлу, из которого прочитан reader, если он известен."""
+    path = source or getattr(getattr(reader, "stream", None), "name", None)
+    return path if isinstance(path, str) and os.path.isfile(path) else None
+
+
+def supports_incremental(reader, source):
+    """Инкрементальное сохранение возможно для незашифрованного файла с известным путем и xref."""
+    return (source is not None and not reader.is_encrypted
+            and "/Size" in reader.trailer and find_startxref(source) is not None)
+
+
+class IncrementalUpdate:
+    """
+    Секция инкрементального обновления: замененные и новые объекты, которые дописываются
+    после неизменных байтов исходного файла вместе со своей таблицей xref и трейлером (/Prev).
+    Номера замененных объектов сохраняются, поэтому ссылки на них в файле остаются верными.
+    """
+    def __init__(self, reader):
+        self.reader = reader
+        self.next_num = int(reader.trailer["/Size"])
+        self.objects = {}  # (номер, поколение) -> объект
+
+    def replace(self, ref, obj):
+        self.objects[(ref.idnum, ref.generation)] = obj
+
+    def add(self, obj):
+        num = self.next_num
+        self.next_num += 1
+        self.objects[(num, 0)] = obj
+        return IndirectObject(num, 0, None)
+
+    def __len__(self):
+        return len(self.objects)
+
+    def _write(self, out, prev_xref):
+        out.write(b"\n")
+        offsets = {}
+        for (num, gen), obj in sorted(self.objects.items()):
+            offsets[num] = (out.pos, gen)
+            out.write(f"{num} {gen} obj\n".encode())
+            obj.write_to_stream(out)
+            out.write(b"\nendobj\n")
+
+        xref_pos = out.pos
+        out.write(b"xref\n")
+        nums = sorted(offsets)
+        start = 0
+        while start < len(nums):
+            # Подсекции из идущих подряд номеров
+            end = start
+            while end + 1 < len(nums) and nums[end + 1] == nums[end] + 1:
+                end += 1
+            out.write(f"{nums[start]} {end - start + 1}\n".encode())
+            for num in nums[start:end + 1]:
+                offset, gen = offsets[num]
+                out.write(f"{offset:010d} {gen:05d} n \n".encode())
+            start = end + 1
+
+        trailer = DictionaryObject()
+        for key in _TRAILER_KEYS:
+            if key in self.reader.trailer:
+                trailer[NameObject(key)] = self.reader.trailer.raw_get(key)
+        trailer[NameObject("/Size")] = NumberObject(max(self.next_num, int(self.reader.trailer["/Size"])))
+        trailer[NameObject("/Prev")] = NumberObject(prev_xref)
+        out.write(b"trailer\n")
+        trailer.write_to_stream(out)
+        out.write(f"\nstartxref\n{xref_pos}\n%%EOF\n".encode())
+
+    def save(self, source, final_path, cancel_token=None):
+        """
+        Копирует исходный файл без разбора (см. copy_source) и дописывает секцию обновления.
+        Разбирается и сериализуется только секция обновления; копия исходных байтов
+        выполняется ядром, без чтения файла в процесс.
+        """
+        started = time.perf_counter()
+        prev_xref = find_startxref(source)
+        with span("incremental_save") as sp, atomic_output(final_path) as f_out:
+            with open(source, "rb") as f_src:
+                copy_source(f_src, f_out, cancel_token)
+                check_cancelled(cancel_token)
+            out = _CountingStream(f_out)
+            out.pos = f_out.tell()
+            base_size = out.pos
+            self._write(out, prev_xref)
+            written = out.pos
+            sp.add(objects=len(self.objects), bytes=written - base_size)
+        return WriteStats(written, time.perf_counter() - started)
+
+
+def rotate_update(reader, target_indices, degrees, cancel_token=None, progress_cb=None):
+    """Обновление с новым /Rotate у страниц target_indices (объекты ридера не меняются)."""
+    degrees = int(degrees)
+    if degrees % 90:
+        # То же ограничение, что у PageObject.rotate в обычном режиме
+        raise ValueError("Rotation angle must be a multiple of 90")
+    update = IncrementalUpdate(reader)
+    for n, idx in enumerate(target_indices, 1):
+        check_cancelled(cancel_token)
+        if progress_cb:
+            progress_cb(n)
+        page = reader.pages[idx]
+        if page.indirect_reference is None:
+            return None
+        copy = DictionaryObject(page)
+        current = int(page.get("/Rotate", 0))
+        copy[NameObject("/Rotate")] = NumberObject((current + degrees) % 360)
+        update.replace(page.indirect_reference, copy)
+    return update
+
+
+def mirror_update(reader, target_indices, direction, cancel_token=None, progress_cb=None):
+    """
+    Обновление с отражением страниц target_indices: на каждую страницу дописываются
+    два маленьких потока (матрица и восстановление состояния) и новый словарь страницы.
+    Исходные потоки содержимого остаются в файле как есть.
+    """
+    update = IncrementalUpdate(reader)
+    for n, idx in enumerate(target_indices, 1):
+        check_cancelled(cancel_token)
+        if progress_cb:
+            progress_cb(n)
+        page = reader.pages[idx]
+        if page.indirect_reference is None:
+            return None
+        contents = wrap_contents(page, mirror_matrix(page, direction), update.add)
+        if contents is None:
+            return None
+        copy = DictionaryObject(page)
+        copy[NameObject("/Contents")] = contents
+        update.replace(page.indirect_reference, copy)
+    return update
+
+
+def reorder_update(reader, order, cancel_token=None, progress_cb=None):
+    """
+    Обновление с новым порядком страниц: корневой узел /Pages получает плоский список /Kids.
+    Страницы, висевшие на промежуточных узлах, переписываются с /Parent на корень
+    (унаследованные атрибуты pypdf уже скопировал в их словари при разборе дерева).
+    Возвращает None, если порядок нельзя выразить без копирования страниц (повторы).
+    """
+    pages_ref = reader.trailer["/Root"].raw_get("/Pages")
+    if not isinstance(pages_ref, IndirectObject) or len(set(order)) != len(order):
+        return None
+    update = IncrementalUpdate(reader)
+    kids = ArrayObject()
+    for n, idx in enumerate(order, 1):
+        check_cancelled(cancel_token)
+        if progress_cb:
+            progress_cb(n)
+        page = reader.pages[idx]
+        ref = page.indirect_reference
+        if ref is None:
+            return None
+        kids.append(IndirectObject(ref.idnum, ref.generation, None))
+        parent = page.raw_get("/Parent") if "/Parent" in page else None
+        if not isinstance(parent, IndirectObject) or parent.idnum != pages_ref.idnum:
+            copy = DictionaryObject(page)
+            copy[NameObject("/Parent")] = IndirectObject(pages_ref.idnum, pages_ref.generation, None)
+            update.replace(ref, copy)
+    root_pages = DictionaryObject(pages_ref.get_object())
+    root_pages[NameObject("/Kids")] = kids
+    root_pages[NameObject("/Count")] = NumberObject(len(kids))
+    update.replace(pages_ref, root_pages)
+    return update
@@ -1,53 +1,272 @@
+import io
+import mmap
 import os
 import re
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 from pypdf import PdfReader
-from utils.constants import ERR_ENCRYPTED
+from core.name_allocator import name_allocator
+from core.tracing import span, enabled as tracing_enabled
+from utils.constants import ERR_ENCRYPTED, SAVE_BUFFER_KB, SAVE_FSYNC
 
-def get_safe_unique_path(directory, filename):
-    """
-    Гарантирует безопасный и уникальный путь к файлу.
-    1. Очищает имя файла от запрещенных символов.
-    2. Добавляет индекс, если файл уже существует[cite: 21, 22].
-    """
-    # 1. Очистка имени (логика из sanitize_filename)
+
+def clean_filename(filename):
+    """Имя файла без запрещенных символов и с расширением .pdf (логика из sanitize_filename)."""
     clean_name = re.sub(r'[\\/*?:"<>|]', "", filename) 
     if not clean_name.strip():
         clean_name = "File_unnamed"
     if not clean_name.lower().endswith(".pdf"):
         clean_name += ".pdf" 
+    return clean_name
+
+
+def get_safe_unique_path(directory, filename, reserved=None):
+    """
+    Гарантирует безопасный и уникальный путь к файлу.
+    1. Очищает имя файла от запрещенных символов.
+    2. Добавляет индекс, если файл уже существует[cite: 21, 22].
+    reserved — пути, уже выданные другим блокам, но еще не записанные на диск.
+    Имя сразу занимается на диске скрытой меткой .<имя>.lock (см. NameAllocator), поэтому
+    параллельные задания не выберут одно и то же имя.
+    """
+    # 1. Очистка имени
+    clean_name = clean_filename(filename)
     
-    # 2. Обеспечение уникальности (логика из get_unique_path)
-    base, ext = os.path.splitext(clean_name) 
-    final_path = os.path.join(directory, clean_name) 
-    counter = 1
-    
-    while os.path.exists(final_path): 
-        final_path = os.path.join(directory, f"{base}_{counter}{ext}") 
-        counter += 1 
-        
-    return final_path
+    # 2. Обеспечение уникальности: индекс папки + резервирование имени
+    with span("unique_path"):
+        return name_allocator.allocate(directory, clean_name, reserved)
 
 
 def get_reader(stream_or_path):
     """Возвращает PdfReader или выбрасывает ValueError, если файл защищен."""
     if not stream_or_path:
         raise ValueError("Путь к файлу не указан")
+    with span("get_reader") as sp:
+        if tracing_enabled():
+            sp.add(bytes=_source_size(stream_or_path))
+        try:
+            reader = PdfReader(stream_or_path, strict=False)
+        except Exception as e:
+            source_name = getattr(stream_or_path, 'name', 'PDF Stream')
+            raise ValueError(f"Ошибка доступа к PDF: {source_name}")
+        if reader.is_encrypted:
+            # Пытаемся открыть с пустым паролем
+            if reader.decrypt("") == 0:
+                raise ValueError(ERR_ENCRYPTED)
+        return reader
+
+
+def _source_size(stream_or_path):
+    """Размер исходного файла для трассировки (0, если его не узнать)."""
+    path = stream_or_path if isinstance(stream_or_path, (str, os.PathLike)) else getattr(stream_or_path, "name", None)
     try:
-        reader = PdfReader(stream_or_path, strict=False)
-    except Exception as e:
-        source_name = getattr(stream_or_path, 'name', 'PDF Stream')
-        raise ValueError(f"Ошибка доступа к PDF: {source_name}")
-    if reader.is_encrypted:
-        # Пытаемся открыть с пустым паролем
-        if reader.decrypt("") == 0:
-            raise ValueError(ERR_ENCRYPTED)
-    return reader
-
-
-def save_pdf(writer, clear_output_path):
-    directory = os.path.dirname(clear_output_path)
-    if directory:   
+        return os.path.getsize(path)
+    except (OSError, TypeError, ValueError):
+        return 0
+
+
+class WriteStats(namedtuple("WriteStats", "bytes_written seconds")):
+    """Статистика записи одного файла."""
+    __slots__ = ()
+
+    @property
+    def bytes_per_sec(self):
+        return self.bytes_written / self.seconds if self.seconds > 0 else 0.0
+
+
+def summarize_writes(stats):
+    """Сводка по нескольким записям для результата операции."""
+    stats = list(stats)
+    total_bytes = sum(int(s.bytes_written) for s in stats)
+    seconds = sum(float(s.seconds) for s in stats)
+    return {"files": len(stats), "bytes": total_bytes, "seconds": seconds,
+            "bytes_per_sec": total_bytes / seconds if seconds > 0 else 0.0}
+
+
+def _open_temp(directory, filename):
+    """
+    Создает временный файл .<имя>.<случайный суффикс>.part в папке directory.
+    Права 0666 урезаются обычным umask процесса, как у файла, созданного через open().
+    Возвращает (дескриптор, путь).
+    """
+    flags = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, "O_BINARY", 0)
+    while True:
+        tmp_path = os.path.join(directory, f".{filename}.{os.urandom(6).hex()}.part")
+        try:
+            return os.open(tmp_path, flags, 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def _fsync_dir(directory):
+    """fsync папки: без него переименование может потеряться при сбое питания."""
+    if os.name != "posix":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_output(final_path, buffer_size=None, fsync=None):
+    """
+    Файл для записи результата: данные пишутся во временный файл в той же папке
+    через большой буфер и переименовываются в final_path только после успешной записи.
+    При ошибке или отмене временный файл удаляется, под итоговым именем ничего не появляется.
+    """
+    buffer_size = SAVE_BUFFER_KB * 1024 if buffer_size is None else buffer_size
+    fsync = SAVE_FSYNC if fsync is None else fsync
+    directory, filename = os.path.split(final_path)
+    if directory:
         os.makedirs(directory, exist_ok=True)
-    with open(clear_output_path, "wb") as f_out:
-        writer.write(f_out)
-    writer.close()
\ No newline at end of file
+    # Собственные изменения папки не сбрасывают индекс имен (см. NameAllocator.changing)
+    with name_allocator.changing(directory or "."):
+        fd, tmp_path = _open_temp(directory or ".", filename)
+    try:
+        with os.fdopen(fd, "wb", buffering=buffer_size) as f_out:
+            yield f_out
+            f_out.flush()
+            if fsync:
+                os.fsync(f_out.fileno())
+        with name_allocator.changing(directory or ".", created=filename):
+            os.replace(tmp_path, final_path)
+        if fsync:
+            _fsync_dir(directory or ".")
+    except BaseException:
+        with name_allocator.changing(directory or "."):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        name_allocator.release(final_path)
+        raise
+    name_allocator.commit(final_path)
+
+
+def save_pdf(writer, clear_output_path, fsync=None):
+    """Атомарно сохраняет writer в clear_output_path. Возвращает WriteStats."""
+    started = time.perf_counter()
+    with span("save_pdf") as sp:
+        try:
+            with atomic_output(clear_output_path, fsync=fsync) as f_out:
+                with span("pdf_write"):
+                    writer.write(f_out)
+                written = f_out.tell()
+        finally:
+            writer.close()
+        sp.add(bytes=written)
+    return WriteStats(written, time.perf_counter() - started)
+
+
+def discard_outputs(paths):
+    """Удаляет частично созданные результаты прерванной операции."""
+    for path in paths:
+        name_allocator.commit(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MappedSource:
+    """
+    Исходный PDF, отображенный в память только для чтения.
+    Чтение идет срезами memoryview без копирования файла; каждый поток (thread)
+    получает собственный open_stream() со своей позицией, поэтому один источник
+    можно читать из нескольких потоков одновременно без блокировок.
+    """
+    def __init__(self, path_or_file):
+        if isinstance(path_or_file, (str, os.PathLike)):
+            self.name = os.fspath(path_or_file)
+            with open(self.name, "rb") as fh:
+                self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.name = getattr(path_or_file, "name", "PDF Stream")
+            self._mmap = mmap.mmap(path_or_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._mmap)
+        self.size = len(self._mmap)
+
+    def pread(self, offset, size):
+        """Позиционное чтение: срез memoryview без копирования и без общего указателя."""
+        return self.view[offset:offset + size]
+
+    def open_stream(self):
+        """Независимый файлоподобный поток поверх общего отображения."""
+        return MappedStream(self)
+
+    def close(self):
+        self.view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class MappedStream(io.RawIOBase):
+    """Файлоподобный поток с собственной позицией поверх MappedSource (для PdfReader)."""
+    def __init__(self, source):
+        super().__init__()
+        self.source = source
+        self.name = source.name
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.source.size + offset
+        else:
+            raise ValueError(f"Некорректный whence: {whence}")
+        if pos < 0:
+            raise ValueError("Отрицательная позиция в потоке")
+        self._pos = pos
+        return pos
+
+    def read(self, size=-1):
+        start = min(self._pos, self.source.size)
+        end = self.source.size if size is None or size < 0 else min(start + size, self.source.size)
+        self._pos = end
+        return bytes(self.source.view[start:end])
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def readline(self, size=-1):
+        start = min(self._pos, self.source.size)
+        end = self.source._mmap.find(b"\n", start)
+        end = self.source.size if end == -1 else end + 1
+        if size is not None and size >= 0:
+            end = min(end, start + size)
+        self._pos = end
+        return bytes(self.source.view[start:end])
+
+
+def map_stream(f_stream):
+    """
+    Возвращает поток поверх отображения открытого файла в память.
+    Файлы, которые нельзя отобразить (пустые, каналы, не файловые объекты),
+    читаются как есть через исходный поток.
+    """
+    try:
+        return MappedSource(f_stream).open_stream()
+    except (OSError, ValueError, TypeError, AttributeError):
+        return f_stream
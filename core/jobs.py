@@ -0,0 +1,174 @@
+import os
+import time
+from core.validator import validate_file_exists
+from core.operations import (
+    extract_logic, merge_logic, editor_logic, rotate_mirror_logic, reverse_query, split_logic,
+)
+from core.reader_cache import reader_cache
+from core.result_cache import extract_params, extract_targets, normalize_query, run_cached
+from core.tracing import span
+from utils.messages import get_msg
+
+# Модуль не зависит от Tkinter: задания описываются словарями (например, строками манифеста)
+# и могут выполняться как в UI, так и в консоли или в отдельном процессе.
+
+# Операции, пишущие несколько файлов в папку (ключ dest); остальные пишут один файл (ключ out)
+DIR_OUTPUT_OPS = ("extract", "split")
+
+
+def _noop(*args):
+    pass
+
+
+def _normalize_blocks(blocks):
+    """Приводит блоки экстрактора к кортежам (страницы, имя, исключить)."""
+    result = []
+    for block in blocks:
+        if isinstance(block, dict):
+            result.append((str(block["pages"]), block.get("name", ""), bool(block.get("exclude", False))))
+        else:
+            pages, name, *rest = block
+            result.append((str(pages), name, bool(rest[0]) if rest else False))
+    return result
+
+
+def _cached(job, op, src, params, targets, compute):
+    """Операция через кэш результатов, если в задании "cache": true (см. core.result_cache)."""
+    return run_cached(bool(job.get("cache", False)), op, src, params, targets, compute)
+
+
+def _run_extract(job, progress_cb, cancel_token=None):
+    src, dest = job["src"], job["dest"]
+    configs = _normalize_blocks(job.get("blocks") or [])
+    if not configs:
+        raise ValueError(get_msg("err_pages_required"))
+    validate_file_exists(src)
+    raw_copy = bool(job.get("raw_copy", False))
+    drop_duplicates = bool(job.get("drop_duplicates", False))
+
+    def compute():
+        with reader_cache.lease(src) as reader:
+            return extract_logic(reader, dest, configs, progress_cb,
+                                 workers=int(job.get("workers", 1)), source=src, cancel_token=cancel_token,
+                                 raw_copy=raw_copy, drop_duplicates=drop_duplicates)
+
+    params = extract_params(configs, raw_copy, drop_duplicates)
+    return _cached(job, "extract", src, params, extract_targets(dest, configs), compute)
+
+
+def _run_split(job, progress_cb, cancel_token=None):
+    src, dest = job["src"], job["dest"]
+    every = int(job.get("every") or 0)
+    max_mb = float(job.get("max_mb") or 0)
+    if not every and not max_mb:
+        raise ValueError(get_msg("err_split_mode"))
+    validate_file_exists(src)
+    base_name = job.get("name") or os.path.splitext(os.path.basename(src))[0]
+    with reader_cache.lease(src) as reader:
+        return split_logic(reader, dest, base_name, progress_cb, pages_per_file=every or None,
+                           max_bytes=int(max_mb * 1024 * 1024) or None, cancel_token=cancel_token,
+                           raw_copy=bool(job.get("raw_copy", True)))
+
+
+def _run_merge(job, progress_cb, cancel_token=None):
+    files = job.get("files") or []
+    if len(files) < 2:
+        raise ValueError(get_msg("err_merge_required"))
+    for f in files:
+        validate_file_exists(f)
+    return merge_logic(files, job["out"], progress_cb, cancel_token=cancel_token,
+                       streaming=bool(job.get("streaming", False)), dedup=bool(job.get("dedup", False)),
+                       workers=int(job.get("workers", 1)), drop_duplicates=bool(job.get("drop_duplicates", False)),
+                       batch_size=int(job["batch_size"]) if job.get("batch_size") else None)
+
+
+def _run_edit(job, progress_cb, cancel_token=None):
+    src = job["src"]
+    validate_file_exists(src)
+    options = {"incremental": bool(job.get("incremental", False)), "raw_copy": bool(job.get("raw_copy", False))}
+
+    def compute():
+        with reader_cache.lease(src) as reader:
+            return editor_logic(reader, job["out"], str(job["pages"]), progress_cb, cancel_token=cancel_token,
+                                source=src, **options)
+
+    params = dict(options, pages=normalize_query(job["pages"]))
+    return _cached(job, "edit", src, params, [job["out"]], compute)
+
+
+def _run_reverse(job, progress_cb, cancel_token=None):
+    src = job["src"]
+    validate_file_exists(src)
+    options = {"incremental": bool(job.get("incremental", False)), "raw_copy": bool(job.get("raw_copy", False))}
+
+    def compute():
+        with reader_cache.lease(src) as reader:
+            query = reverse_query(len(reader.pages))
+            return editor_logic(reader, job["out"], query, progress_cb, cancel_token=cancel_token,
+                                source=src, **options)
+
+    return _cached(job, "reverse", src, options, [job["out"]], compute)
+
+
+def _run_transform(job, progress_cb, cancel_token=None):
+    src = job["src"]
+    validate_file_exists(src)
+    options = {"incremental": bool(job.get("incremental", False)),
+               "fast_mirror": bool(job.get("fast_mirror", False))}
+
+    def compute():
+        with reader_cache.lease(src, mutates=True) as reader:
+            return rotate_mirror_logic(reader, job["out"], str(job["pages"]),
+                                       job["action"], str(job["value"]), progress_cb, cancel_token=cancel_token,
+                                       source=src, **options)
+
+    params = dict(options, pages=normalize_query(job["pages"], ordered=False), action=job["action"],
+                  value=str(job["value"]))
+    return _cached(job, "transform", src, params, [job["out"]], compute)
+
+
+JOB_HANDLERS = {
+    "extract": _run_extract,
+    "split": _run_split,
+    "merge": _run_merge,
+    "edit": _run_edit,
+    "reverse": _run_reverse,
+    "transform": _run_transform,
+}
+
+
+def run_job(job, progress_cb=None, cancel_token=None):
+    """
+    Выполняет одно задание и возвращает статистику операции ({"pages": ..., "outputs": [...]}).
+    Тип задания задается ключом "op": extract, split, merge, edit, reverse или transform.
+    """
+    handler = JOB_HANDLERS.get(job.get("op"))
+    if handler is None:
+        raise ValueError(f"Неизвестная операция: {job.get('op')}")
+    with span(f"job:{job.get('op')}"):
+        return handler(job, progress_cb or _noop, cancel_token)
+
+
+def run_job_safe(index, job):
+    """
+    Обертка для пула процессов: никогда не выбрасывает исключение,
+    а возвращает статус задания, время выполнения и статистику.
+    """
+    started = time.perf_counter()
+    result = {"index": index, "op": job.get("op"), "status": "ok", "pages": 0, "outputs": []}
+    try:
+        stats = run_job(job) or {}
+        result["pages"] = stats.get("pages", 0)
+        result["outputs"] = [os.path.normpath(p) for p in stats.get("outputs", [])]
+        if stats.get("cached"):
+            result["cached"] = True
+        if "duplicates_removed" in stats:
+            result["duplicates_removed"] = stats["duplicates_removed"]
+        if "inputs" in stats:
+            # Время разбора каждого входного файла склейки
+            result["inputs"] = stats["inputs"]
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e) or type(e).__name__
+    result["seconds"] = round(time.perf_counter() - started, 4)
+    return result
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Сколько папок держать в индексе одновременно (самые давние вытесняются)
+MAX_INDEXED_DIRS = 64
+# Возраст, после которого метка чужого имени считается брошенной, даже если процесс
+# с ее номером жив (номер мог достаться другому процессу) или проверить его нельзя
+STALE_LOCK_SECONDS = 24 * 60 * 60
+
+
+class _DirIndex:
+    """Имена файлов одной папки и следующий проверяемый номер для каждого базового имени."""
+    def __init__(self, names, mtime_ns):
+        self.names = names
+        self.mtime_ns = mtime_ns
+        self.counters = {}
+
+
+def lock_path(path):
+    """Скрытая метка, занимающая имя path: .report.pdf.lock рядом с report.pdf."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.lock")
+
+
+def _pid_alive(pid):
+    if os.name != "posix":
+        # В Windows os.kill завершает процесс, а не проверяет его
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+def _is_stale(lock):
+    """Метка оставлена упавшим процессом: процесса нет или метка слишком старая."""
+    try:
+        st = os.stat(lock)
+        with open(lock, "r", encoding="ascii") as f:
+            pid = int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return False
+    if time.time() - st.st_mtime > STALE_LOCK_SECONDS:
+        return True
+    return pid > 0 and pid != os.getpid() and not _pid_alive(pid)
+
+
+def _dir_mtime(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+
+class NameAllocator:
+    """
+    Выдает уникальные имена выходных файлов.
+    Папка читается один раз (listdir) в индекс в памяти; индекс перечитывается, только если
+    mtime папки изменился не из-за нас: после собственных изменений папки (метки, временные
+    файлы и переименование в save_pdf, см. changing) запоминается новый mtime. Выбранное имя сразу занимается скрытой меткой
+    .<имя>.lock (O_CREAT | O_EXCL, внутри — pid процесса), поэтому два задания — в одном
+    процессе или в разных — не получат одно и то же имя. Под самим именем ничего не появляется,
+    пока save_pdf не переименует в него готовый файл; после этого метка удаляется (commit).
+    Метки упавших процессов считаются брошенными и занимаются заново (см. _is_stale).
+    Если папки еще нет или в нее нельзя писать, имя резервируется только в памяти процесса.
+    """
+    def __init__(self, max_dirs=MAX_INDEXED_DIRS):
+        self.max_dirs = max_dirs
+        self._dirs = OrderedDict()
+        self._placeholders = set()
+        self._lock = threading.Lock()
+
+    def _index(self, directory):
+        key = os.path.realpath(directory)
+        mtime = _dir_mtime(directory)
+        index = self._dirs.get(key)
+        if index is None or (mtime is not None and mtime != index.mtime_ns):
+            try:
+                names = set(os.listdir(directory))
+            except OSError:
+                names = set()
+            # Имена, занятые этим процессом: файлов под ними в листинге еще нет
+            names |= {os.path.basename(p) for p in self._placeholders
+                      if os.path.dirname(p) == key}
+            old = index
+            index = _DirIndex(names, mtime)
+            if old is not None:
+                # Номера уже выданных имен остаются занятыми, перебор продолжается с них
+                index.counters = old.counters
+            self._dirs[key] = index
+            while len(self._dirs) > self.max_dirs:
+                self._dirs.popitem(last=False)
+        self._dirs.move_to_end(key)
+        return index
+
+    @contextmanager
+    def _track(self, directory, created=None):
+        """
+        Собственное изменение папки (вызывается под self._lock): если до него индекс был
+        актуален, после него запоминается новый mtime, и listdir не повторяется.
+        created — имя, появившееся в папке.
+        """
+        index = self._dirs.get(os.path.realpath(directory))
+        fresh = index is not None and _dir_mtime(directory) == index.mtime_ns
+        try:
+            yield
+        finally:
+            if fresh:
+                index.mtime_ns = _dir_mtime(directory)
+                if created is not None:
+                    index.names.add(created)
+
+    @contextmanager
+    def changing(self, directory, created=None):
+        """Изменение папки самим процессом вне распределителя (временный файл, os.replace)."""
+        with self._lock, self._track(directory, created):
+            yield
+
+    def _claim(self, path):
+        """Создает метку имени. True — имя наше, False — имя занято."""
+        lock = lock_path(path)
+        with self._track(os.path.dirname(path)):
+            for _ in range(2):
+                try:
+                    fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+                except FileExistsError:
+                    if not _is_stale(lock):
+                        return False
+                    try:
+                        os.remove(lock)
+                    except OSError:
+                        return False
+                    continue
+                except OSError:
+                    # Папки нет или нет прав: резервируем только в памяти, ошибку покажет запись
+                    return True
+                with os.fdopen(fd, "w", encoding="ascii") as f:
+                    f.write(str(os.getpid()))
+                if os.path.lexists(path):
+                    # Файл с этим именем появился в обход распределителя
+                    os.remove(lock)
+                    return False
+                self._placeholders.add(os.path.realpath(path))
+                return True
+            return False
+
+    def _drop_lock(self, real):
+        with self._track(os.path.dirname(real)):
+            try:
+                os.remove(lock_path(real))
+            except OSError:
+                pass
+
+    def allocate(self, directory, clean_name, reserved=None):
+        """Путь к свободному имени clean_name, clean_name без расширения + _1, _2, ..."""
+        base, ext = os.path.splitext(clean_name)
+        with self._lock:
+            index = self._index(directory)
+            counter = index.counters.get(clean_name, 0)
+            while True:
+                name = clean_name if counter == 0 else f"{base}_{counter}{ext}"
+                path = os.path.join(directory, name)
+                counter += 1
+                if name in index.names or (reserved and path in reserved):
+                    continue
+                index.names.add(name)
+                if self._claim(path):
+                    break
+            index.counters[clean_name] = counter
+            return path
+
+    def commit(self, path):
+        """Готовый файл записан под именем path: метка больше не нужна."""
+        self._finish(path)
+
+    def release(self, path):
+        """Результат так и не был записан: имя освобождается."""
+        self._finish(path)
+
+    def _finish(self, path):
+        real = os.path.realpath(path)
+        with self._lock:
+            if real not in self._placeholders:
+                return
+            self._placeholders.discard(real)
+            self._drop_lock(real)
+
+    def forget(self, directory=None):
+        """Сбрасывает индекс папки (или всех папок)."""
+        with self._lock:
+            if directory is None:
+                self._dirs.clear()
+            else:
+                self._dirs.pop(os.path.realpath(directory), None)
+
+
+# Общий распределитель имен процесса
+name_allocator = NameAllocator()
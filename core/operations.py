@@ -1,110 +1,407 @@
 import os
-from pypdf import PdfWriter, Transformation
-from core.io_handler import save_pdf, get_safe_unique_path 
+import time
+from pypdf import PdfWriter
+from pypdf.generic import NameObject
+from core.io_handler import (
+    save_pdf, get_safe_unique_path, discard_outputs, get_reader, map_stream, atomic_output, summarize_writes,
+    WriteStats,
+)
+from core.dedup import deduplicate_objects
+from core.incremental import mirror_update, reorder_update, rotate_update, source_path, supports_incremental
+from core.page_index import build_index, select_unique, source_fingerprints, unique_pages
+from core.page_transform import mirror_matrix, wrap_contents
+from core.parallel import extract_blocks_parallel, merge_files_parallel
+from core.streaming import StreamingPdfWriter, save_pages
+from core.task_manager import OperationCancelled, check_cancelled
+from core.tracing import span, stage, traced
 from utils.messages import get_msg
-from utils.parser import parse_to_blocks
+from utils.parser import parse_to_blocks, flatten_blocks, PageSet
 
 
-def extract_logic(reader, out_path, query, progress_cb):
+def _copy_page(writer, reader, p_idx):
+    """Добавляет страницу reader в writer; поиск и клонирование замеряются как этапы трассы."""
+    with stage("page_lookup"):
+        page = reader.pages[p_idx]
+    with stage("add_page"):
+        writer.add_page(page)
+
+
+def _block_indices(raw_indices, fingerprints=None):
+    """Индексы страниц блока; с fingerprints — без повторяющихся страниц внутри блока."""
+    if fingerprints is None:
+        return flatten_blocks(raw_indices)
+    return unique_pages(fingerprints, flatten_blocks(raw_indices))
+
+
+def _plan_extraction(out_path, query, total_pages, fingerprints=None):
+    """Заранее разбирает все блоки и резервирует для них уникальные имена файлов."""
+    plan = []
+    reserved = set()
+    for config_str, custom_name, is_exclude in query:
+        raw_indices = parse_to_blocks(config_str, total_pages, is_exclude)
+        # Список индексов передается в процесс пула, поэтому здесь он материализуется
+        final_indices = list(_block_indices(raw_indices, fingerprints))
+        final_path = get_safe_unique_path(out_path, custom_name, reserved)
+        reserved.add(final_path)
+        plan.append((final_indices, final_path))
+    return plan
+
+
+@traced("extract")
+def extract_logic(reader, out_path, query, progress_cb, workers=1, source=None, cancel_token=None,
+                  raw_copy=False, drop_duplicates=False):
+    """
+    Извлекает блоки страниц в отдельные файлы.
+    workers > 1 включает параллельный режим: блоки распределяются по пулу процессов,
+    каждый из которых открывает собственный ридер исходного файла source.
+    raw_copy=True — блоки пишутся потоково, а изображения, шрифты и потоки содержимого
+    копируются байтами исходного файла без разбора и пережатия.
+    drop_duplicates=True — повторяющиеся страницы (по отпечатку содержимого, см. core.page_index)
+    попадают в файл блока один раз; число выброшенных — в ключе "duplicates_removed".
+    При отмене через cancel_token уже созданные файлы блоков удаляются.
+    """
     total_pages = len(reader.pages)
+    fingerprints = None
+    if drop_duplicates:
+        fingerprints = source_fingerprints(reader, source or getattr(reader.stream, "name", None), cancel_token)
+    if workers > 1 and len(query) > 1:
+        source = source or getattr(reader.stream, "name", None)
+        if not isinstance(source, str):
+            raise ValueError("Для параллельного извлечения нужен путь к исходному файлу")
+        plan = _plan_extraction(out_path, query, total_pages, fingerprints)
+        written_pages, writes = extract_blocks_parallel(source, plan, workers, progress_cb, cancel_token,
+                                                        raw_copy=raw_copy)
+        result = {"pages": written_pages, "outputs": [path for _, path in plan], "write": summarize_writes(writes)}
+        if drop_duplicates:
+            requested = sum(len(block) for pages, _, exclude in query
+                            for block in parse_to_blocks(pages, total_pages, exclude))
+            result["duplicates_removed"] = requested - written_pages
+        return result
+
     successful_files = 0
+    written_pages = 0
+    requested = 0
+    outputs = []
+    writes = []
 
-    # Распаковываем кортеж (конфигурация страниц, желаемое имя)
-    for i, (config_str, custom_name, is_exclude) in enumerate(query):
-        raw_indices = parse_to_blocks(config_str, total_pages, is_exclude)
-        writer = PdfWriter()
-        final_indices = [p for sublist in raw_indices for p in sublist]
+    try:
+        # Распаковываем кортеж (конфигурация страниц, желаемое имя)
+        for i, (config_str, custom_name, is_exclude) in enumerate(query):
+            raw_indices = parse_to_blocks(config_str, total_pages, is_exclude)
+            requested += sum(len(block) for block in raw_indices)
+            if raw_copy:
+                indices = list(_block_indices(raw_indices, fingerprints))
+                final_path = get_safe_unique_path(out_path, custom_name)
+                writes.append(save_pages(reader, indices, final_path, cancel_token=cancel_token))
+                successful_files += 1
+                written_pages += len(indices)
+                outputs.append(final_path)
+                progress_cb(i + 1)
+                continue
+            writer = PdfWriter()
+            block_pages = 0
 
-        for p_idx in final_indices:
-            writer.add_page(reader.pages[p_idx])
+            for p_idx in _block_indices(raw_indices, fingerprints):
+                check_cancelled(cancel_token)
+                _copy_page(writer, reader, p_idx)
+                block_pages += 1
 
-        # Очищаем имя от "мусора"
-        
-        final_path = get_safe_unique_path(out_path, custom_name)
-        save_pdf(writer, final_path)
-        successful_files += 1
-        progress_cb(i + 1)
+            # Очищаем имя от "мусора"
+            
+            final_path = get_safe_unique_path(out_path, custom_name)
+            writes.append(save_pdf(writer, final_path))
+            successful_files += 1
+            written_pages += block_pages
+            outputs.append(final_path)
+            progress_cb(i + 1)
+    except OperationCancelled:
+        discard_outputs(outputs)
+        raise
 
     
     if successful_files == 0:
         raise ValueError(get_msg("err_no_pages_extracted"))
+    result = {"pages": written_pages, "outputs": outputs, "write": summarize_writes(writes)}
+    if drop_duplicates:
+        result["duplicates_removed"] = requested - written_pages
+    return result
 
 
 
-def merge_logic(files, out_path, progress_cb):
+def _chunk_stop(pages_per_file, max_bytes):
+    """Условие закрытия части для StreamingPdfWriter.add_pages(stop=...)."""
+    if pages_per_file:
+        return lambda writer: writer.page_count >= pages_per_file
+    last = [0]
+
+    def stop(writer):
+        # Следующая страница оценивается по приросту файла на предыдущей
+        # (общие шрифты и изображения уже записаны в эту часть)
+        size = writer.estimated_size
+        grew = size - last[0]
+        last[0] = size
+        return size + grew > max_bytes
+    return stop
+
+
+@traced("split")
+def split_logic(reader, out_dir, base_name, progress_cb, pages_per_file=None, max_bytes=None,
+                cancel_token=None, raw_copy=True):
+    """
+    Делит документ на части за один проход: по pages_per_file страниц или по оценке
+    размера части не больше max_bytes (часть из одной страницы может оказаться больше).
+    Каждая часть пишется потоково и закрывается сразу, как только набрана, поэтому память
+    не зависит от числа частей. progress_cb получает число обработанных страниц.
+    Части называются base_name_part_N.pdf; при отмене уже созданные удаляются.
+    """
+    if not pages_per_file and not max_bytes:
+        raise ValueError(get_msg("err_split_mode"))
+    total_pages = len(reader.pages)
+    pages = iter(range(total_pages))
+    done = 0
+    outputs = []
+    writes = []
+
+    def page_progress(n):
+        progress_cb(done + n)
+
+    try:
+        while done < total_pages:
+            final_path = get_safe_unique_path(out_dir, f"{base_name}_part_{len(outputs) + 1}")
+            started = time.perf_counter()
+            with atomic_output(final_path) as f_out:
+                writer = StreamingPdfWriter(f_out)
+                added = writer.add_pages(reader, pages, cancel_token=cancel_token, progress_cb=page_progress,
+                                         raw=raw_copy, stop=_chunk_stop(pages_per_file, max_bytes))
+                writer.close()
+            outputs.append(final_path)
+            writes.append(WriteStats(writer.bytes_written, time.perf_counter() - started))
+            done += added
+    except OperationCancelled:
+        discard_outputs(outputs)
+        raise
+    if not outputs:
+        raise ValueError(get_msg("err_no_pages_extracted"))
+    return {"pages": done, "outputs": outputs, "write": summarize_writes(writes)}
+
+
+@traced("merge")
+def merge_logic(files, out_path, progress_cb, cancel_token=None, streaming=False, dedup=False, workers=1,
+                batch_size=None, drop_duplicates=False):
+    """
+    Склеивает файлы в один PDF в порядке списка files.
+    streaming=True — потоковый режим с ограниченной памятью: объекты каждого файла пишутся
+    на диск сразу, закладки исходных файлов при этом не переносятся.
+    dedup=True — перед записью одинаковые объекты (шрифты, логотипы, ICC-профили из
+    разных файлов) схлопываются в один; статистика возвращается в ключе "dedup".
+    workers > 1 — параллельная склейка пакетами по batch_size файлов в пуле процессов
+    (см. merge_files_parallel); как и в потоковом режиме, закладки не переносятся,
+    dedup не применяется.
+    drop_duplicates=True — повторяющиеся страницы (по отпечатку содержимого, см. core.page_index)
+    остаются только при первом вхождении, в том числе между разными файлами; индекс отпечатков
+    строится в пуле процессов и сохраняется на диске. Число выброшенных — в ключе "duplicates_removed".
+    Время разбора и копирования каждого входного файла возвращается в ключе "inputs".
+    """
+    selection = None
+    if drop_duplicates:
+        index = build_index(files, max(1, workers), cancel_token)
+        selection, dropped = select_unique(files, index)
+    if workers > 1 and len(files) > 1:
+        result = _merge_parallel(files, out_path, progress_cb, cancel_token, workers, batch_size, selection)
+    elif streaming:
+        result = _merge_streaming(files, out_path, progress_cb, cancel_token, selection)
+    else:
+        result = _merge_standard(files, out_path, progress_cb, cancel_token, dedup, selection)
+    if drop_duplicates:
+        result["duplicates_removed"] = dropped
+    return result
+
+
+def _merge_standard(files, out_path, progress_cb, cancel_token=None, dedup=False, selection=None):
     merger = PdfWriter()
+    inputs = []
     try:
         for i, f in enumerate(files):
-            with open(f, "rb") as fh:
-                merger.append(fh)
-                progress_cb(i + 1)
+            check_cancelled(cancel_token)
+            started = time.perf_counter()
+            before = len(merger.pages)
+            with open(f, "rb") as fh, stage("append"):
+                merger.append(fh, pages=selection[i] if selection is not None else None)
+            inputs.append(_input_stats(f, len(merger.pages) - before, time.perf_counter() - started))
+            progress_cb(i + 1)
+        check_cancelled(cancel_token)
+        written_pages = len(merger.pages)
+        result = {"pages": written_pages, "inputs": inputs}
+        if dedup:
+            with span("dedup") as sp:
+                result["dedup"] = deduplicate_objects(merger)._asdict()
+                sp.add(objects_removed=result["dedup"]["objects_removed"])
+            check_cancelled(cancel_token)
         directory, filename = os.path.split(out_path)
         final_path = get_safe_unique_path(directory, filename)
-        save_pdf(merger, final_path)
+        result["write"] = summarize_writes([save_pdf(merger, final_path)])
+        result["outputs"] = [final_path]
+        return result
     finally:
         merger.close()
 
 
-def editor_logic(reader, out_path, query, progress_cb):
+def _input_stats(path, pages, seconds):
+    return {"file": path, "pages": pages, "seconds": round(seconds, 4)}
+
+
+def _merge_streaming(files, out_path, progress_cb, cancel_token=None, selection=None):
+    directory, filename = os.path.split(out_path)
+    final_path = get_safe_unique_path(directory, filename)
+    started = time.perf_counter()
+    inputs = []
+    # При ошибке или отмене atomic_output удаляет временный файл сам
+    with atomic_output(final_path) as f_out:
+        writer = StreamingPdfWriter(f_out)
+        for i, f in enumerate(files):
+            check_cancelled(cancel_token)
+            file_started = time.perf_counter()
+            with open(f, "rb") as fh, stage("stream_append"):
+                indices = selection[i] if selection is not None else None
+                pages = writer.add_pages(get_reader(map_stream(fh)), indices, cancel_token=cancel_token)
+            inputs.append(_input_stats(f, pages, time.perf_counter() - file_started))
+            progress_cb(i + 1)
+        writer.close()
+    stats = WriteStats(writer.bytes_written, time.perf_counter() - started)
+    return {"pages": writer.page_count, "outputs": [final_path], "write": summarize_writes([stats]),
+            "inputs": inputs}
+
+
+def _merge_parallel(files, out_path, progress_cb, cancel_token, workers, batch_size, selection=None):
+    directory, filename = os.path.split(out_path)
+    final_path = get_safe_unique_path(directory, filename)
+    with span("merge_parallel", workers=workers):
+        pages, inputs, stats = merge_files_parallel(files, final_path, workers, progress_cb, cancel_token,
+                                                    batch_size=batch_size, selection=selection)
+    return {"pages": pages, "outputs": [final_path], "write": summarize_writes([stats]),
+            "inputs": [_input_stats(f, n, sec) for f, n, sec in inputs]}
+
+
+def _save_incremental(update, source, out_path, pages, progress_cb, cancel_token):
+    check_cancelled(cancel_token)
+    directory, filename = os.path.split(out_path)
+    final_path = get_safe_unique_path(directory, filename)
+    stats = update.save(source, final_path, cancel_token)
+    progress_cb(pages)
+    return {"pages": pages, "outputs": [final_path], "write": summarize_writes([stats]),
+            "incremental": True, "changed_objects": len(update)}
+
+
+@traced("editor")
+def editor_logic(reader, out_path, query, progress_cb, cancel_token=None, incremental=False, source=None,
+                 raw_copy=False):
+    """
+    Новый порядок страниц: сначала указанные пользователем, затем остальные по возрастанию.
+    incremental=True — исходный файл копируется без изменений, а новый порядок дописывается
+    инкрементальным обновлением (только узел дерева страниц). Если это невозможно
+    (шифрование, повторы страниц, неизвестен путь source), файл пересобирается полностью.
+    raw_copy=True — полная пересборка идет потоково, с копированием объектов байтами
+    исходного файла (см. extract_logic).
+    """
     total_pages = len(reader.pages)
 
     raw_indices = parse_to_blocks(query, total_pages)
-    writer = PdfWriter()
-    # Определяем уже указанные пользователем страницы (0-indexed)
-    final_indices = [p for block in raw_indices for p in block]
-    
-    # Находим отсутствующие страницы для автозаполнения
-    all_indices = set(range(total_pages))
-    used_indices = set(final_indices)
-    remaining_indices = sorted(list(all_indices - used_indices))
-    
-    # Формируем итоговый список индексов: сначала ввод пользователя, затем остаток
-    final_indices = final_indices + remaining_indices
-    
-    if not final_indices:
+    # Находим отсутствующие страницы для автозаполнения (интервалами, без списков страниц)
+    remaining = PageSet.from_blocks(raw_indices).complement(total_pages)
+
+    # Итоговый порядок: сначала ввод пользователя, затем остаток по возрастанию
+    page_count = sum(len(block) for block in raw_indices) + len(remaining)
+    if not page_count:
         raise ValueError(get_msg("err_page_numbers"))
 
-    # Превращаем плоский список индексов обратно в формат блоков для extract_logic
-    # Оборачиваем в список, так как extract_logic ожидает итератор кортежей (config, name)
-    # Используем фиктивную конфигурацию, так как мы уже подготовили индексы
-  
-    for i, p_idx in enumerate(final_indices):
-        writer.add_page(reader.pages[p_idx])
+    if incremental:
+        source = source_path(reader, source)
+        if supports_incremental(reader, source):
+            update = reorder_update(reader, list(flatten_blocks(raw_indices + [remaining])), cancel_token, progress_cb)
+            if update is not None:
+                return _save_incremental(update, source, out_path, page_count, progress_cb, cancel_token)
+
+    if raw_copy:
+        directory, filename = os.path.split(out_path)
+        final_path = get_safe_unique_path(directory, filename)
+        stats = save_pages(reader, list(flatten_blocks(raw_indices + [remaining])), final_path,
+                           cancel_token=cancel_token, progress_cb=progress_cb)
+        return {"pages": page_count, "outputs": [final_path], "write": summarize_writes([stats])}
+
+    writer = PdfWriter()
+    for i, p_idx in enumerate(flatten_blocks(raw_indices + [remaining])):
+        check_cancelled(cancel_token)
+        _copy_page(writer, reader, p_idx)
         progress_cb(i + 1)
     directory, filename = os.path.split(out_path)
     final_path = get_safe_unique_path(directory, filename) 
-    save_pdf(writer, final_path)
+    stats = save_pdf(writer, final_path)
+    return {"pages": page_count, "outputs": [final_path], "write": summarize_writes([stats])}
+
 
+def reverse_query(total_pages):
+    """Строка запроса для полного реверса документа из total_pages страниц."""
+    return f"{total_pages}-1" if total_pages > 1 else "1"
 
-def rotate_mirror_logic(reader, out_path, query, action_type, value, progress_cb):
+
+@traced("rotate_mirror")
+def rotate_mirror_logic(reader, out_path, query, action_type, value, progress_cb, cancel_token=None,
+                        incremental=False, source=None, fast_mirror=False):
     """
     Трансформация страниц: поворот (rotate) или отражение (mirror).
     action_type: 'rotate' или 'mirror'
     value: градусы (90, 180, 270) или направление ('h', 'v')
+    incremental=True — результат дописывается к копии исходного файла инкрементальным
+    обновлением: переписываются только словари целевых страниц (для отражения — еще
+    два маленьких потока на страницу).
+    fast_mirror=True — матрица отражения кладется в отдельный поток перед исходными,
+    а сами потоки содержимого копируются без распаковки и повторного сжатия.
     """
+    if action_type not in ('rotate', 'mirror'):
+        raise ValueError(f"Неизвестная трансформация: {action_type}")
     total_pages = len(reader.pages)
     raw_indices = parse_to_blocks(query, total_pages)    
-    target_indices = set(p for sublist in raw_indices for p in sublist)
+    target_indices = PageSet.from_blocks(raw_indices)
+
+    if incremental:
+        source = source_path(reader, source)
+        if supports_incremental(reader, source):
+            if action_type == 'rotate':
+                update = rotate_update(reader, target_indices, value, cancel_token, progress_cb)
+            elif action_type == 'mirror':
+                update = mirror_update(reader, target_indices, value, cancel_token, progress_cb)
+            if update is not None:
+                return _save_incremental(update, source, out_path, total_pages, progress_cb, cancel_token)
     writer = PdfWriter()
     
     for i in range(total_pages):
-        page = reader.pages[i]
+        check_cancelled(cancel_token)
+        with stage("page_lookup"):
+            page = reader.pages[i]
+        wrap = None
         if i in target_indices:
             if action_type == 'rotate':
                 page.rotate(int(value))
             elif action_type == 'mirror':
-                # Получаем размеры страницы для корректного смещения после отражения
-                mb = page.mediabox
-                if value == 'h':
-                    # Отражение по горизонтали: масштабируем X на -1 и сдвигаем вправо на ширину
-                    op = Transformation().scale(-1, 1).translate(mb.width, 0)
+                # Матрица учитывает размеры страницы для смещения после отражения
+                op = mirror_matrix(page, value)
+                if fast_mirror:
+                    wrap = op
                 else:
-                    # Отражение по вертикали: масштабируем Y на -1 и сдвигаем вверх на высоту
-                    op = Transformation().scale(1, -1).translate(0, mb.height)
-                page.add_transformation(op)
+                    with stage("transform"):
+                        page.add_transformation(op)
         
-        writer.add_page(page)
+        with stage("add_page"):
+            added = writer.add_page(page)
+        if wrap is not None:
+            with stage("transform"):
+                contents = wrap_contents(added, wrap, writer._add_object)
+                if contents is None:
+                    added.add_transformation(wrap)
+                else:
+                    added[NameObject("/Contents")] = contents
         progress_cb(i + 1)
     directory, filename = os.path.split(out_path)
     final_path = get_safe_unique_path(directory, filename)     
-    save_pdf(writer, final_path)
+    stats = save_pdf(writer, final_path)
+    return {"pages": total_pages, "outputs": [final_path], "write": summarize_writes([stats])}
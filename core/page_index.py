@@ -0,0 +1,190 @@
+"""
+Индекс отпечатков страниц: SHA-256 потоков содержимого, ресурсов, аннотаций и геометрии
+каждой страницы.
+
+Одинаковые страницы (повторное сканирование той же страницы, один и тот же лист в разных файлах)
+дают одинаковый отпечаток независимо от номеров объектов в файле. Индекс файла сохраняется
+на диске (ключ — путь, размер, mtime и inode), поэтому повторная склейка тех же файлов
+не разбирает их заново. Для многих файлов индекс строится в пуле процессов.
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from core.dedup import feed_canonical
+from core.io_handler import MappedSource, atomic_output, get_reader
+from core.parallel import _result
+from core.reader_cache import file_identity
+from core.task_manager import check_cancelled
+from core.tracing import span
+from utils.constants import PAGE_INDEX_DIR
+
+# Версия алгоритма отпечатка: сохраненные индексы другой версии пересчитываются
+INDEX_VERSION = 3
+# Ключи страницы, определяющие ее вид и поведение: ссылки и поля форм (/Annots) тоже входят,
+# иначе страницы, отличающиеся только ими, считались бы дубликатами
+_PAGE_KEYS = ("/Contents", "/Resources", "/Annots", "/MediaBox", "/CropBox", "/Rotate", "/UserUnit")
+# Ключи, которые ведут обратно вверх по дереву (в том числе /P аннотации — ее страница)
+# или связывают страницу со структурой документа
+_SKIP_KEYS = ("/Parent", "/P", "/StructParent", "/StructParents")
+_CYCLE = b"cycle"
+
+
+def _feed(h, obj, memo):
+    """Сериализация как в дедупликации (feed_canonical), но ссылки заменены отпечатками объектов."""
+    feed_canonical(h, obj, lambda ref: b"R" + _ref_digest(ref, memo), _SKIP_KEYS)
+
+
+def _ref_digest(ref, memo):
+    """Отпечаток косвенного объекта; общие шрифты и изображения хешируются один раз на файл."""
+    key = (ref.idnum, ref.generation)
+    digest = memo.get(key)
+    if digest is None:
+        memo[key] = _CYCLE
+        h = hashlib.sha256()
+        _feed(h, ref.get_object(), memo)
+        digest = memo[key] = h.digest()
+    return digest
+
+
+def page_fingerprint(page, memo=None):
+    """Отпечаток страницы (hex). memo — общий словарь для страниц одного файла."""
+    memo = {} if memo is None else memo
+    h = hashlib.sha256()
+    for key in _PAGE_KEYS:
+        if key in page:
+            h.update(key.encode())
+            _feed(h, page.raw_get(key), memo)
+    return h.hexdigest()
+
+
+def reader_fingerprints(reader, cancel_token=None):
+    """Отпечатки всех страниц ридера по порядку."""
+    memo = {}
+    result = []
+    for page in reader.pages:
+        check_cancelled(cancel_token)
+        result.append(page_fingerprint(page, memo))
+    return result
+
+
+def _fingerprint_file(path):
+    """Отпечатки страниц файла (в процессе пула)."""
+    with MappedSource(path) as source:
+        return reader_fingerprints(get_reader(source.open_stream()))
+
+
+class PageIndexStore:
+    """Сохраненные индексы файлов: по JSON на файл, имя — хеш идентичности файла."""
+    def __init__(self, root=PAGE_INDEX_DIR):
+        self.root = root
+
+    def _path(self, identity):
+        name = hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, name[:2], f"{name}.json")
+
+    def load(self, path):
+        identity = file_identity(path)
+        if identity is None:
+            return None
+        try:
+            with open(self._path(identity), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != INDEX_VERSION or data.get("identity") != list(identity):
+            return None
+        return data["pages"]
+
+    def save(self, path, fingerprints):
+        identity = file_identity(path)
+        if identity is None:
+            return
+        data = {"version": INDEX_VERSION, "identity": list(identity), "pages": fingerprints}
+        try:
+            with atomic_output(self._path(identity)) as f_out:
+                f_out.write(json.dumps(data).encode("utf-8"))
+        except OSError:
+            # Индекс — ускорение повторных запусков, без него операция тоже выполнится
+            pass
+
+
+page_index_store = PageIndexStore()
+
+
+def build_index(paths, workers=1, cancel_token=None, store=None):
+    """
+    Отпечатки страниц файлов paths: {путь: [отпечаток страницы, ...]}.
+    Сохраненные индексы берутся из store, остальные строятся (в пуле из workers процессов,
+    если файлов больше одного) и сохраняются.
+    """
+    store = page_index_store if store is None else store
+    index = {}
+    missing = []
+    for path in dict.fromkeys(paths):
+        fingerprints = store.load(path)
+        if fingerprints is None:
+            missing.append(path)
+        else:
+            index[path] = fingerprints
+    with span("page_index", files=len(index) + len(missing), built=len(missing)):
+        if workers > 1 and len(missing) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+                futures = [(path, pool.submit(_fingerprint_file, path)) for path in missing]
+                try:
+                    for path, fut in futures:
+                        index[path] = _result(fut, cancel_token)
+                        store.save(path, index[path])
+                except BaseException:
+                    for _, fut in futures:
+                        fut.cancel()
+                    raise
+        else:
+            for path in missing:
+                check_cancelled(cancel_token)
+                index[path] = _fingerprint_file(path)
+                store.save(path, index[path])
+    return index
+
+
+def source_fingerprints(reader, source=None, cancel_token=None):
+    """Отпечатки страниц открытого ридера: из сохраненного индекса source или по ридеру."""
+    if source is not None and os.path.isfile(source):
+        fingerprints = page_index_store.load(source)
+        if fingerprints is not None and len(fingerprints) == len(reader.pages):
+            return fingerprints
+        fingerprints = reader_fingerprints(reader, cancel_token)
+        page_index_store.save(source, fingerprints)
+        return fingerprints
+    return reader_fingerprints(reader, cancel_token)
+
+
+def unique_pages(fingerprints, indices, seen=None):
+    """
+    Индексы из indices без повторов страниц (первое вхождение остается).
+    seen — множество уже взятых отпечатков, общее для нескольких вызовов.
+    """
+    seen = set() if seen is None else seen
+    result = []
+    for idx in indices:
+        fp = fingerprints[idx]
+        if fp not in seen:
+            seen.add(fp)
+            result.append(idx)
+    return result
+
+
+def select_unique(files, index):
+    """
+    Страницы каждого входного файла склейки без повторов по всем файлам.
+    Возвращает (список индексов страниц по файлам, число выброшенных страниц).
+    """
+    seen = set()
+    selection = []
+    dropped = 0
+    for path in files:
+        fingerprints = index[path]
+        keep = unique_pages(fingerprints, range(len(fingerprints)), seen)
+        dropped += len(fingerprints) - len(keep)
+        selection.append(keep)
+    return selection, dropped
@@ -0,0 +1,48 @@
+from pypdf import Transformation
+from pypdf.generic import ArrayObject, IndirectObject, StreamObject
+
+
+def mirror_matrix(page, direction):
+    """Матрица отражения страницы: 'h' — по горизонтали, иначе — по вертикали."""
+    mb = page.mediabox
+    if direction == 'h':
+        # Масштабируем X на -1 и сдвигаем вправо на ширину
+        return Transformation().scale(-1, 1).translate(mb.width, 0)
+    # Масштабируем Y на -1 и сдвигаем вверх на высоту
+    return Transformation().scale(1, -1).translate(0, mb.height)
+
+
+def _number(value):
+    text = f"{float(value):.6f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+
+def _stream(data):
+    stream = StreamObject()
+    stream.set_data(data)
+    return stream
+
+
+def wrap_contents(page, op, add_object):
+    """
+    Новый массив /Contents страницы: поток "q <матрица> cm", исходные потоки по ссылкам
+    и поток "Q". Исходные потоки не распаковываются и не пережимаются — результат тот же,
+    что у page.add_transformation (cm в начале и изоляция графического состояния).
+    add_object(stream) регистрирует новый поток и возвращает ссылку на него
+    (PdfWriter._add_object или IncrementalUpdate.add).
+    Возвращает None, если содержимое страницы задано прямым объектом потока.
+    """
+    contents = page.raw_get("/Contents") if "/Contents" in page else None
+    if isinstance(contents, IndirectObject):
+        target = contents.get_object()
+        refs = list(target) if isinstance(target, ArrayObject) else [contents]
+    elif isinstance(contents, ArrayObject):
+        refs = list(contents)
+    elif contents is None:
+        refs = []
+    else:
+        return None
+    matrix = " ".join(_number(v) for v in op.ctm)
+    prefix = add_object(_stream(f"q {matrix} cm\n".encode()))
+    suffix = add_object(_stream(b"\nQ"))
+    return ArrayObject([prefix] + refs + [suffix])
@@ -0,0 +1,194 @@
+import math
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from pypdf import PdfWriter
+from core.io_handler import get_reader, save_pdf, discard_outputs, MappedSource, WriteStats, atomic_output
+from core.name_allocator import name_allocator
+from core.streaming import StreamingPdfWriter, save_pages
+from core.task_manager import OperationCancelled, check_cancelled
+
+# Как часто родительский процесс проверяет отмену, ожидая результат блока (сек)
+CANCEL_POLL_INTERVAL = 0.1
+# Сколько промежуточных файлов склеивается за один шаг дерева склейки
+MERGE_FAN_IN = 16
+# На сколько пакетов на процесс делятся входные файлы (баланс нагрузки между процессами)
+MERGE_BATCHES_PER_WORKER = 4
+
+# Ридер исходного файла, открытый один раз в каждом процессе пула
+_worker_reader = None
+_worker_source = None
+
+
+def _init_extract_worker(source):
+    """
+    Инициализатор процесса: открывает собственный ридер исходного PDF.
+    Файл отображается в память, поэтому процессы делят страницы кэша ОС, а не копии файла.
+    """
+    global _worker_reader, _worker_source
+    _worker_source = MappedSource(source)
+    _worker_reader = get_reader(_worker_source.open_stream())
+
+
+def _extract_block(indices, final_path, raw_copy=False):
+    """Собирает и сохраняет один блок в процессе пула. Возвращает (число страниц, WriteStats)."""
+    if raw_copy:
+        return len(indices), save_pages(_worker_reader, indices, final_path)
+    writer = PdfWriter()
+    for p_idx in indices:
+        writer.add_page(_worker_reader.pages[p_idx])
+    return len(indices), save_pdf(writer, final_path)
+
+
+def _result(fut, cancel_token):
+    """Результат задачи пула с проверкой отмены каждые CANCEL_POLL_INTERVAL секунд."""
+    while True:
+        check_cancelled(cancel_token)
+        try:
+            return fut.result(timeout=CANCEL_POLL_INTERVAL)
+        except FuturesTimeout:
+            continue
+
+
+def extract_blocks_parallel(source, plan, workers, progress_cb, cancel_token=None, raw_copy=False):
+    """
+    Распределяет блоки (indices, final_path) по пулу процессов.
+    Имена файлов уже выбраны вызывающей стороной, поэтому порядок завершения не важен;
+    progress_cb вызывается строго в порядке блоков.
+    Отмена проверяется между блоками: не начатые блоки снимаются с пула,
+    а все файлы этого запуска удаляются.
+    Возвращает (число страниц, список WriteStats по блокам).
+    """
+    written_pages = 0
+    writes = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_extract_worker,
+                             initargs=(source,)) as pool:
+        futures = [pool.submit(_extract_block, indices, path, raw_copy) for indices, path in plan]
+        try:
+            for i, fut in enumerate(futures):
+                pages, stats = _result(fut, cancel_token)
+                written_pages += pages
+                writes.append(stats)
+                progress_cb(i + 1)
+        except BaseException as e:
+            for fut in futures:
+                fut.cancel()
+            # Дожидаемся уже запущенных блоков: пока блок может переименовать файл в свое
+            # имя, это имя нельзя ни удалять, ни отдавать другому заданию
+            pool.shutdown(wait=True)
+            if isinstance(e, OperationCancelled):
+                discard_outputs([path for _, path in plan])
+            else:
+                # Записанные блоки остаются, имена незаписанных освобождаются
+                for _, path in plan:
+                    name_allocator.release(path)
+            raise
+    for _, path in plan:
+        name_allocator.commit(path)
+    return written_pages, writes
+
+
+def _merge_batch(paths, out_path, selection=None):
+    """
+    Склеивает пакет входных файлов в промежуточный файл out_path (в процессе пула).
+    Объекты входных файлов копируются байтами, без разбора потоков.
+    selection — индексы страниц по файлам пакета (None — все страницы).
+    Возвращает (страниц по файлам, секунд по файлам).
+    """
+    pages = []
+    seconds = []
+    with open(out_path, "wb") as f_out:
+        writer = StreamingPdfWriter(f_out)
+        for n, path in enumerate(paths):
+            started = time.perf_counter()
+            indices = None if selection is None else selection[n]
+            with MappedSource(path) as source:
+                reader = get_reader(source.open_stream())
+                pages.append(writer.add_pages(reader, indices, raw=True))
+            seconds.append(time.perf_counter() - started)
+        writer.close()
+    return pages, seconds
+
+
+def _stitch(paths, f_out, cancel_token=None):
+    """Сшивает промежуточные файлы в порядке paths. Возвращает StreamingPdfWriter."""
+    writer = StreamingPdfWriter(f_out)
+    for path in paths:
+        check_cancelled(cancel_token)
+        with MappedSource(path) as source:
+            writer.add_written(source.view)
+    writer.close()
+    return writer
+
+
+def _stitch_file(paths, out_path):
+    """Шаг дерева склейки в процессе пула: промежуточные файлы paths -> out_path."""
+    with open(out_path, "wb") as f_out:
+        _stitch(paths, f_out)
+
+
+def _batches(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def merge_files_parallel(files, final_path, workers, progress_cb, cancel_token=None, batch_size=None,
+                         selection=None):
+    """
+    Параллельная склейка: входные файлы делятся на пакеты подряд идущих файлов,
+    пакеты склеиваются в промежуточные файлы в пуле процессов, промежуточные файлы
+    при необходимости склеиваются деревом (по MERGE_FAN_IN за шаг), а последний уровень
+    сшивается в final_path в порядке files.
+    selection — индексы страниц по входным файлам (None — все страницы).
+    progress_cb получает число готовых входных файлов (строго в порядке списка).
+    Возвращает (число страниц, [(файл, страниц, секунд)] по входам, WriteStats итогового файла).
+    """
+    if batch_size is None:
+        batch_size = max(1, math.ceil(len(files) / (workers * MERGE_BATCHES_PER_WORKER)))
+    directory = os.path.dirname(final_path) or "."
+    # Промежуточные файлы лежат рядом с результатом: папку создаем заранее, как atomic_output
+    os.makedirs(directory, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=".merge_", dir=directory)
+    inputs = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            level = []
+            futures = []
+            selections = _batches(list(selection), batch_size) if selection is not None else None
+            for n, batch in enumerate(_batches(list(files), batch_size)):
+                path = os.path.join(work_dir, f"0_{n}.pdf")
+                level.append(path)
+                batch_selection = selections[n] if selections is not None else None
+                futures.append((batch, pool.submit(_merge_batch, batch, path, batch_selection)))
+            try:
+                done = 0
+                for batch, fut in futures:
+                    pages, seconds = _result(fut, cancel_token)
+                    inputs.extend(zip(batch, pages, seconds))
+                    done += len(batch)
+                    progress_cb(done)
+
+                depth = 1
+                while len(level) > MERGE_FAN_IN:
+                    groups = _batches(level, MERGE_FAN_IN)
+                    level = [os.path.join(work_dir, f"{depth}_{n}.pdf") for n in range(len(groups))]
+                    merged = [pool.submit(_stitch_file, group, path) for group, path in zip(groups, level)]
+                    for fut in merged:
+                        _result(fut, cancel_token)
+                    depth += 1
+            except BaseException:
+                for _, fut in futures:
+                    fut.cancel()
+                raise
+
+        started = time.perf_counter()
+        with atomic_output(final_path) as f_out:
+            writer = _stitch(level, f_out, cancel_token)
+        stats = WriteStats(writer.bytes_written, time.perf_counter() - started)
+    except BaseException:
+        name_allocator.release(final_path)
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return writer.page_count, inputs, stats
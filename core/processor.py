@@ -1,86 +1,214 @@
+import os
+import threading
 from core.validator import validate_file_exists
-from core.operations import extract_logic, merge_logic, editor_logic, rotate_mirror_logic
-from core.task_manager import run_in_thread
-from core.io_handler import get_reader
-from utils.constants import MSG_SUCCESS_TITLE
+from core.operations import (
+    extract_logic, merge_logic, editor_logic, rotate_mirror_logic, reverse_query, split_logic,
+)
+from core.task_manager import JobScheduler, CancellationToken, OperationCancelled
+from core.io_handler import get_reader, map_stream
+from core.progress import ProgressReporter
+from core.reader_cache import reader_cache
+from core.result_cache import extract_params, extract_targets, normalize_query, run_cached
+from core.tracing import span
+from utils.constants import (
+    MSG_SUCCESS_TITLE, MSG_WARNING_TITLE, EXTRACT_WORKERS, MAX_CONCURRENT_JOBS, MERGE_STREAMING, MERGE_DEDUP,
+    INCREMENTAL_SAVE, MIRROR_FAST_PATH, RAW_COPY, MERGE_WORKERS, RESULT_CACHE, DROP_DUPLICATE_PAGES,
+)
 from utils.messages import get_msg
 
 class PdfProcessor:
-    def __init__(self, app):
+    def __init__(self, app, scheduler=None):
         self.app = app
+        # Общий ограниченный пул: повторные нажатия кнопок ставят задания в очередь,
+        # а не запускают новые потоки
+        self.scheduler = scheduler or JobScheduler(max_workers=MAX_CONCURRENT_JOBS)
+        # Репортеры прогресса задания, выполняемого в текущем потоке планировщика
+        self._local = threading.local()
 
-    def _execute_safe(self, task_func, success_msg_key, *args):
+    def _execute_safe(self, task_func, success_msg_key, *args, token=None, trace_name="job"):
         """
-        Универсальная обертка для выполнения бизнес-логики в потоке.
+        Универсальная обертка для выполнения бизнес-логики в пуле планировщика.
         Обеспечивает валидацию, обработку ошибок и сброс прогресс-бара.
+        Возвращает идентификатор задания; token — токен отмены, который проверяет task_func.
+        trace_name — имя корневого события задания в трассировке.
         """
         def worker():
             try:
                 # Включаем индикатор ожидания (0/100), если максимум не задан явно
                 self.app.root.after(0, lambda: self.app.update_progress(0, 100))
+                self._local.reporters = []
                 
                 # Выполнение основной логики
-                task_func(*args)
+                with span(trace_name):
+                    task_func(*args)
+                # Последний срез прогресса мог быть отброшен ограничением частоты
+                for reporter in self._local.reporters:
+                    reporter.finish()
                 
                 # Уведомление об успехе
                 self.app.safe_message("info", MSG_SUCCESS_TITLE, success_msg_key)
+            except OperationCancelled as e:
+                self.app.safe_message("warning", MSG_WARNING_TITLE, str(e))
+                raise
             except Exception as e:
                 self.app.safe_message("error", "Ошибка", str(e))
+                # Пробрасываем дальше, чтобы планировщик отметил задание как failed
+                raise
             finally:
                 # Гарантированный сброс прогресса 
                 self.app.update_progress(0)
                 
-        run_in_thread(worker, ())
+        return self.scheduler.submit(worker, token=token)
+
+    def _load_reader(self, path):
+        """
+        Открывает и разбирает исходный файл (вызывается кэшем ридеров при промахе).
+        Повторяет reader_cache.load_reader, но через имена этого модуля, которые подменяют тесты.
+        """
+        f_stream = open(path, "rb")
+        try:
+            return get_reader(map_stream(f_stream)), f_stream
+        except BaseException:
+            # Иначе файл останется открытым (в Windows — заблокированным) до сборки мусора
+            f_stream.close()
+            raise
+
+    def _reporter(self, total, unit, sources=()):
+        """Прогресс с ограничением частоты: в UI уходит не более PROGRESS_MAX_RATE_HZ срезов в секунду."""
+        total_bytes = 0
+        for path in sources:
+            try:
+                total_bytes += os.path.getsize(path)
+            except OSError:
+                pass
+        reporter = ProgressReporter(self.app.update_progress_snapshot, total=total, unit=unit,
+                                    total_bytes=total_bytes or None)
+        reporters = getattr(self._local, "reporters", None)
+        if reporters is not None:
+            reporters.append(reporter)
+        return reporter
+
+    def job_status(self, job_id):
+        """Статус задания: queued, running, done, failed или cancelled."""
+        return self.scheduler.status(job_id)
+
+    def cancel(self, job_id):
+        """Отменяет задание. Возвращает False, если оно уже завершилось."""
+        return self.scheduler.cancel(job_id)
+
+    def cancel_all(self):
+        """Отменяет все ожидающие и выполняющиеся задания."""
+        for job_id in self.scheduler.active_jobs():
+            self.scheduler.cancel(job_id)
+
+    def shutdown(self, wait=True):
+        """Завершает работу: снимает не начатые задания и дожидается текущих."""
+        self.scheduler.shutdown(wait=wait, cancel_pending=True)
 
     def process_extraction(self, src, dest, configs):
+        token = CancellationToken()
         def task(s, d, c):
             validate_file_exists(s)
             self.app.update_progress(0, len(c))
-            with open(s, "rb") as f_stream:
-                reader = get_reader(f_stream)
-                extract_logic(reader, d, c, self.app.update_progress)
+
+            def compute():
+                with reader_cache.lease(s, self._load_reader) as reader:
+                    return extract_logic(reader, d, c, self._reporter(len(c), "блок.", [s]), workers=EXTRACT_WORKERS,
+                                         source=s, cancel_token=token, raw_copy=RAW_COPY,
+                                         drop_duplicates=DROP_DUPLICATE_PAGES)
+
+            params = extract_params(c, RAW_COPY, DROP_DUPLICATE_PAGES)
+            run_cached(RESULT_CACHE, "extract", s, params, extract_targets(d, c), compute)
             
-        self._execute_safe(task, f"Создано файлов: {len(configs)}", src, dest, configs)
+        return self._execute_safe(task, f"Создано файлов: {len(configs)}", src, dest, configs, token=token,
+                                  trace_name="job:extract")
+
+    def process_split(self, src, dest, pages_per_file=None, max_mb=None):
+        """Делит файл на части по pages_per_file страниц или примерно до max_mb МБ."""
+        token = CancellationToken()
+        def task(s, d):
+            validate_file_exists(s)
+            with reader_cache.lease(s, self._load_reader) as reader:
+                total_pages = len(reader.pages)
+                self.app.update_progress(0, total_pages)
+                base_name = os.path.splitext(os.path.basename(s))[0]
+                max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+                split_logic(reader, d, base_name, self._reporter(total_pages, "стр.", [s]),
+                            pages_per_file=pages_per_file, max_bytes=max_bytes, cancel_token=token,
+                            raw_copy=RAW_COPY)
+
+        return self._execute_safe(task, get_msg("msg_split_success"), src, dest, token=token,
+                                  trace_name="job:split")
 
     def process_merge(self, src, out_path):
+        token = CancellationToken()
         def task(f_list, out):
             if not f_list or len(f_list) < 2:
                 raise ValueError(get_msg("err_merge_required"))
             for f in f_list: 
                 validate_file_exists(f)
             self.app.update_progress(0, len(f_list))
-            merge_logic(f_list, out, self.app.update_progress)
+            merge_logic(f_list, out, self._reporter(len(f_list), "файл.", f_list), cancel_token=token,
+                        streaming=MERGE_STREAMING, dedup=MERGE_DEDUP, workers=MERGE_WORKERS,
+                        drop_duplicates=DROP_DUPLICATE_PAGES)
             
-        self._execute_safe(task, "Файлы успешно склеены.", src, out_path)
+        return self._execute_safe(task, "Файлы успешно склеены.", src, out_path, token=token,
+                                  trace_name="job:merge")
 
     def process_editor(self, src, out_path, query):
+        token = CancellationToken()
         def task(s, o, q):
             validate_file_exists(s)
-            with open(s, "rb") as f_stream:
-                reader = get_reader(f_stream)
-                editor_logic(reader, o, q, lambda v: self.app.update_progress(v, None))
+
+            def compute():
+                with reader_cache.lease(s, self._load_reader) as reader:
+                    reporter = self._reporter(len(reader.pages), "стр.", [s])
+                    return editor_logic(reader, o, q, reporter, cancel_token=token, incremental=INCREMENTAL_SAVE,
+                                        source=s, raw_copy=RAW_COPY)
+
+            params = {"pages": normalize_query(q), "incremental": INCREMENTAL_SAVE, "raw_copy": RAW_COPY}
+            run_cached(RESULT_CACHE, "edit", s, params, [o], compute)
             
-        self._execute_safe(task, "Новый файл успешно создан.", src, out_path, query)
+        return self._execute_safe(task, "Новый файл успешно создан.", src, out_path, query, token=token,
+                                  trace_name="job:edit")
 
     def process_reverse(self, src, out_path):
         """Создает PDF с полностью обратным порядком страниц."""
+        token = CancellationToken()
         def task(s, o):
             validate_file_exists(s)
-            with open(s, "rb") as f_stream:
-                reader = get_reader(f_stream)
-                total_pages = len(reader.pages)
-                query = f"{total_pages}-1" if total_pages > 1 else "1"
-                # Используем существующую логику редактора для применения реверса
-                editor_logic(reader, o, query, lambda v: self.app.update_progress(v, None))
+
+            def compute():
+                with reader_cache.lease(s, self._load_reader) as reader:
+                    total_pages = len(reader.pages)
+                    query = reverse_query(total_pages)
+                    # Используем существующую логику редактора для применения реверса
+                    return editor_logic(reader, o, query, self._reporter(total_pages, "стр.", [s]),
+                                        cancel_token=token, incremental=INCREMENTAL_SAVE, source=s,
+                                        raw_copy=RAW_COPY)
+
+            params = {"incremental": INCREMENTAL_SAVE, "raw_copy": RAW_COPY}
+            run_cached(RESULT_CACHE, "reverse", s, params, [o], compute)
         
-        self._execute_safe(task, "Файл успешно реверсирован.", src, out_path)
+        return self._execute_safe(task, "Файл успешно реверсирован.", src, out_path, token=token,
+                                  trace_name="job:reverse")
 
     def process_transform(self, src, out_path, query, action_type, value):
+        token = CancellationToken()
         def task(s, o, q, at, v):
             validate_file_exists(s)
-            with open(s, "rb") as f_stream:
-                reader = get_reader(f_stream)
-                self.app.update_progress(0, len(reader.pages))
-                rotate_mirror_logic(reader, o, q, at, v, self.app.update_progress)
+
+            def compute():
+                # Поворот и отражение меняют объекты страниц ридера на месте
+                with reader_cache.lease(s, self._load_reader, mutates=True) as reader:
+                    self.app.update_progress(0, len(reader.pages))
+                    return rotate_mirror_logic(reader, o, q, at, v, self._reporter(len(reader.pages), "стр.", [s]),
+                                               cancel_token=token, incremental=INCREMENTAL_SAVE, source=s,
+                                               fast_mirror=MIRROR_FAST_PATH)
+
+            params = {"pages": normalize_query(q, ordered=False), "action": at, "value": str(v),
+                      "incremental": INCREMENTAL_SAVE, "fast_mirror": MIRROR_FAST_PATH}
+            run_cached(RESULT_CACHE, "transform", s, params, [o], compute)
             
-        self._execute_safe(task, "Файл успешно трансформирован.", src, out_path, query, action_type, value)
\ No newline at end of file
+        return self._execute_safe(task, "Файл успешно трансформирован.", src, out_path, query, action_type, value,
+                                  token=token, trace_name="job:transform")
\ No newline at end of file
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import namedtuple
+from utils.constants import PROGRESS_MAX_RATE_HZ
+
+# Согласованный срез состояния прогресса, который получает UI.
+# rate — единиц в секунду (unit: страницы, блоки или файлы), eta — секунд до конца или None.
+ProgressSnapshot = namedtuple(
+    "ProgressSnapshot", "done total unit rate bytes_done bytes_per_sec eta elapsed"
+)
+
+
+class ProgressReporter:
+    """
+    Прослойка между операциями ядра и UI: принимает обновления с любой частотой,
+    а в sink передает не чаще max_rate_hz раз в секунду (плюс обязательный финальный срез).
+    Совместима с сигнатурой progress_cb(value) операций из core.operations.
+    """
+    def __init__(self, sink, total=None, unit="стр.", total_bytes=None,
+                 max_rate_hz=PROGRESS_MAX_RATE_HZ, clock=time.monotonic):
+        self.sink = sink
+        self.total = total
+        self.unit = unit
+        self.total_bytes = total_bytes
+        self.min_interval = 1.0 / max_rate_hz if max_rate_hz else 0.0
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._started = clock()
+        self._last_emit = None
+        self._done = 0
+        self._bytes_done = None
+        self.emitted = 0
+
+    def __call__(self, value, maximum=None):
+        if maximum is not None:
+            self.total = maximum
+        self.update(value)
+
+    def update(self, done, bytes_done=None):
+        """Регистрирует прогресс; в sink уходит только каждое достаточно «позднее» обновление."""
+        with self._lock:
+            self._done = done
+            if bytes_done is not None:
+                self._bytes_done = bytes_done
+            now = self.clock()
+            finished = self.total is not None and done >= self.total
+            if not finished and self._last_emit is not None and now - self._last_emit < self.min_interval:
+                return
+            self._last_emit = now
+            snapshot = self._snapshot(now)
+        self._emit(snapshot)
+
+    def finish(self):
+        """Принудительно отправляет последний срез (например, по завершении операции)."""
+        with self._lock:
+            self._last_emit = self.clock()
+            snapshot = self._snapshot(self._last_emit)
+        self._emit(snapshot)
+
+    def snapshot(self):
+        with self._lock:
+            return self._snapshot(self.clock())
+
+    def _snapshot(self, now):
+        elapsed = max(now - self._started, 0.0)
+        done = self._done
+        rate = done / elapsed if elapsed > 0 else 0.0
+
+        bytes_done = self._bytes_done
+        if bytes_done is None and self.total_bytes and self.total:
+            # Байты не сообщаются операцией — оцениваем пропорционально доле выполненной работы
+            bytes_done = int(self.total_bytes * min(done, self.total) / self.total)
+        bytes_per_sec = bytes_done / elapsed if bytes_done is not None and elapsed > 0 else None
+
+        eta = None
+        if self.total is not None and rate > 0:
+            eta = max(self.total - done, 0) / rate
+        return ProgressSnapshot(done, self.total, self.unit, rate, bytes_done, bytes_per_sec, eta, elapsed)
+
+    def _emit(self, snapshot):
+        self.emitted += 1
+        self.sink(snapshot)
+
+
+def format_snapshot(snapshot):
+    """Короткая строка состояния для UI: «120/500 стр. · 35.1 стр./с · 4.2 МБ/с · осталось 0:11»."""
+    parts = []
+    if snapshot.total:
+        parts.append(f"{snapshot.done}/{snapshot.total} {snapshot.unit}")
+    else:
+        parts.append(f"{snapshot.done} {snapshot.unit}")
+    if snapshot.rate:
+        parts.append(f"{snapshot.rate:.1f} {snapshot.unit}/с")
+    if snapshot.bytes_per_sec:
+        parts.append(f"{snapshot.bytes_per_sec / (1024 * 1024):.1f} МБ/с")
+    if snapshot.eta is not None and snapshot.total and snapshot.done < snapshot.total:
+        minutes, seconds = divmod(int(round(snapshot.eta)), 60)
+        parts.append(f"осталось {minutes}:{seconds:02d}")
+    return " · ".join(parts)
@@ -0,0 +1,270 @@
+import io
+import mmap
+import re
+from pypdf.generic import IndirectObject
+from core.io_handler import MappedStream
+
+# Лексемы PDF: пробелы и комментарии, скобки словарей и массивов, имена, hex-строки, слова
+# (числа и ключевые слова). Литеральные строки (...) разбираются вручную из-за вложенности.
+_TOKEN = re.compile(rb"""
+    (?P<ws>[\x00\t\n\x0c\r ]+|%[^\r\n]*)
+   |(?P<open><<|\[)
+   |(?P<close>>>|\])
+   |(?P<name>/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)
+   |(?P<hex><[0-9A-Fa-f\x00\t\n\x0c\r ]*>)
+   |(?P<string>\()
+   |(?P<word>[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)
+""", re.X)
+_INT = re.compile(rb"[+-]?\d+\Z")
+_HEADER = re.compile(rb"[\x00\t\n\x0c\r ]*(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+obj")
+_ENDSTREAM = re.compile(rb"[\x00\t\n\x0c\r ]*endstream")
+
+# Объекты структуры документа: их копирует StreamingPdfWriter по своим правилам
+_SKIPPED_TYPES = (b"/Page", b"/Pages", b"/Catalog")
+
+
+class _Body:
+    """Результат разбора тела объекта: ссылки, /Type и /Length верхнего словаря, конец тела."""
+    __slots__ = ("refs", "type", "length", "end", "stream")
+
+    def __init__(self):
+        self.refs = []      # (начало, конец, номер, поколение) каждой ссылки "N G R"
+        self.type = None
+        self.length = None  # int или (номер, поколение)
+        self.end = None     # позиция ключевого слова stream/endobj
+        self.stream = False
+
+
+def _skip_string(data, pos):
+    """Позиция сразу за литеральной строкой, начинающейся с '(' в pos."""
+    depth = 0
+    size = len(data)
+    while pos < size:
+        c = data[pos]
+        if c == 0x5C:  # обратная косая черта экранирует следующий байт
+            pos += 2
+            continue
+        if c == 0x28:
+            depth += 1
+        elif c == 0x29:
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    return None
+
+
+def scan_body(data, pos):
+    """
+    Разбирает тело косвенного объекта от pos до ключевого слова stream или endobj,
+    не создавая объектов pypdf. Возвращает _Body или None, если тело не распознано.
+    """
+    body = _Body()
+    depth = 0
+    ints = []        # подряд идущие целые: (значение, начало) — кандидаты в "N G R"
+    key = None       # текущий ключ верхнего словаря
+    value = []       # целые значения текущего ключа (число или начало ссылки)
+    size = len(data)
+    while pos < size:
+        m = _TOKEN.match(data, pos)
+        if m is None:
+            return None
+        kind = m.lastgroup
+        start, pos = m.start(), m.end()
+        if kind == "ws":
+            continue
+        if kind == "string":
+            pos = _skip_string(data, start)
+            if pos is None:
+                return None
+        token = m.group()
+
+        if kind == "word" and token == b"R" and len(ints) >= 2:
+            (num, num_pos), (gen, _) = ints[-2], ints[-1]
+            body.refs.append((num_pos, pos, num, gen))
+            ints = []
+            if depth == 1 and key is not None and len(value) == 2:
+                if key == b"/Length":
+                    body.length = (num, gen)
+                key, value = None, []
+            continue
+        if kind == "word" and _INT.match(token):
+            ints.append((int(token), start))
+            if depth == 1 and key is not None:
+                value.append(int(token))
+            continue
+        ints = []
+
+        if kind == "word" and token in (b"stream", b"endobj", b"obj", b"endstream"):
+            if depth != 0 or token in (b"obj", b"endstream"):
+                return None
+            if key is not None and len(value) == 1 and key == b"/Length":
+                body.length = value[0]
+            body.end = start
+            body.stream = token == b"stream"
+            return body
+
+        if depth == 1:
+            if key is not None and value:
+                # Перед новым ключом стояло число — это значение предыдущего ключа
+                if key == b"/Length" and len(value) == 1:
+                    body.length = value[0]
+                key, value = None, []
+            if key is None and kind == "name":
+                key = token
+                continue
+            if key is not None and kind != "open" and kind != "close":
+                if key == b"/Type" and kind == "name":
+                    body.type = token
+                key = None
+        if kind == "open":
+            depth += 1
+        elif kind == "close":
+            depth -= 1
+            if depth < 0:
+                return None
+            if depth == 1:
+                key = None
+    return None
+
+
+class RawObjectCopier:
+    """
+    Копирование косвенных объектов исходного файла байтами, без разбора в объекты pypdf.
+    Тело объекта переносится как есть, в нем только переписываются ссылки "N G R";
+    данные потоков копируются срезом исходного файла без распаковки.
+    Объекты из потоков объектов (xref-потоки PDF 1.5), поврежденные объекты и страницы
+    не копируются (copy возвращает False) — их записывает обычный путь через pypdf.
+    """
+    skipped_types = _SKIPPED_TYPES
+
+    def __init__(self, reader, data, owned=None):
+        self.reader = reader
+        self.data = data
+        self._owned = owned
+        self.copied = 0
+        self.copied_bytes = 0
+
+    def _offset(self, num, gen):
+        if num in getattr(self.reader, "xref_objStm", {}):
+            return None
+        return self.reader.xref.get(gen, {}).get(num)
+
+    def _stream_length(self, length):
+        if isinstance(length, tuple):
+            try:
+                length = self.reader.get_object(IndirectObject(length[0], length[1], self.reader))
+            except Exception:
+                return None
+        try:
+            return int(length)
+        except (TypeError, ValueError):
+            return None
+
+    def copy(self, ref, num, out, map_ref):
+        """
+        Записывает объект ref в out под номером num. map_ref(номер, поколение) возвращает
+        номер ссылки в выходном файле (и ставит объект в очередь копирования).
+        """
+        data = self.data
+        offset = self._offset(ref.idnum, ref.generation)
+        if offset is None:
+            return False
+        m = _HEADER.match(data, offset)
+        if m is None or int(m.group(1)) != ref.idnum or int(m.group(2)) != ref.generation:
+            return False
+        body = scan_body(data, m.end())
+        if body is None or body.type in self.skipped_types:
+            return False
+        stream_start = stream_end = None
+        if body.stream:
+            length = self._stream_length(body.length)
+            if length is None:
+                return False
+            stream_start = body.end + len(b"stream")
+            if data[stream_start:stream_start + 2] == b"\r\n":
+                stream_start += 2
+            elif data[stream_start:stream_start + 1] in (b"\n", b"\r"):
+                stream_start += 1
+            stream_end = stream_start + length
+            # Неверная /Length — объект уходит на обычный путь
+            if _ENDSTREAM.match(data, stream_end) is None:
+                return False
+
+        start = out.pos
+        out.write(f"{num} 0 obj".encode())
+        pos = m.end()
+        for ref_start, ref_end, ref_num, ref_gen in body.refs:
+            out.write(data[pos:ref_start])
+            out.write(f"{map_ref(ref_num, ref_gen)} 0 R".encode())
+            pos = ref_end
+        out.write(data[pos:body.end])
+        if body.stream:
+            out.write(b"stream\n")
+            out.write(data[stream_start:stream_end])
+            out.write(b"\nendstream")
+        out.write(b"\nendobj\n")
+        self.copied += 1
+        self.copied_bytes += out.pos - start
+        return True
+
+    def close(self):
+        if isinstance(self._owned, memoryview):
+            self._owned.release()
+        elif self._owned is not None:
+            self._owned.close()
+        self._owned = None
+
+
+class WrittenFileCopier(RawObjectCopier):
+    """
+    Копировщик для файла, записанного StreamingPdfWriter: таблица xref и /Length всегда
+    прямые, поэтому pypdf не нужен совсем. Страницы копируются тоже.
+    """
+    skipped_types = ()
+
+    def __init__(self, data, offsets):
+        super().__init__(None, data)
+        self.offsets = offsets
+
+    def _offset(self, num, gen):
+        return self.offsets[num] if gen == 0 and 0 < num < len(self.offsets) else None
+
+    def _stream_length(self, length):
+        return length if isinstance(length, int) else None
+
+
+def read_written_xref(data):
+    """Смещения объектов (индекс — номер объекта) по классической таблице xref в конце файла."""
+    tail = max(0, len(data) - 1024)
+    pos = bytes(data[tail:]).rfind(b"startxref")
+    if pos < 0:
+        raise ValueError("startxref не найден")
+    xref_pos = int(bytes(data[tail + pos + 9:]).split()[0])
+    header = bytes(data[xref_pos:xref_pos + 64]).split(b"\n", 2)
+    if header[0].strip() != b"xref":
+        raise ValueError("Ожидалась таблица xref")
+    first, count = (int(v) for v in header[1].split())
+    start = xref_pos + len(header[0]) + len(header[1]) + 2
+    table = bytes(data[start:start + 20 * count])
+    return [int(table[i * 20:i * 20 + 10]) for i in range(count)]
+
+
+def raw_copier(reader):
+    """
+    Копировщик для ридера или None, если байты исходного файла недоступны
+    или файл зашифрован (строки и потоки зашифрованы ключом от номера объекта).
+    """
+    if reader.is_encrypted:
+        return None
+    stream = reader.stream
+    if isinstance(stream, MappedStream):
+        return RawObjectCopier(reader, stream.source.view)
+    if isinstance(stream, io.BytesIO):
+        view = stream.getbuffer()
+        return RawObjectCopier(reader, view, owned=view)
+    try:
+        mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        return None
+    return RawObjectCopier(reader, mapped, owned=mapped)
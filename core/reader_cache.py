@@ -0,0 +1,173 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from core.io_handler import get_reader, map_stream
+from utils.constants import READER_CACHE_BUDGET_MB, READER_CACHE_MAX_ENTRIES
+
+
+def load_reader(path):
+    """Загрузчик по умолчанию: ридер поверх отображения файла и объект, который нужно закрыть."""
+    f_stream = open(path, "rb")
+    try:
+        return get_reader(map_stream(f_stream)), f_stream
+    except BaseException:
+        f_stream.close()
+        raise
+
+
+def file_identity(path):
+    """Ключ кэша (путь, размер, mtime, inode) или None, если файл недоступен."""
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return (os.path.realpath(path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+def reset_object_cache(reader):
+    """
+    Сбрасывает разобранные объекты ридера (страницы, словари), сохраняя таблицу xref.
+    Нужен после операций, которые меняют объекты страниц на месте (поворот, отражение).
+    """
+    reader.resolved_objects.clear()
+    reader.flattened_pages = None
+    if hasattr(reader, "_page_id2num"):
+        reader._page_id2num = None
+
+
+class _Entry:
+    def __init__(self, key, reader, closeable):
+        self.key = key
+        self.reader = reader
+        self.closeable = closeable
+        self.size = key[1]
+        self.lock = threading.Lock()
+        self.users = 0
+        self.evicted = False
+
+    def close(self):
+        if self.closeable is not None:
+            self.closeable.close()
+            self.closeable = None
+
+
+class ReaderCache:
+    """
+    Процессный LRU-кэш разобранных PdfReader.
+    Ключ — идентичность файла (путь, размер, mtime, inode): изменение файла на диске
+    делает запись недействительной. Бюджет памяти считается по размеру исходных файлов.
+    Ридер выдается в монопольное пользование на время lease(): PdfReader не потокобезопасен.
+    """
+    def __init__(self, budget_bytes, max_entries):
+        self.budget_bytes = budget_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # realpath -> _Entry (в порядке последнего использования)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def total_bytes(self):
+        return sum(e.size for e in self._entries.values())
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self.total_bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions, "invalidations": self.invalidations}
+
+    @contextmanager
+    def lease(self, path, loader=load_reader, mutates=False):
+        """
+        Контекст с ридером файла path. loader(path) -> (reader, closeable) вызывается при промахе.
+        mutates=True — операция меняет объекты страниц, после нее кэш объектов ридера сбрасывается.
+        Файлы, которые нельзя идентифицировать (нет stat), читаются без кэширования.
+        """
+        key = file_identity(path)
+        if key is None:
+            reader, closeable = loader(path)
+            try:
+                yield reader
+            finally:
+                if closeable is not None:
+                    closeable.close()
+            return
+
+        entry = self._acquire(key, path, loader)
+        try:
+            with entry.lock:
+                try:
+                    yield entry.reader
+                finally:
+                    if mutates:
+                        reset_object_cache(entry.reader)
+        finally:
+            self._release(entry)
+
+    def _acquire(self, key, path, loader):
+        with self._lock:
+            entry = self._entries.get(key[0])
+            if entry is not None and entry.key != key:
+                # Файл изменился на диске
+                self._drop(entry)
+                self.invalidations += 1
+                entry = None
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key[0])
+                entry.users += 1
+                return entry
+            self.misses += 1
+
+        # Разбор файла выполняется без глобальной блокировки
+        reader, closeable = loader(path)
+        entry = _Entry(key, reader, closeable)
+        with self._lock:
+            current = self._entries.get(key[0])
+            if current is not None:
+                self._drop(current)
+            entry.users += 1
+            if entry.size <= self.budget_bytes:
+                self._entries[key[0]] = entry
+                self._evict_over_budget()
+            else:
+                # Файл больше всего бюджета — используем один раз, не кэшируя
+                entry.evicted = True
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.users -= 1
+            if entry.evicted and entry.users == 0:
+                entry.close()
+
+    def _drop(self, entry):
+        """Удаляет запись; закрытие откладывается, пока ридером кто-то пользуется."""
+        self._entries.pop(entry.key[0], None)
+        entry.evicted = True
+        if entry.users == 0:
+            entry.close()
+
+    def _evict_over_budget(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.total_bytes > self.budget_bytes):
+            _, oldest = next(iter(self._entries.items()))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, path=None):
+        """Удаляет запись для path (или все записи, если path не указан)."""
+        with self._lock:
+            if path is None:
+                targets = list(self._entries.values())
+            else:
+                entry = self._entries.get(os.path.realpath(path))
+                targets = [entry] if entry else []
+            for entry in targets:
+                self._drop(entry)
+                self.invalidations += 1
+
+
+# Общий кэш процесса (GUI-вкладки и задания CLI в одном процессе)
+reader_cache = ReaderCache(READER_CACHE_BUDGET_MB * 1024 * 1024, READER_CACHE_MAX_ENTRIES)
@@ -0,0 +1,330 @@
+"""
+Кэш результатов операций на диске с адресацией по содержимому.
+
+Ключ — SHA-256 от (SHA-256 содержимого исходного файла, операция, нормализованный запрос,
+параметры). Повтор той же операции над тем же файлом отдает готовые файлы жесткой ссылкой
+(или копией, если ссылка невозможна) вместо пересборки. Если результат уже лежит под
+запрошенным именем (та же ссылка), он возвращается как есть, без нового файла _1, _2.
+
+Запись кэша — папка <корень>/<2 символа ключа>/<ключ>/ с файлами 0.pdf, 1.pdf, ... и meta.json.
+Размер кэша ограничен; при превышении удаляются записи, которые дольше всего не использовались
+(время использования — mtime файла meta.json, поэтому порядок общий для всех процессов).
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from core.io_handler import atomic_output, clean_filename, get_safe_unique_path
+from core.name_allocator import name_allocator
+from core.reader_cache import file_identity
+from core.tracing import span
+from utils.constants import RESULT_CACHE_DIR, RESULT_CACHE_MAX_MB
+
+# Версия формата ключа: меняется, если меняется смысл параметров операций
+CACHE_VERSION = 1
+HASH_CHUNK = 1024 * 1024
+_META = "meta.json"
+# Сколько хешей исходных файлов помнится в процессе
+_DIGEST_MEMO_SIZE = 256
+
+
+def normalize_query(query, ordered=True):
+    """
+    Каноническая запись строки страниц: '1,2,3, 5' и '1-3,5' дают одно и то же.
+    ordered=False — порядок и повторы не важны (поворот, исключение): страницы объединяются.
+    Некорректная строка возвращается как есть — ее отвергнет сама операция.
+    """
+    spans = []
+    for part in str(query).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        nums = [x.strip() for x in part.split("-")]
+        if len(nums) > 2 or not all(x.isdigit() for x in nums):
+            return str(query).strip()
+        start, end = int(nums[0]), int(nums[-1])
+        spans.append((start, end))
+    if not ordered:
+        merged = []
+        for a, b in sorted((min(s), max(s)) for s in spans):
+            if merged and a <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(b, merged[-1][1]))
+            else:
+                merged.append((a, b))
+        spans = merged
+    else:
+        # Соседние диапазоны одного направления склеиваются: 1,2,3 -> 1-3, 5-4,3 -> 5-3
+        merged = []
+        for a, b in spans:
+            if merged:
+                pa, pb = merged[-1]
+                step = a - pb
+                if abs(step) == 1 and (pb - pa) * step >= 0 and (b - a) * step >= 0:
+                    merged[-1] = (pa, b)
+                    continue
+            merged.append((a, b))
+        spans = merged
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in spans)
+
+
+def extract_params(configs, raw_copy, drop_duplicates=False):
+    """Параметры ключа извлечения и пути результатов не зависят от имен блоков."""
+    blocks = []
+    for pages, _, *rest in configs:
+        exclude = bool(rest[0]) if rest else False
+        blocks.append([normalize_query(pages, ordered=not exclude), exclude])
+    return {"blocks": blocks, "raw_copy": raw_copy, "drop_duplicates": drop_duplicates}
+
+
+def extract_targets(dest, configs):
+    return [os.path.join(dest, name) for _, name, *_ in configs]
+
+
+def file_digest(path):
+    """SHA-256 содержимого файла (hex)."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ResultCache:
+    """
+    Потокобезопасный кэш результатов. Папка создается при первой записи.
+    link=False — отдавать и сохранять копии вместо жестких ссылок.
+    """
+    def __init__(self, root=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024, link=True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.link = link
+        self._lock = threading.Lock()
+        self._digests = {}   # file_identity -> SHA-256 содержимого
+        self._total = None   # оценка размера кэша; None — еще не посчитан
+        self.hits = 0
+        self.misses = 0
+
+    def source_digest(self, path):
+        """SHA-256 содержимого файла; повторно для неизмененного файла не считается."""
+        identity = file_identity(path)
+        with self._lock:
+            digest = self._digests.get(identity)
+        if digest is not None:
+            return digest
+        with span("cache_hash", bytes=identity[1] if identity else 0):
+            digest = file_digest(path)
+        with self._lock:
+            if len(self._digests) >= _DIGEST_MEMO_SIZE:
+                self._digests.pop(next(iter(self._digests)))
+            self._digests[identity] = digest
+        return digest
+
+    def key(self, source, op, params):
+        payload = json.dumps({"v": CACHE_VERSION, "src": self.source_digest(source), "op": op,
+                              "params": params}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _place(self, src, dst):
+        """Жесткая ссылка src -> dst (dst не должен существовать), иначе копия."""
+        if self.link:
+            try:
+                os.link(src, dst)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(src, dst)
+
+    def get(self, key, targets):
+        """
+        Выдает результаты записи key по путям targets (папка + запрошенное имя) или None.
+        Возвращает {"pages": ..., "outputs": [...], "cached": True}.
+        """
+        entry = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry, _META), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            self._miss()
+            return None
+        files = [os.path.join(entry, f"{i}.pdf") for i in range(len(meta["files"]))]
+        if len(files) != len(targets) or not self._intact(files, meta["files"]):
+            # Файл кэша изменили на месте (через жесткую ссылку) — запись больше не верна
+            self._drop(entry)
+            self._miss()
+            return None
+        with span("cache_hit") as sp:
+            outputs = [self._materialize(cached, target) for cached, target in zip(files, targets)]
+            sp.add(files=len(outputs))
+        try:
+            os.utime(os.path.join(entry, _META))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        result = dict(meta["result"])
+        result.update(outputs=outputs, cached=True)
+        return result
+
+    def _miss(self):
+        with self._lock:
+            self.misses += 1
+
+    @staticmethod
+    def _intact(files, expected):
+        for path, (size, mtime_ns) in zip(files, expected):
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns):
+                return False
+        return True
+
+    def _materialize(self, cached, target):
+        directory, name = os.path.split(target)
+        natural = os.path.join(directory, clean_filename(name))
+        try:
+            if os.path.samefile(natural, cached):
+                return natural
+        except OSError:
+            pass
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        final_path = get_safe_unique_path(directory, name)
+        if self.link:
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(final_path)}.", suffix=".part",
+                                            dir=directory or ".")
+            os.close(fd)
+            os.remove(tmp_path)
+            try:
+                os.link(cached, tmp_path)
+            except OSError:
+                pass
+            else:
+                os.replace(tmp_path, final_path)
+                name_allocator.commit(final_path)
+                return final_path
+        with atomic_output(final_path) as f_out, open(cached, "rb") as f_in:
+            shutil.copyfileobj(f_in, f_out, HASH_CHUNK)
+        return final_path
+
+    def put(self, key, result):
+        """Сохраняет результаты операции (ключ "outputs") под ключом key."""
+        outputs = list(result.get("outputs") or [])
+        if not outputs:
+            return
+        entry = self._entry_dir(key)
+        if os.path.exists(entry):
+            return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=os.path.dirname(entry))
+        try:
+            files, total = [], 0
+            for i, path in enumerate(outputs):
+                cached = os.path.join(tmp_dir, f"{i}.pdf")
+                self._place(path, cached)
+                st = os.stat(cached)
+                files.append([st.st_size, st.st_mtime_ns])
+                total += st.st_size
+            stored = {k: v for k, v in result.items() if k in ("pages",)}
+            with open(os.path.join(tmp_dir, _META), "w", encoding="utf-8") as f:
+                json.dump({"files": files, "bytes": total, "result": stored}, f)
+            try:
+                os.rename(tmp_dir, entry)
+            except OSError:
+                # Ту же запись успел сохранить другой процесс
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self._account(total)
+
+    def _account(self, added):
+        with self._lock:
+            if self._total is None:
+                self._total = sum(size for _, _, size in self._entries())
+            else:
+                self._total += added
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        """(время использования, папка, байты) всех записей на диске."""
+        entries = []
+        try:
+            shards = os.listdir(self.root)
+        except OSError:
+            return entries
+        for shard in shards:
+            shard_dir = os.path.join(self.root, shard)
+            try:
+                names = os.listdir(shard_dir)
+            except OSError:
+                continue
+            for name in names:
+                if name.startswith("."):
+                    continue
+                entry = os.path.join(shard_dir, name)
+                meta_path = os.path.join(entry, _META)
+                try:
+                    used = os.stat(meta_path).st_mtime_ns
+                    with open(meta_path, "r", encoding="utf-8") as f:
+                        size = json.load(f)["bytes"]
+                except (OSError, ValueError, KeyError):
+                    continue
+                entries.append((used, entry, size))
+        return entries
+
+    def _evict(self):
+        # Пересчет по диску: записи могли добавить и другие процессы
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, entry, size in entries:
+            if total <= self.max_bytes:
+                break
+            self._drop(entry)
+            total -= size
+        self._total = total
+
+    @staticmethod
+    def _drop(entry):
+        shutil.rmtree(entry, ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+        with self._lock:
+            self._total = 0
+
+    def run(self, op, source, params, targets, compute):
+        """
+        Результат операции из кэша или compute() с сохранением результата.
+        targets — пути результатов (папка + запрошенное имя) в порядке outputs операции.
+        """
+        key = self.key(source, op, params)
+        result = self.get(key, targets)
+        if result is not None:
+            return result
+        result = compute()
+        if isinstance(result, dict):
+            try:
+                self.put(key, result)
+            except OSError:
+                # Кэш — ускорение, а не условие успеха операции
+                pass
+        return result
+
+
+result_cache = ResultCache()
+
+
+def run_cached(enabled, op, source, params, targets, compute):
+    """compute() через общий кэш результатов, если enabled, иначе напрямую."""
+    if not enabled:
+        return compute()
+    return result_cache.run(op, source, params, targets, compute)
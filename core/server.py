@@ -0,0 +1,503 @@
+"""
+HTTP-сервис заданий на стандартной библиотеке (без Tkinter и сторонних пакетов).
+
+Запуск:
+    python -m core.cli serve --port 8765 --workers 4 --max-queue 64
+
+Маршруты:
+    POST   /files?name=scan.pdf  тело запроса — PDF; ответ {"path": ...} для ссылки в задании
+    POST   /jobs                 задание JSON в формате манифеста core.cli; ответ 202 {"id": ...}
+    GET    /jobs/<id>[?wait=5]   статус, результат или ошибка (wait — ждать завершения, секунд)
+    GET    /jobs/<id>/outputs/<n>  скачать n-й результат задания
+    DELETE /jobs/<id>            отменить задание
+    GET    /metrics[?format=json]  глубина очереди, перцентили задержки, страниц в секунду
+    GET    /health
+
+Задания выполняются ограниченным пулом JobScheduler; когда очередь заполнена, POST /jobs
+отвечает 429 с заголовком Retry-After. Если в задании нет пути результата (dest/out),
+результат пишется в рабочую папку сервиса. Когда сервис забывает старое задание
+(см. keep_finished), удаляются и его результаты в рабочей папке, и загрузки, на которые
+больше не ссылается ни одно задание; загрузки без заданий удаляются через upload_ttl секунд. Пути в заданиях не ограничиваются — сервис
+рассчитан на доверенную сеть и по умолчанию слушает только 127.0.0.1.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from core.io_handler import atomic_output, get_safe_unique_path
+from core.jobs import DIR_OUTPUT_OPS, JOB_HANDLERS, run_job
+from core.task_manager import (
+    JOB_CANCELLED, JOB_DONE, JOB_FAILED, CancellationToken, JobScheduler, QueueFullError,
+)
+from utils.constants import (
+    SERVER_HOST, SERVER_KEEP_FINISHED, SERVER_MAX_JOB_KB, SERVER_MAX_QUEUE, SERVER_MAX_UPLOAD_MB,
+    SERVER_PORT, SERVER_UPLOAD_TTL, SERVER_WORKERS,
+)
+
+# Окно, по которому считается скорость в страницах в секунду
+RATE_WINDOW_SECONDS = 60.0
+# Сколько последних длительностей хранится для перцентилей
+LATENCY_SAMPLES = 1024
+UPLOAD_CHUNK = 1024 * 1024
+# Предел ожидания в GET /jobs/<id>?wait=
+MAX_WAIT_SECONDS = 60.0
+_QUANTILES = (0.5, 0.9, 0.99)
+
+_JOB_PATH = re.compile(r"^/jobs/(\d+)$")
+_OUTPUT_PATH = re.compile(r"^/jobs/(\d+)/outputs/(\d+)$")
+
+
+class HttpError(Exception):
+    """Ошибка запроса с кодом ответа HTTP."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _percentile(ordered, q):
+    """Перцентиль по отсортированному списку (ближайший ранг)."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class ServiceMetrics:
+    """Счетчики сервиса, длительности последних заданий и скорость по скользящему окну."""
+    def __init__(self, window=RATE_WINDOW_SECONDS, clock=time.monotonic):
+        self.window = window
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started = clock()
+        self.counts = {"submitted": 0, "rejected": 0, JOB_DONE: 0, JOB_FAILED: 0, JOB_CANCELLED: 0}
+        self.pages_total = 0
+        self._latency = deque(maxlen=LATENCY_SAMPLES)  # от постановки в очередь до завершения
+        self._run = deque(maxlen=LATENCY_SAMPLES)      # только выполнение
+        self._pages = deque()                          # (время завершения, страницы)
+
+    def submitted(self):
+        with self._lock:
+            self.counts["submitted"] += 1
+
+    def rejected(self):
+        with self._lock:
+            self.counts["rejected"] += 1
+
+    def finished(self, status, latency, run_seconds, pages=0):
+        now = self._clock()
+        with self._lock:
+            self.counts[status] += 1
+            self._latency.append(latency)
+            if run_seconds is not None:
+                self._run.append(run_seconds)
+            if pages:
+                self.pages_total += pages
+                self._pages.append((now, pages))
+            self._trim(now)
+
+    def _trim(self, now):
+        while self._pages and self._pages[0][0] < now - self.window:
+            self._pages.popleft()
+
+    def pages_per_sec(self):
+        now = self._clock()
+        with self._lock:
+            self._trim(now)
+            pages = sum(p for _, p in self._pages)
+        # Пока сервис работает меньше окна, делим на фактическое время работы
+        span = min(self.window, max(now - self._started, 1e-9))
+        return pages / span
+
+    def snapshot(self):
+        with self._lock:
+            latency = sorted(self._latency)
+            run = sorted(self._run)
+            counts = dict(self.counts)
+            pages_total = self.pages_total
+        return {
+            "jobs": counts,
+            "pages_total": pages_total,
+            "pages_per_sec": round(self.pages_per_sec(), 3),
+            "latency_seconds": {str(q): round(_percentile(latency, q), 4) for q in _QUANTILES},
+            "run_seconds": {str(q): round(_percentile(run, q), 4) for q in _QUANTILES},
+        }
+
+
+class JobService:
+    """
+    Очередь заданий сервиса: прием, выполнение в JobScheduler, статус и метрики.
+    Не зависит от HTTP — обработчик запросов только переводит вызовы в ответы.
+    """
+    def __init__(self, workers=SERVER_WORKERS, max_queue=SERVER_MAX_QUEUE, work_dir=None,
+                 keep_finished=SERVER_KEEP_FINISHED, max_upload_mb=SERVER_MAX_UPLOAD_MB,
+                 max_job_kb=SERVER_MAX_JOB_KB, upload_ttl=SERVER_UPLOAD_TTL, clock=time.monotonic):
+        self.scheduler = JobScheduler(max_workers=workers, max_queue=max_queue, name="pdf-server")
+        self.metrics = ServiceMetrics()
+        self._own_dir = work_dir is None
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix="pdf-server-")
+        self.upload_dir = os.path.join(self.work_dir, "uploads")
+        self.results_dir = os.path.join(self.work_dir, "results")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.max_upload_bytes = int(max_upload_mb * 1024 * 1024)
+        self.max_job_bytes = int(max_job_kb * 1024)
+        self._upload_ttl = upload_ttl
+        self._clock = clock
+        self._finished = deque()
+        self._keep_finished = keep_finished
+        self._lock = threading.Lock()
+        self._owned = {}       # id задания -> (папка результатов сервиса или None, загрузки)
+        self._upload_refs = {}  # загрузка -> число незабытых заданий, которые на нее ссылаются
+        self._pending = {}      # загрузка без заданий -> время сохранения
+
+    def _uploads_of(self, job):
+        """Загрузки сервиса, на которые ссылается задание (src и files)."""
+        paths = list(job.get("files") or [])
+        if job.get("src"):
+            paths.append(job["src"])
+        root = os.path.join(os.path.realpath(self.upload_dir), "")
+        uploads = set()
+        for path in paths:
+            if isinstance(path, str):
+                real = os.path.realpath(path)
+                if real.startswith(root):
+                    uploads.add(real)
+        return uploads
+
+    def _prepare(self, job):
+        if not isinstance(job, dict):
+            raise HttpError(400, "Задание должно быть объектом JSON")
+        op = job.get("op")
+        if op not in JOB_HANDLERS:
+            raise HttpError(400, f"Неизвестная операция: {op}")
+        job = dict(job)
+        key = "dest" if op in DIR_OUTPUT_OPS else "out"
+        folder = None
+        if not job.get(key):
+            folder = os.path.join(self.results_dir, uuid.uuid4().hex[:12])
+            job[key] = folder if key == "dest" else os.path.join(folder, f"{op}.pdf")
+        return job, folder
+
+    def submit(self, job):
+        """Ставит задание в очередь и возвращает идентификатор; QueueFullError — очередь полна."""
+        job, folder = self._prepare(job)
+        token = CancellationToken()
+        ticket = {"submitted": time.monotonic(), "ready": threading.Event()}
+        try:
+            job_id = self.scheduler.submit(self._execute, (job, token, ticket), token=token)
+        except QueueFullError:
+            self.metrics.rejected()
+            raise
+        uploads = self._uploads_of(job)
+        with self._lock:
+            self._owned[job_id] = (folder, uploads)
+            for path in uploads:
+                self._upload_refs[path] = self._upload_refs.get(path, 0) + 1
+                self._pending.pop(path, None)
+        # Рабочий поток может взять задание раньше, чем submit вернет идентификатор
+        ticket["id"] = job_id
+        ticket["ready"].set()
+        self.metrics.submitted()
+        return job_id
+
+    def _execute(self, job, token, ticket):
+        started = time.monotonic()
+        status, pages = JOB_FAILED, 0
+        try:
+            result = run_job(job, cancel_token=token)
+            status, pages = JOB_DONE, (result or {}).get("pages", 0)
+            return result
+        except Exception:
+            status = JOB_CANCELLED if token.cancelled else JOB_FAILED
+            raise
+        finally:
+            now = time.monotonic()
+            self.metrics.finished(status, now - ticket["submitted"], now - started, pages)
+            ticket["ready"].wait()
+            self._remember(ticket["id"])
+
+    def _remember(self, job_id):
+        # Старые завершенные задания забываются вместе с их файлами,
+        # чтобы ни память, ни рабочая папка не росли с временем работы
+        garbage = []
+        with self._lock:
+            self._finished.append(job_id)
+            while len(self._finished) > self._keep_finished:
+                old = self._finished.popleft()
+                self.scheduler.forget(old)
+                garbage.extend(self._release(old))
+            garbage.extend(self._expired_uploads())
+        self._remove(garbage)
+
+    def _release(self, job_id):
+        """Файлы забытого задания, которые больше никому не нужны (под self._lock)."""
+        folder, uploads = self._owned.pop(job_id, (None, ()))
+        garbage = [folder] if folder else []
+        for path in uploads:
+            self._upload_refs[path] -= 1
+            if not self._upload_refs[path]:
+                del self._upload_refs[path]
+                garbage.append(path)
+        return garbage
+
+    def _expired_uploads(self):
+        """Загрузки, на которые за upload_ttl секунд не сослалось ни одно задание (под self._lock)."""
+        deadline = self._clock() - self._upload_ttl
+        expired = [path for path, stored in self._pending.items() if stored <= deadline]
+        for path in expired:
+            del self._pending[path]
+        return expired
+
+    @staticmethod
+    def _remove(paths):
+        for path in paths:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def cancel(self, job_id):
+        try:
+            cancelled = self.scheduler.cancel(job_id)
+        except KeyError:
+            raise HttpError(404, f"Задание {job_id} не найдено")
+        record = self.scheduler.get_job(job_id)
+        if cancelled and record is not None and record.started_at is None:
+            # Снятое с очереди задание не доходит до _execute
+            self.metrics.finished(JOB_CANCELLED, time.monotonic() - record.submitted_at, None)
+            self._remember(job_id)
+        return cancelled
+
+    def describe(self, job_id, wait=0.0):
+        """Состояние задания в виде словаря для ответа."""
+        record = self.scheduler.get_job(job_id)
+        if record is None:
+            raise HttpError(404, f"Задание {job_id} не найдено")
+        if wait > 0:
+            record.done.wait(min(wait, MAX_WAIT_SECONDS))
+        info = {"id": record.id, "status": record.status}
+        if record.started_at is not None:
+            info["queued_seconds"] = round(record.started_at - record.submitted_at, 4)
+        if record.finished_at is not None and record.started_at is not None:
+            info["seconds"] = round(record.finished_at - record.started_at, 4)
+        if record.status == JOB_DONE:
+            result = dict(record.result or {})
+            result["outputs"] = [os.path.normpath(p) for p in result.get("outputs", [])]
+            info["result"] = result
+        elif record.error is not None:
+            info["error"] = str(record.error) or type(record.error).__name__
+        return info
+
+    def output_path(self, job_id, index):
+        info = self.describe(job_id)
+        outputs = info.get("result", {}).get("outputs", [])
+        if not 0 <= index < len(outputs):
+            raise HttpError(404, f"У задания {job_id} нет результата {index}")
+        return outputs[index]
+
+    def store_upload(self, stream, length, name):
+        """Сохраняет тело запроса длиной length в папку загрузок и возвращает путь к файлу."""
+        if length > self.max_upload_bytes:
+            raise HttpError(413, f"Файл больше {self.max_upload_bytes // (1024 * 1024)} МБ")
+        with self._lock:
+            expired = self._expired_uploads()
+        self._remove(expired)
+        path = get_safe_unique_path(self.upload_dir, os.path.basename(name or "upload.pdf"))
+        remaining = length
+        with atomic_output(path) as f_out:
+            while remaining > 0:
+                chunk = stream.read(min(UPLOAD_CHUNK, remaining))
+                if not chunk:
+                    raise HttpError(400, "Тело запроса оборвалось")
+                f_out.write(chunk)
+                remaining -= len(chunk)
+        with self._lock:
+            self._pending[os.path.realpath(path)] = self._clock()
+        return path
+
+    def metrics_snapshot(self):
+        snap = self.metrics.snapshot()
+        snap["queue_depth"] = self.scheduler.queue_depth()
+        snap["running"] = self.scheduler.running_count()
+        snap["workers"] = self.scheduler.max_workers
+        snap["max_queue"] = self.scheduler.max_queue
+        return snap
+
+    def close(self, wait=True):
+        self.scheduler.shutdown(wait=wait, cancel_pending=True)
+        if self._own_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+
+def render_prometheus(snap):
+    """Метрики в текстовом формате Prometheus."""
+    lines = [
+        "# TYPE pdf_jobs_queue_depth gauge",
+        f"pdf_jobs_queue_depth {snap['queue_depth']}",
+        "# TYPE pdf_jobs_running gauge",
+        f"pdf_jobs_running {snap['running']}",
+        "# TYPE pdf_jobs_total counter",
+    ]
+    for status, count in sorted(snap["jobs"].items()):
+        lines.append(f'pdf_jobs_total{{status="{status}"}} {count}')
+    lines.append("# TYPE pdf_job_latency_seconds summary")
+    for q, value in snap["latency_seconds"].items():
+        lines.append(f'pdf_job_latency_seconds{{quantile="{q}"}} {value}')
+    lines.append("# TYPE pdf_job_run_seconds summary")
+    for q, value in snap["run_seconds"].items():
+        lines.append(f'pdf_job_run_seconds{{quantile="{q}"}} {value}')
+    lines += [
+        "# TYPE pdf_pages_total counter",
+        f"pdf_pages_total {snap['pages_total']}",
+        "# TYPE pdf_pages_per_second gauge",
+        f"pdf_pages_per_second {snap['pages_per_sec']}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов; сервис берется из self.server.service."""
+    server_version = "PdfMasterPro"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json; charset=utf-8", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _length(self):
+        try:
+            return int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise HttpError(411, "Нужен заголовок Content-Length")
+
+    def _dispatch(self, handler):
+        url = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            handler(url.path, query)
+        except HttpError as e:
+            # Непрочитанное тело запроса не дает продолжить соединение
+            self.close_connection = True
+            self._send(e.status, {"error": str(e)})
+        except QueueFullError as e:
+            self._send(429, {"error": str(e)}, headers={"Retry-After": "1"})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        except Exception as e:
+            self.close_connection = True
+            self._send(500, {"error": str(e) or type(e).__name__})
+
+    def do_GET(self):
+        self._dispatch(self._get)
+
+    def do_POST(self):
+        self._dispatch(self._post)
+
+    def do_DELETE(self):
+        self._dispatch(self._delete)
+
+    def _get(self, path, query):
+        if path == "/health":
+            return self._send(200, {"status": "ok"})
+        if path == "/metrics":
+            snap = self.service.metrics_snapshot()
+            if query.get("format") == "json":
+                return self._send(200, snap)
+            return self._send(200, render_prometheus(snap), "text/plain; version=0.0.4; charset=utf-8")
+        m = _JOB_PATH.match(path)
+        if m:
+            wait = float(query.get("wait", 0) or 0)
+            return self._send(200, self.service.describe(int(m.group(1)), wait))
+        m = _OUTPUT_PATH.match(path)
+        if m:
+            return self._send_file(self.service.output_path(int(m.group(1)), int(m.group(2))))
+        raise HttpError(404, "Неизвестный адрес")
+
+    def _send_file(self, path):
+        try:
+            f = open(path, "rb")
+        except OSError:
+            raise HttpError(404, "Файл результата не найден")
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header("Content-Type", "application/pdf")
+            self.send_header("Content-Length", str(size))
+            self.send_header("Content-Disposition", f'attachment; filename="{os.path.basename(path)}"')
+            self.end_headers()
+            shutil.copyfileobj(f, self.wfile, UPLOAD_CHUNK)
+
+    def _post(self, path, query):
+        length = self._length()
+        if path == "/files":
+            stored = self.service.store_upload(self.rfile, length, query.get("name"))
+            return self._send(201, {"path": stored})
+        if path == "/jobs":
+            if length > self.service.max_job_bytes:
+                raise HttpError(413, f"Задание больше {self.service.max_job_bytes // 1024} КБ")
+            try:
+                job = json.loads(self.rfile.read(length) or b"null")
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                raise HttpError(400, f"Некорректный JSON: {e}")
+            job_id = self.service.submit(job)
+            return self._send(202, {"id": job_id, "status": self.service.scheduler.status(job_id)},
+                              headers={"Location": f"/jobs/{job_id}"})
+        raise HttpError(404, "Неизвестный адрес")
+
+    def _delete(self, path, query):
+        m = _JOB_PATH.match(path)
+        if not m:
+            raise HttpError(404, "Неизвестный адрес")
+        job_id = int(m.group(1))
+        cancelled = self.service.cancel(job_id)
+        return self._send(200, {"id": job_id, "cancelled": cancelled})
+
+
+def make_server(service, host=SERVER_HOST, port=SERVER_PORT, verbose=False):
+    """HTTP-сервер для service (port=0 — любой свободный порт, см. server.server_address)."""
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT, workers=SERVER_WORKERS, max_queue=SERVER_MAX_QUEUE,
+          work_dir=None, verbose=True):
+    """Запускает сервис и обслуживает запросы до Ctrl+C."""
+    service = JobService(workers=workers, max_queue=max_queue, work_dir=work_dir)
+    server = make_server(service, host, port, verbose)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
@@ -0,0 +1,239 @@
+import time
+from array import array
+from pypdf.generic import (
+    ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject, NumberObject, StreamObject,
+)
+from core.io_handler import WriteStats, atomic_output
+from core.raw_copy import WrittenFileCopier, raw_copier, read_written_xref, scan_body
+from core.task_manager import check_cancelled
+
+# Номера служебных объектов выходного файла: каталог и единственный узел дерева страниц
+CATALOG_NUM = 1
+PAGES_NUM = 2
+
+# Узлы структуры документа, которые не копируются вслед за ссылками со страниц
+_SKIPPED_TYPES = ("/Page", "/Pages", "/Catalog")
+
+
+class _CountingStream:
+    """Обертка над файлом, считающая записанные байты (позиция без вызова tell())."""
+    def __init__(self, fh):
+        self.fh = fh
+        self.pos = 0
+
+    def write(self, data):
+        self.fh.write(data)
+        self.pos += len(data)
+        return len(data)
+
+
+class StreamingPdfWriter:
+    """
+    Потоковая запись PDF: объекты каждой страницы сериализуются в файл сразу же,
+    в памяти остаются только таблица смещений (xref) и список страниц.
+    Закладки, формы и метаданные исходных файлов не переносятся.
+    """
+    def __init__(self, fh):
+        self.out = _CountingStream(fh)
+        # offsets[n] — смещение объекта n; 0 — еще не записан (объект 0 всегда свободен)
+        self.offsets = array("q", [0, 0, 0])
+        self.page_nums = []
+        # Сколько объектов скопировано байтами исходного файла (add_pages(raw=True))
+        self.raw_objects = 0
+        self.out.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    @property
+    def page_count(self):
+        return len(self.page_nums)
+
+    @property
+    def bytes_written(self):
+        return self.out.pos
+
+    def _alloc(self):
+        self.offsets.append(0)
+        return len(self.offsets) - 1
+
+    def _write_object(self, num, obj):
+        self.offsets[num] = self.out.pos
+        self.out.write(f"{num} 0 obj\n".encode())
+        obj.write_to_stream(self.out)
+        self.out.write(b"\nendobj\n")
+
+    def _map_ref(self, ref, obj_map, queue):
+        """Номер объекта ref в выходном файле; новый объект ставится в очередь копирования."""
+        key = (ref.idnum, ref.generation)
+        num = obj_map.get(key)
+        if num is None:
+            num = self._alloc()
+            obj_map[key] = num
+            queue.append((ref, num))
+        return num
+
+    def _remap(self, obj, obj_map, queue):
+        """Копия объекта, в которой ссылки заменены на номера выходного файла."""
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(self._map_ref(obj, obj_map, queue), 0, None)
+        if isinstance(obj, StreamObject):
+            # Данные потока копируются в закодированном виде, без распаковки
+            copy = StreamObject()
+            for k, v in obj.items():
+                if k != "/Length":
+                    copy[NameObject(k)] = self._remap(v, obj_map, queue)
+            copy._data = obj._data
+            return copy
+        if isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+            for k, v in obj.items():
+                copy[NameObject(k)] = self._remap(v, obj_map, queue)
+            return copy
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._remap(v, obj_map, queue) for v in obj)
+        return obj
+
+    def _flush_queue(self, obj_map, queue, deferred, copier=None):
+        if copier is not None:
+            reader = copier.reader
+            def map_ref(num, gen):
+                return self._map_ref(IndirectObject(num, gen, reader), obj_map, queue)
+        while queue:
+            ref, num = queue.pop()
+            if copier is not None:
+                start = self.out.pos
+                if copier.copy(ref, num, self.out, map_ref):
+                    self.offsets[num] = start
+                    continue
+            obj = ref.get_object()
+            obj_type = obj.get("/Type") if isinstance(obj, DictionaryObject) else None
+            if obj_type == "/Page":
+                # Страница может войти в результат позже — тогда она получит этот номер
+                deferred.append(num)
+                continue
+            if obj_type in _SKIPPED_TYPES:
+                # Ссылка на дерево страниц или каталог источника
+                self._write_object(num, NullObject())
+                continue
+            self._write_object(num, self._remap(obj, obj_map, queue))
+
+    def add_pages(self, reader, indices=None, cancel_token=None, progress_cb=None, raw=False, stop=None):
+        """
+        Дописывает страницы reader (все или с индексами indices) в выходной файл.
+        Повторяющиеся индексы копируют страницу еще раз как отдельный объект.
+        raw=True — объекты, на которые ссылаются страницы (изображения, шрифты, потоки
+        содержимого), копируются байтами исходного файла без разбора (см. RawObjectCopier).
+        indices может быть итератором: stop(writer) после каждой страницы решает, остановиться
+        ли, и непрочитанные индексы остаются в итераторе. Возвращает число добавленных страниц.
+        """
+        if indices is None:
+            indices = range(len(reader.pages))
+        copier = raw_copier(reader) if raw else None
+        try:
+            return self._add_pages(reader, indices, cancel_token, progress_cb, copier, stop)
+        finally:
+            if copier is not None:
+                self.raw_objects += copier.copied
+                copier.close()
+
+    def _add_pages(self, reader, indices, cancel_token, progress_cb, copier, stop):
+        obj_map = {}
+        written = set()
+        deferred = []
+        queue = []
+        n = 0
+        for idx in indices:
+            check_cancelled(cancel_token)
+            page = reader.pages[idx]
+            ref = page.indirect_reference
+            key = (ref.idnum, ref.generation) if ref is not None else None
+            if key is None or key in written:
+                num = self._alloc()
+            else:
+                # Номер мог быть выдан раньше, если на страницу ссылалась уже записанная
+                num = obj_map.get(key) or self._alloc()
+                obj_map[key] = num
+                written.add(key)
+
+            page_copy = DictionaryObject()
+            for k, v in page.items():
+                if k != "/Parent":
+                    page_copy[NameObject(k)] = self._remap(v, obj_map, queue)
+            page_copy[NameObject("/Parent")] = IndirectObject(PAGES_NUM, 0, None)
+            self._write_object(num, page_copy)
+            self.page_nums.append(num)
+            self._flush_queue(obj_map, queue, deferred, copier)
+            n += 1
+            if progress_cb:
+                progress_cb(n)
+            if stop is not None and stop(self):
+                break
+
+        # Страницы, на которые ссылались, но которые так и не вошли в результат
+        for num in deferred:
+            if self.offsets[num] == 0:
+                self._write_object(num, NullObject())
+        return n
+
+    def add_written(self, data):
+        """
+        Дописывает все страницы файла, ранее записанного StreamingPdfWriter (data — его байты),
+        без pypdf: объекты копируются байтами со сдвигом номеров на общую базу.
+        Возвращает число добавленных страниц.
+        """
+        offsets = read_written_xref(data)
+        base = len(self.offsets) - (PAGES_NUM + 1)
+        self.offsets.extend([0] * (len(offsets) - (PAGES_NUM + 1)))
+
+        def map_ref(num, gen):
+            return PAGES_NUM if num == PAGES_NUM else base + num
+
+        copier = WrittenFileCopier(data, offsets)
+        for num in range(PAGES_NUM + 1, len(offsets)):
+            start = self.out.pos
+            if not copier.copy(IndirectObject(num, 0, None), base + num, self.out, map_ref):
+                raise ValueError(f"Объект {num} промежуточного файла не распознан")
+            self.offsets[base + num] = start
+        self.raw_objects += copier.copied
+        kids = scan_body(data, offsets[PAGES_NUM] + len(f"{PAGES_NUM} 0 obj"))
+        pages = [base + num for _, _, num, _ in kids.refs]
+        self.page_nums.extend(pages)
+        return len(pages)
+
+    @property
+    def estimated_size(self):
+        """Оценка размера файла после close(): записанное плюс дерево страниц и xref."""
+        return self.out.pos + 20 * len(self.offsets) + 12 * len(self.page_nums) + 256
+
+    def close(self):
+        """Дописывает дерево страниц, каталог, таблицу xref и трейлер."""
+        pages = DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Count"): NumberObject(len(self.page_nums)),
+            NameObject("/Kids"): ArrayObject(IndirectObject(n, 0, None) for n in self.page_nums),
+        })
+        self._write_object(PAGES_NUM, pages)
+        catalog = DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): IndirectObject(PAGES_NUM, 0, None),
+        })
+        self._write_object(CATALOG_NUM, catalog)
+
+        xref_pos = self.out.pos
+        size = len(self.offsets)
+        self.out.write(f"xref\n0 {size}\n0000000000 65535 f \n".encode())
+        for num in range(1, size):
+            self.out.write(f"{self.offsets[num]:010d} 00000 n \n".encode())
+        self.out.write(f"trailer\n<< /Size {size} /Root {CATALOG_NUM} 0 R >>\n"
+                       f"startxref\n{xref_pos}\n%%EOF\n".encode())
+
+
+def save_pages(reader, indices, final_path, raw=True, cancel_token=None, progress_cb=None):
+    """
+    Потоковая запись страниц indices ридера в отдельный файл final_path
+    (для извлечения и перестановки страниц). Возвращает WriteStats.
+    """
+    started = time.perf_counter()
+    with atomic_output(final_path) as f_out:
+        writer = StreamingPdfWriter(f_out)
+        writer.add_pages(reader, indices, cancel_token=cancel_token, progress_cb=progress_cb, raw=raw)
+        writer.close()
+    return WriteStats(writer.bytes_written, time.perf_counter() - started)
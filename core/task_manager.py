@@ -1,5 +1,250 @@
+import atexit
+import heapq
+import itertools
 import threading
+import time
+from utils.messages import get_msg
+
+# Статусы заданий планировщика
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
 
 def run_in_thread(target, args):
     thread = threading.Thread(target=target, args=args, daemon=True)
-    thread.start()
\ No newline at end of file
+    thread.start()
+
+
+class QueueFullError(RuntimeError):
+    """Очередь планировщика заполнена, новое задание не принято."""
+
+
+class OperationCancelled(Exception):
+    """Операция прервана по запросу пользователя."""
+
+
+class CancellationToken:
+    """
+    Флаг кооперативной отмены. Операции периодически вызывают raise_if_cancelled()
+    (между страницами и между входными файлами) и прерываются с OperationCancelled.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise OperationCancelled(get_msg("msg_cancelled"))
+
+
+def check_cancelled(token):
+    """Проверка отмены для необязательного токена (None — операция неотменяемая)."""
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+class Job:
+    """Запись о задании планировщика."""
+    def __init__(self, job_id, target, args, priority, token=None):
+        self.id = job_id
+        self.target = target
+        self.args = args
+        self.priority = priority
+        self.token = token or CancellationToken()
+        self.status = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+
+class JobScheduler:
+    """
+    Ограниченный пул рабочих потоков с приоритетной очередью.
+    Меньшее значение priority выполняется раньше, при равном приоритете — FIFO.
+    max_workers ограничивает число одновременно выполняемых заданий,
+    max_queue (0 — без ограничения) — число ожидающих в очереди.
+    """
+    def __init__(self, max_workers=1, max_queue=0, name="pdf-job"):
+        if max_workers < 1:
+            raise ValueError("max_workers должен быть не меньше 1")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+        self._cond = threading.Condition()
+        self._heap = []
+        # Число действительно ожидающих заданий: отмененные до запуска остаются в куче
+        # до выборки рабочим потоком, но место в очереди не занимают
+        self._queued = 0
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count()
+        self._threads = []
+        self._running = 0
+        self._shutdown = False
+        self._atexit_registered = False
+
+    def submit(self, target, args=(), priority=0, token=None):
+        """
+        Ставит задание в очередь и возвращает его идентификатор.
+        token — токен отмены, который задание проверяет во время работы.
+        """
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Планировщик остановлен")
+            if self.max_queue and self._queued >= self.max_queue:
+                raise QueueFullError("Очередь заданий заполнена")
+            job = Job(next(self._ids), target, tuple(args), priority, token)
+            self._jobs[job.id] = job
+            heapq.heappush(self._heap, (priority, next(self._seq), job.id))
+            self._queued += 1
+            self._ensure_workers()
+            self._cond.notify()
+            return job.id
+
+    def _ensure_workers(self):
+        # Потоки создаются лениво, по мере появления работы
+        if len(self._threads) < self.max_workers and len(self._threads) < self._running + len(self._heap):
+            thread = threading.Thread(target=self._worker_loop, daemon=True,
+                                      name=f"{self.name}-{len(self._threads) + 1}")
+            self._threads.append(thread)
+            thread.start()
+            if not self._atexit_registered:
+                # Потоки-демоны не должны обрываться посреди записи файла при выходе
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                while not self._heap and not self._shutdown:
+                    self._cond.wait()
+                if not self._heap:
+                    return
+                _, _, job_id = heapq.heappop(self._heap)
+                job = self._jobs[job_id]
+                if job.status != JOB_QUEUED:
+                    continue
+                self._queued -= 1
+                job.status = JOB_RUNNING
+                job.started_at = time.monotonic()
+                self._running += 1
+            try:
+                job.result = job.target(*job.args)
+                status = JOB_DONE
+            except OperationCancelled as e:
+                job.error = e
+                status = JOB_CANCELLED
+            except Exception as e:
+                job.error = e
+                status = JOB_FAILED
+            with self._cond:
+                job.status = status
+                job.finished_at = time.monotonic()
+                self._running -= 1
+                self._cond.notify_all()
+            job.done.set()
+
+    def status(self, job_id):
+        """Текущий статус задания или None, если идентификатор неизвестен."""
+        job = self._jobs.get(job_id)
+        return job.status if job else None
+
+    def get_job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def queue_depth(self):
+        """Число заданий, ожидающих в очереди."""
+        with self._cond:
+            return self._queued
+
+    def running_count(self):
+        with self._cond:
+            return self._running
+
+    def wait(self, job_id, timeout=None):
+        """Ожидает завершения задания. Возвращает False по таймауту."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job.done.wait(timeout)
+
+    def cancel(self, job_id):
+        """
+        Отменяет задание: ожидающее снимается с очереди сразу, выполняющемуся
+        выставляется токен отмены. Возвращает False, если задание уже завершено.
+        """
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                raise KeyError(job_id)
+            if job.status == JOB_QUEUED:
+                self._queued -= 1
+                job.status = JOB_CANCELLED
+                job.finished_at = time.monotonic()
+                job.token.cancel()
+                job.done.set()
+                return True
+            if job.status == JOB_RUNNING:
+                job.token.cancel()
+                return True
+            return False
+
+    def forget(self, job_id):
+        """Удаляет запись о завершенном задании (долгоживущим сервисам — чтобы не копить историю)."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status in (JOB_DONE, JOB_FAILED, JOB_CANCELLED):
+                del self._jobs[job_id]
+                # Отмененное до запуска задание еще лежит в куче
+                if any(jid == job_id for _, _, jid in self._heap):
+                    self._heap = [entry for entry in self._heap if entry[2] != job_id]
+                    heapq.heapify(self._heap)
+                return True
+            return False
+
+    def active_jobs(self):
+        """Идентификаторы ожидающих и выполняющихся заданий."""
+        with self._cond:
+            return [j.id for j in self._jobs.values() if j.status in (JOB_QUEUED, JOB_RUNNING)]
+
+    def cancel_pending(self):
+        """Снимает с очереди все еще не начатые задания."""
+        with self._cond:
+            for _, _, jid in self._heap:
+                job = self._jobs[jid]
+                if job.status == JOB_QUEUED:
+                    job.status = JOB_CANCELLED
+                    job.finished_at = time.monotonic()
+                    job.done.set()
+            self._heap.clear()
+            self._queued = 0
+
+    def shutdown(self, wait=True, cancel_pending=False, timeout=None):
+        """
+        Останавливает прием заданий. По умолчанию дожидается выполнения всей очереди;
+        cancel_pending=True снимает не начатые задания и ждет только текущие.
+        """
+        if cancel_pending:
+            self.cancel_pending()
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in threads:
+                if thread is threading.current_thread():
+                    continue
+                thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
@@ -0,0 +1,183 @@
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from utils.constants import TRACE_PATH
+
+# Переменная окружения с путем к файлу трассировки (перекрывает TRACE_PATH).
+# *.json — формат Chrome Trace (chrome://tracing, Perfetto), иначе JSON Lines.
+TRACE_ENV = "PDF_MASTER_TRACE"
+
+_sink = None
+_local = threading.local()
+_trace_ids = itertools.count(1)
+
+
+class _Sink:
+    """Файл трассировки. Запись построчная и под блокировкой: задания идут из разных потоков."""
+    def __init__(self, path):
+        self.path = path
+        self.chrome = path.lower().endswith(".json")
+        self._lock = threading.Lock()
+        self._fh = open(path, "a", encoding="utf-8")
+        if self.chrome and self._fh.tell() == 0:
+            # Массив событий без закрывающей скобки — Chrome и Perfetto принимают такой файл
+            self._fh.write("[\n")
+
+    def emit(self, span, duration):
+        if self.chrome:
+            event = {"name": span.name, "ph": "X", "ts": round(span.wall_start * 1e6),
+                     "dur": round(duration * 1e6), "pid": os.getpid(), "tid": threading.get_ident(),
+                     "args": dict(span.attrs, trace=span.trace.id)}
+            line = json.dumps(event, ensure_ascii=False) + ",\n"
+        else:
+            event = {"trace": span.trace.id, "name": span.name, "parent": span.parent,
+                     "ts": round(span.wall_start, 6), "ms": round(duration * 1000, 3),
+                     "pid": os.getpid(), "thread": threading.current_thread().name}
+            event.update(span.attrs)
+            line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            if span.parent is None:
+                self._fh.flush()
+
+    def close(self):
+        with self._lock:
+            self._fh.close()
+
+
+class _Trace:
+    """Трасса одного задания: сводка по этапам (число вызовов, время, счетчики)."""
+    def __init__(self):
+        self.id = f"{os.getpid()}-{next(_trace_ids)}"
+        self.stages = {}
+
+    def record(self, name, duration, attrs):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"calls": 0, "ms": 0.0}
+        stage["calls"] += 1
+        stage["ms"] += duration * 1000
+        for key, value in attrs.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                stage[key] = stage.get(key, 0) + value
+
+
+class Span:
+    """
+    Замер участка кода. add() накапливает счетчики (pages=..., bytes=...).
+    emit=False — только сводка по этапу в корневом событии, без отдельного события
+    (для вызовов на каждую страницу).
+    """
+    __slots__ = ("name", "attrs", "emit", "trace", "parent", "start", "wall_start")
+
+    def __init__(self, name, attrs, emit=True):
+        self.name = name
+        self.attrs = attrs
+        self.emit = emit
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            self.trace = stack[-1].trace
+            self.parent = stack[-1].name
+        else:
+            self.trace = _Trace()
+            self.parent = None
+        stack.append(self)
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        if self.parent is None:
+            self.attrs["stages"] = {name: dict(stage, ms=round(stage["ms"], 3))
+                                    for name, stage in self.trace.stages.items()}
+        else:
+            self.trace.record(self.name, duration, self.attrs)
+        sink = _sink
+        if sink is not None and (self.emit or self.parent is None):
+            sink.emit(self, duration)
+        return False
+
+
+class _NoopSpan:
+    """Заглушка при выключенной трассировке: ничего не замеряет и не пишет."""
+    __slots__ = ()
+
+    def add(self, **counts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name, **attrs):
+    """Замер этапа с отдельным событием в трассе. При выключенной трассировке — заглушка."""
+    if _sink is None:
+        return _NOOP
+    return Span(name, attrs)
+
+
+def stage(name):
+    """Замер часто повторяющегося шага: попадает только в сводку этапов задания."""
+    if _sink is None:
+        return _NOOP
+    return Span(name, {}, emit=False)
+
+
+def traced(name):
+    """
+    Декоратор операции: весь вызов — один этап трассы; число страниц берется
+    из результата операции ({"pages": ...}).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _sink is None:
+                return func(*args, **kwargs)
+            with Span(name, {}) as sp:
+                result = func(*args, **kwargs)
+                if isinstance(result, dict) and isinstance(result.get("pages"), int):
+                    sp.add(pages=result["pages"])
+                return result
+        return wrapper
+    return decorator
+
+
+def enabled():
+    return _sink is not None
+
+
+def configure(path=None):
+    """
+    Включает трассировку в файл path (None — путь из PDF_MASTER_TRACE или TRACE_PATH).
+    Пустой путь выключает трассировку.
+    """
+    global _sink
+    if path is None:
+        path = os.environ.get(TRACE_ENV) or TRACE_PATH
+    old, _sink = _sink, (_Sink(path) if path else None)
+    if old is not None:
+        old.close()
+
+
+configure()
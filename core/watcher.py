@@ -0,0 +1,429 @@
+"""
+Наблюдение за папками («горячие папки»): новые PDF обрабатываются по правилам без участия человека.
+
+Запуск:
+    python -m core.cli watch rules.json --workers 2 --state watch_state.json
+
+Файл правил — JSON-список заданий в формате манифеста core.cli, у каждого есть папка-источник:
+    [
+      {"folder": "scans/reverse", "op": "reverse", "out": "done/"},
+      {"folder": "scans/rotate", "op": "transform", "out": "done/", "pages": "1", "action": "rotate", "value": "90"},
+      {"folder": "scans/split", "op": "split", "dest": "done/", "every": 10},
+      {"folder": "scans/merge", "op": "merge", "out": "done/", "min_files": 2}
+    ]
+
+Для edit, reverse и transform ключ out — папка результатов (имя берется от исходного файла),
+для extract и split — dest. Правило merge собирает файлы, появившиеся в папке, и склеивает их
+в порядке имен, когда в папке не было новых файлов quiet секунд и их набралось min_files.
+
+Файл считается дописанным, когда его размер и время изменения не менялись debounce секунд.
+Пробуждение — по inotify (Linux), иначе опрос папок. Обработанные файлы запоминаются
+по SHA-256 содержимого в файле состояния, поэтому после перезапуска работа не повторяется.
+"""
+import ctypes
+import ctypes.util
+import fnmatch
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from core.io_handler import atomic_output
+from core.jobs import DIR_OUTPUT_OPS, JOB_HANDLERS, run_job
+from core.result_cache import file_digest
+from core.task_manager import JobScheduler
+from utils.constants import WATCH_DEBOUNCE_SECONDS, WATCH_POLL_INTERVAL
+
+# Ключи правила, которые не передаются в задание
+_RULE_KEYS = ("name", "folder", "pattern", "min_files", "quiet")
+
+# Константы inotify из <sys/inotify.h>
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT = struct.Struct("iIII")
+
+
+class Rule:
+    """Правило горячей папки: какие файлы брать и какое задание по ним выполнять."""
+    def __init__(self, folder, op, options, name=None, pattern="*.pdf", min_files=2, quiet=None):
+        if op not in JOB_HANDLERS:
+            raise ValueError(f"Неизвестная операция: {op}")
+        self.folder = os.path.abspath(folder)
+        self.op = op
+        self.options = dict(options)
+        self.name = name or f"{os.path.basename(self.folder)}:{op}"
+        self.pattern = pattern.lower()
+        self.min_files = max(2, int(min_files))
+        self.quiet = quiet
+        self.output_key = "dest" if op in DIR_OUTPUT_OPS else "out"
+        output = self.options.get(self.output_key)
+        if not output:
+            raise ValueError(f"Правило {self.name}: не задана папка результатов ({self.output_key})")
+        self.output_dir = os.path.abspath(output)
+        if os.path.realpath(self.output_dir) == os.path.realpath(self.folder):
+            # Результаты в той же папке снова попали бы в обработку
+            raise ValueError(f"Правило {self.name}: папка результатов совпадает с наблюдаемой")
+
+    @classmethod
+    def from_dict(cls, data):
+        if not isinstance(data, dict) or not data.get("folder"):
+            raise ValueError("Правило должно быть объектом JSON с ключом folder")
+        options = {k: v for k, v in data.items() if k not in _RULE_KEYS and k != "op"}
+        return cls(data["folder"], data.get("op"), options, name=data.get("name"),
+                   pattern=data.get("pattern", "*.pdf"), min_files=data.get("min_files", 2),
+                   quiet=data.get("quiet"))
+
+    def matches(self, path):
+        name = os.path.basename(path)
+        # Скрытые файлы — в том числе временные .part других программ и atomic_output
+        return not name.startswith(".") and fnmatch.fnmatch(name.lower(), self.pattern)
+
+    def job_for(self, paths):
+        """Задание для файлов paths (для merge — всех, иначе — одного)."""
+        job = dict(self.options, op=self.op)
+        # Операции сами выбирают свободное имя (_1, _2, ...) и резервируют его меткой на диске
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.op == "merge":
+            job["files"] = list(paths)
+            stamp = time.strftime("%Y%m%d_%H%M%S")
+            job["out"] = os.path.join(self.output_dir, f"merged_{stamp}.pdf")
+            return job
+        src = paths[0]
+        job["src"] = src
+        if self.output_key == "dest":
+            job["dest"] = self.output_dir
+            job.setdefault("name", os.path.splitext(os.path.basename(src))[0])
+        else:
+            job["out"] = os.path.join(self.output_dir, os.path.basename(src))
+        return job
+
+
+def load_rules(path):
+    """Читает файл правил (JSON-список или объект с ключом "rules")."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get("rules")
+    if not isinstance(data, list) or not data:
+        raise ValueError("Файл правил должен содержать непустой список правил")
+    rules = [Rule.from_dict(item) for item in data]
+    folders = [r.folder for r in rules]
+    if len(set(folders)) != len(folders):
+        raise ValueError("У каждой папки может быть только одно правило")
+    return rules
+
+
+class WatchState:
+    """
+    Обработанные файлы: правило -> {SHA-256: сведения}.
+    Файл состояния — журнал JSON Lines: каждое успешное задание дописывает свои строки
+    {"rule": ..., "sha256": ..., "info": ...}, поэтому запись не зависит от размера истории.
+    Строка, оборванная падением процесса, при чтении пропускается. При загрузке журнал
+    с повторами (или файл старого формата {"processed": ...}) один раз переписывается атомарно.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._done = {}
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read()
+        lines = text.splitlines()
+        try:
+            # Старый формат: весь файл — один объект JSON
+            self._done = json.loads(text)["processed"]
+            lines = None
+        except (ValueError, TypeError, KeyError):
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                    self._done.setdefault(entry["rule"], {})[entry["sha256"]] = entry["info"]
+                except (ValueError, TypeError, KeyError):
+                    continue
+        # Переписываем, если есть повторы, оборванные строки или файл старого формата:
+        # к оборванной строке нельзя дописывать следующие
+        if lines is None or len(lines) != sum(len(entries) for entries in self._done.values()):
+            self._compact()
+
+    @staticmethod
+    def _line(rule_name, digest, info):
+        return json.dumps({"rule": rule_name, "sha256": digest, "info": info}, ensure_ascii=False) + "\n"
+
+    def _compact(self):
+        data = "".join(self._line(rule_name, digest, info) for rule_name, entries in self._done.items()
+                       for digest, info in entries.items())
+        with atomic_output(self.path) as f_out:
+            f_out.write(data.encode("utf-8"))
+
+    def is_processed(self, rule_name, digest):
+        with self._lock:
+            return digest in self._done.get(rule_name, {})
+
+    def mark(self, rule_name, digests, info):
+        with self._lock:
+            entries = self._done.setdefault(rule_name, {})
+            for digest in digests:
+                entries[digest] = info
+            if self.path:
+                data = "".join(self._line(rule_name, digest, info) for digest in digests)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(data)
+
+
+class Debouncer:
+    """
+    Файлы, которые еще могут дописываться. Файл готов, когда его размер и время изменения
+    не менялись delay секунд; исчезнувшие файлы забываются.
+    """
+    def __init__(self, delay, clock=time.monotonic):
+        self.delay = delay
+        self._clock = clock
+        self._pending = {}  # путь -> (size, mtime_ns, время последнего изменения)
+
+    def __len__(self):
+        return len(self._pending)
+
+    @staticmethod
+    def _stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def touch(self, path):
+        stat = self._stat(path)
+        if stat is not None:
+            self._pending[path] = stat + (self._clock(),)
+
+    def ready(self):
+        now = self._clock()
+        result = []
+        for path, (size, mtime, changed_at) in list(self._pending.items()):
+            stat = self._stat(path)
+            if stat is None:
+                del self._pending[path]
+            elif stat != (size, mtime):
+                self._pending[path] = stat + (now,)
+            elif now - changed_at >= self.delay:
+                del self._pending[path]
+                result.append(path)
+        return sorted(result)
+
+
+def _list_files(folder):
+    try:
+        with os.scandir(folder) as entries:
+            return [e.path for e in entries if e.is_file()]
+    except OSError:
+        return []
+
+
+class PollingBackend:
+    """Опрос папок: сравнение (размер, время изменения) файлов с предыдущим снимком."""
+    def __init__(self, folders, interval=WATCH_POLL_INTERVAL):
+        self.folders = list(folders)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for folder in self.folders:
+            for path in _list_files(folder):
+                stat = Debouncer._stat(path)
+                if stat is not None:
+                    snapshot[path] = stat
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(max(0.0, min(self.interval, timeout)))
+        current = self._scan()
+        changed = [p for p, stat in current.items() if self._snapshot.get(p) != stat]
+        self._snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Пробуждение по событиям inotify (Linux) через ctypes, без сторонних пакетов."""
+    def __init__(self, folders):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self._folders = {}
+        try:
+            for folder in folders:
+                wd = libc.inotify_add_watch(self._fd, os.fsencode(folder), _WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch {folder}")
+                self._folders[wd] = folder
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self._fd], [], [], max(0.0, timeout))
+        if not readable:
+            return []
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos + _EVENT.size <= len(data):
+                wd, _, _, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+                pos += _EVENT.size + length
+                folder = self._folders.get(wd)
+                if folder and name:
+                    changed.add(os.path.join(folder, os.fsdecode(name)))
+        return sorted(changed)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def make_backend(folders, poll=False, interval=WATCH_POLL_INTERVAL):
+    """inotify, если доступен и не запрошен опрос, иначе PollingBackend."""
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyBackend(folders)
+        except (OSError, AttributeError):
+            pass
+    return PollingBackend(folders, interval)
+
+
+class FolderWatcher:
+    """
+    Цикл наблюдения: события бэкенда -> Debouncer -> проверка хеша -> задание в пуле JobScheduler.
+    on_result(сведения) вызывается из рабочего потока после каждого задания.
+    """
+    def __init__(self, rules, state_path=None, workers=1, debounce=WATCH_DEBOUNCE_SECONDS,
+                 poll=False, backend=None, on_result=None, clock=time.monotonic):
+        self.rules = list(rules)
+        self._by_folder = {rule.folder: rule for rule in self.rules}
+        self.state = WatchState(state_path)
+        self.debouncer = Debouncer(debounce, clock)
+        self.backend = backend or make_backend(self._by_folder, poll)
+        self.scheduler = JobScheduler(max_workers=workers, name="pdf-watch")
+        self.on_result = on_result
+        self._clock = clock
+        self._debounce = debounce
+        self._lock = threading.Lock()
+        self._inflight = set()      # (правило, хеш) — уже в очереди или выполняются
+        self._batches = {}          # правило merge -> [(путь, хеш)]
+        self._batch_changed = {}    # правило merge -> время последнего пополнения
+        self.counts = {"processed": 0, "failed": 0, "skipped": 0}
+
+    def start(self):
+        """Берет в работу файлы, уже лежащие в папках (обработанные раньше отсеются по хешу)."""
+        for rule in self.rules:
+            os.makedirs(rule.folder, exist_ok=True)
+            for path in _list_files(rule.folder):
+                if rule.matches(path):
+                    self.debouncer.touch(path)
+
+    def _rule_for(self, path):
+        rule = self._by_folder.get(os.path.dirname(path))
+        return rule if rule is not None and rule.matches(path) else None
+
+    def poll_once(self, timeout=None):
+        """Один шаг цикла: ожидание событий не дольше timeout и запуск готовых заданий."""
+        if timeout is None:
+            timeout = self._debounce / 2 if len(self.debouncer) or self._batches else WATCH_POLL_INTERVAL
+        for path in self.backend.wait(timeout):
+            if self._rule_for(path) is not None:
+                self.debouncer.touch(path)
+        for path in self.debouncer.ready():
+            self._dispatch(path)
+        self._flush_batches()
+
+    def _dispatch(self, path):
+        rule = self._rule_for(path)
+        try:
+            digest = file_digest(path)
+        except OSError:
+            return
+        key = (rule.name, digest)
+        with self._lock:
+            if key in self._inflight or self.state.is_processed(rule.name, digest):
+                self.counts["skipped"] += 1
+                return
+            self._inflight.add(key)
+        if rule.op == "merge":
+            self._batches.setdefault(rule.name, []).append((path, digest))
+            self._batch_changed[rule.name] = self._clock()
+            return
+        self._submit(rule, [path], [digest])
+
+    def _flush_batches(self):
+        now = self._clock()
+        for rule in self.rules:
+            batch = self._batches.get(rule.name)
+            if not batch or len(batch) < rule.min_files:
+                continue
+            quiet = self._debounce if rule.quiet is None else rule.quiet
+            if now - self._batch_changed[rule.name] < quiet:
+                continue
+            del self._batches[rule.name]
+            batch.sort(key=lambda item: os.path.basename(item[0]))
+            self._submit(rule, [p for p, _ in batch], [d for _, d in batch])
+
+    def _submit(self, rule, paths, digests):
+        self.scheduler.submit(self._process, (rule, paths, digests))
+
+    def _process(self, rule, paths, digests):
+        started = time.perf_counter()
+        info = {"rule": rule.name, "op": rule.op, "files": paths, "status": "ok"}
+        try:
+            job = rule.job_for(paths)
+            stats = run_job(job) or {}
+            info["pages"] = stats.get("pages", 0)
+            info["outputs"] = [os.path.normpath(p) for p in stats.get("outputs", [])]
+            self.state.mark(rule.name, digests, {"files": [os.path.basename(p) for p in paths],
+                                                 "outputs": info["outputs"], "at": time.time()})
+        except Exception as e:
+            info["status"] = "error"
+            info["error"] = str(e) or type(e).__name__
+        finally:
+            with self._lock:
+                self._inflight.difference_update((rule.name, d) for d in digests)
+                self.counts["processed" if info["status"] == "ok" else "failed"] += 1
+        info["seconds"] = round(time.perf_counter() - started, 4)
+        if self.on_result:
+            self.on_result(info)
+        return info
+
+    def run(self, stop_event=None):
+        """Наблюдает до установки stop_event (или до Ctrl+C)."""
+        stop_event = stop_event or threading.Event()
+        self.start()
+        try:
+            while not stop_event.is_set():
+                self.poll_once()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def close(self, wait=True):
+        """Дожидается начатых заданий; несобранные пакеты merge остаются до следующего запуска."""
+        self.scheduler.shutdown(wait=wait)
+        self.backend.close()
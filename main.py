@@ -5,4 +5,6 @@ if __name__ == "__main__":
     # Инициализация корня с поддержкой Drag-and-Drop
     root = TkinterDnD.Tk()
     app = PdfProApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    # Дожидаемся завершения записи текущего задания перед выходом
+    app.processor.shutdown()
\ No newline at end of file
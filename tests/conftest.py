@@ -0,0 +1,18 @@
+import pytest
+from pypdf import PdfWriter
+
+
+@pytest.fixture
+def make_pdf():
+    """
+    Фабрика простых PDF: make_pdf(path, pages, width=100) создает пустые страницы
+    шириной width, width + 1, ... (по ширине проверяется порядок страниц) и возвращает путь.
+    """
+    def make(path, pages, width=100):
+        writer = PdfWriter()
+        for i in range(pages):
+            writer.add_blank_page(width=width + i, height=200)
+        with open(path, "wb") as f:
+            writer.write(f)
+        return str(path)
+    return make
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+import pytest
+from pypdf import PdfReader
+import core.async_processor as async_processor
+from core.async_processor import AsyncPdfProcessor, ProgressStream
+from core.task_manager import QueueFullError
+
+
+def test_merge_with_progress_stream(tmp_path, make_pdf):
+    files = [make_pdf(tmp_path / f"{i}.pdf", 2) for i in range(3)]
+
+    async def main():
+        async with AsyncPdfProcessor(max_concurrency=2) as processor:
+            progress = ProgressStream()
+            task = asyncio.create_task(processor.merge(files, str(tmp_path / "out.pdf"), progress=progress))
+            snapshots = [snap async for snap in progress]
+            return await task, snapshots
+
+    result, snapshots = asyncio.run(main())
+    assert result["pages"] == 6
+    assert len(PdfReader(result["outputs"][0]).pages) == 6
+    assert snapshots and snapshots[-1].done == 3 and snapshots[-1].total == 3
+
+
+def test_concurrency_limit_does_not_block_loop(monkeypatch):
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def fake_run_job(job, progress_cb=None, cancel_token=None):
+        with lock:
+            running.append(job["src"])
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(job["src"])
+        return {"pages": 1, "outputs": [job["out"]]}
+
+    monkeypatch.setattr(async_processor, "run_job", fake_run_job)
+
+    async def main():
+        processor = AsyncPdfProcessor(max_concurrency=2)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        tick_task = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(processor.reverse(f"{i}.pdf", f"out_{i}.pdf") for i in range(8)))
+        tick_task.cancel()
+        processor.shutdown()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    assert [r["outputs"] for r in results] == [[f"out_{i}.pdf"] for i in range(8)]
+    assert max(peak) == 2
+    assert ticks > 10
+
+
+def test_max_pending_rejects_extra_calls(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(async_processor, "run_job",
+                        lambda job, progress_cb=None, cancel_token=None: release.wait(5) and {"pages": 0})
+
+    async def main():
+        processor = AsyncPdfProcessor(max_concurrency=1, max_pending=1)
+        first = asyncio.create_task(processor.reverse("a.pdf", "a_out.pdf"))
+        second = asyncio.create_task(processor.reverse("b.pdf", "b_out.pdf"))
+        await asyncio.sleep(0.05)
+        assert processor.pending == 1
+        with pytest.raises(QueueFullError):
+            await processor.reverse("c.pdf", "c_out.pdf")
+        release.set()
+        await asyncio.gather(first, second)
+        processor.shutdown()
+
+    asyncio.run(main())
+
+
+def test_cancel_stops_running_operation(monkeypatch):
+    tokens = []
+
+    def fake_run_job(job, progress_cb=None, cancel_token=None):
+        tokens.append(cancel_token)
+        while True:
+            cancel_token.raise_if_cancelled()
+            time.sleep(0.01)
+
+    monkeypatch.setattr(async_processor, "run_job", fake_run_job)
+
+    async def main():
+        processor = AsyncPdfProcessor(max_concurrency=1)
+        task = asyncio.create_task(processor.edit("a.pdf", "out.pdf", "1"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        processor.shutdown()
+
+    asyncio.run(main())
+    assert tokens[0].cancelled
@@ -0,0 +1,86 @@
+import io
+import json
+import subprocess
+import sys
+import pytest
+from pypdf import PdfReader
+from core.cli import main, read_manifest, run_manifest
+from core.jobs import run_job_safe
+
+
+def write_manifest(path, jobs):
+    path.write_text("\n".join(json.dumps(j) for j in jobs), encoding="utf-8")
+    return str(path)
+
+
+def test_read_manifest_skips_comments_and_blank_lines(tmp_path):
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text('# комментарий\n\n{"op": "reverse", "src": "a.pdf", "out": "b.pdf"}\n', encoding="utf-8")
+    assert read_manifest(str(manifest)) == [{"op": "reverse", "src": "a.pdf", "out": "b.pdf"}]
+
+
+def test_read_manifest_invalid_json(tmp_path):
+    manifest = tmp_path / "jobs.jsonl"
+    manifest.write_text('{"op": "merge"\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="Строка 1"):
+        read_manifest(str(manifest))
+
+
+def test_run_job_safe_reports_error():
+    """Ошибка задания превращается в статус, а не в исключение."""
+    result = run_job_safe(3, {"op": "unknown"})
+    assert result["index"] == 3
+    assert result["status"] == "error"
+    assert "unknown" in result["error"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_manifest_all_operations(tmp_path, workers, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 4)
+    other = make_pdf(tmp_path / "other.pdf", 2)
+    out = tmp_path / "out"
+    jobs = [
+        {"op": "extract", "src": src, "dest": str(out), "blocks": [["1-2", "part", False], {"pages": "1", "name": "rest", "exclude": True}]},
+        {"op": "merge", "files": [src, other], "out": str(out / "merged.pdf")},
+        {"op": "edit", "src": src, "out": str(out / "edited.pdf"), "pages": "4, 1"},
+        {"op": "reverse", "src": src, "out": str(out / "reversed.pdf")},
+        {"op": "transform", "src": src, "out": str(out / "rotated.pdf"), "pages": "1", "action": "rotate", "value": "90"},
+        {"op": "reverse", "src": str(tmp_path / "missing.pdf"), "out": str(out / "x.pdf")},
+    ]
+    stdout, stderr = io.StringIO(), io.StringIO()
+
+    code = run_manifest(write_manifest(tmp_path / "jobs.jsonl", jobs), workers, stdout, stderr)
+
+    results = sorted((json.loads(l) for l in stdout.getvalue().splitlines()), key=lambda r: r["index"])
+    assert code == 1
+    assert [r["status"] for r in results] == ["ok"] * 5 + ["error"]
+    assert [r["pages"] for r in results[:5]] == [5, 6, 4, 4, 4]
+
+    reversed_widths = [int(p.mediabox.width) for p in PdfReader(str(out / "reversed.pdf")).pages]
+    assert reversed_widths == [103, 102, 101, 100]
+
+    summary = json.loads(stderr.getvalue().split(":", 1)[1])
+    assert summary["jobs"] == 6 and summary["ok"] == 5 and summary["failed"] == 1
+    assert summary["pages"] == 23
+    assert summary["pages_per_sec"] > 0
+
+
+def test_run_job_split(tmp_path, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 5)
+    result = run_job_safe(0, {"op": "split", "src": src, "dest": str(tmp_path / "parts"), "every": 2})
+    assert result["status"] == "ok" and result["pages"] == 5
+    assert [p.rsplit("_", 1)[-1] for p in result["outputs"]] == ["1.pdf", "2.pdf", "3.pdf"]
+
+    result = run_job_safe(1, {"op": "split", "src": src, "dest": str(tmp_path / "parts")})
+    assert result["status"] == "error"
+
+
+def test_main_missing_manifest(tmp_path, capsys):
+    assert main(["run", str(tmp_path / "nope.jsonl")]) == 2
+    assert "Ошибка" in capsys.readouterr().err
+
+
+def test_cli_does_not_import_tk():
+    """Headless-режим не должен подтягивать Tkinter и tkinterdnd2."""
+    code = "import sys, core.cli; bad = [m for m in ('tkinter', 'tkinterdnd2') if m in sys.modules]; sys.exit(len(bad))"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -5,7 +5,7 @@ import tkinter as tk
 from tkinterdnd2 import TkinterDnD
 from unittest.mock import MagicMock, patch
 from ui.tkinter_gui import PdfProApp
-from core.task_manager import run_in_thread
+from core.task_manager import run_in_thread, JobScheduler, QueueFullError, JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JOB_CANCELLED
 from core.processor import PdfProcessor
 
 def test_run_in_thread_execution():
@@ -55,6 +55,119 @@ def test_execute_safe_error_handling():
     # Проверяем, что прогресс-бар сброшен в блоке finally 
     mock_app.update_progress.assert_any_call(0)
 
+def test_scheduler_respects_concurrency_limit():
+    """Одновременно выполняется не больше max_workers заданий."""
+    scheduler = JobScheduler(max_workers=2)
+    lock = threading.Lock()
+    active = [0]
+    peak = [0]
+
+    def job():
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+
+    ids = [scheduler.submit(job) for _ in range(6)]
+    scheduler.shutdown(wait=True)
+
+    assert peak[0] == 2
+    assert all(scheduler.status(i) == JOB_DONE for i in ids)
+
+def test_scheduler_priority_then_fifo_order():
+    """Меньший приоритет выполняется раньше, при равном — в порядке постановки."""
+    scheduler = JobScheduler(max_workers=1)
+    gate = threading.Event()
+    order = []
+    scheduler.submit(gate.wait)  # занимаем единственный поток
+    scheduler.submit(order.append, ("low_1",), priority=5)
+    scheduler.submit(order.append, ("high",), priority=0)
+    scheduler.submit(order.append, ("low_2",), priority=5)
+    gate.set()
+    scheduler.shutdown(wait=True)
+    assert order == ["high", "low_1", "low_2"]
+
+def test_scheduler_status_queue_limit_and_failure():
+    scheduler = JobScheduler(max_workers=1, max_queue=1)
+    gate = threading.Event()
+    first = scheduler.submit(gate.wait)
+    while scheduler.status(first) != JOB_RUNNING:
+        time.sleep(0.001)
+    assert scheduler.wait(first, timeout=0.01) is False
+    queued = scheduler.submit(lambda: 1 / 0)
+    assert scheduler.status(queued) == JOB_QUEUED
+    assert scheduler.queue_depth() == 1
+    with pytest.raises(QueueFullError):
+        scheduler.submit(lambda: None)
+    gate.set()
+    assert scheduler.wait(queued, timeout=1.0)
+    assert scheduler.status(queued) == JOB_FAILED
+    assert isinstance(scheduler.get_job(queued).error, ZeroDivisionError)
+    assert scheduler.status(12345) is None
+
+def test_scheduler_shutdown_cancels_pending_but_drains_running():
+    scheduler = JobScheduler(max_workers=1)
+    gate = threading.Event()
+    finished = threading.Event()
+
+    def running():
+        gate.wait()
+        finished.set()
+
+    running_id = scheduler.submit(running)
+    pending_id = scheduler.submit(lambda: None)
+    threading.Timer(0.05, gate.set).start()
+    scheduler.shutdown(wait=True, cancel_pending=True)
+
+    assert finished.is_set()
+    assert scheduler.status(running_id) == JOB_DONE
+    assert scheduler.status(pending_id) == JOB_CANCELLED
+    with pytest.raises(RuntimeError):
+        scheduler.submit(lambda: None)
+
+def test_scheduler_cancelled_jobs_free_queue_slots():
+    scheduler = JobScheduler(max_workers=1, max_queue=2)
+    gate = threading.Event()
+    first = scheduler.submit(gate.wait)
+    while scheduler.status(first) != JOB_RUNNING:
+        time.sleep(0.001)
+    queued = [scheduler.submit(lambda: None) for _ in range(2)]
+    with pytest.raises(QueueFullError):
+        scheduler.submit(lambda: None)
+    for job_id in queued:
+        assert scheduler.cancel(job_id)
+    assert scheduler.queue_depth() == 0
+    # Отмененные задания еще лежат в куче, но места в очереди не занимают
+    retry = [scheduler.submit(lambda: None) for _ in range(2)]
+    assert scheduler.queue_depth() == 2
+    gate.set()
+    assert all(scheduler.wait(job_id, timeout=1.0) for job_id in retry)
+    assert scheduler.queue_depth() == 0
+    scheduler.shutdown()
+
+def test_scheduler_forget_drops_finished_jobs_only():
+    scheduler = JobScheduler(max_workers=1)
+    gate = threading.Event()
+    running_id = scheduler.submit(gate.wait)
+    queued_id = scheduler.submit(lambda: None)
+    assert scheduler.forget(running_id) is False
+    assert scheduler.cancel(queued_id)
+    assert scheduler.forget(queued_id) is True
+    assert scheduler.get_job(queued_id) is None
+    gate.set()
+    scheduler.wait(running_id, timeout=1.0)
+    assert scheduler.forget(running_id) is True
+    scheduler.shutdown()
+
+def test_processor_returns_job_ids():
+    """_execute_safe ставит задание в планировщик и возвращает его идентификатор."""
+    processor = PdfProcessor(MagicMock(), scheduler=JobScheduler(max_workers=1))
+    job_id = processor._execute_safe(MagicMock(), "ok")
+    processor.scheduler.wait(job_id, timeout=1.0)
+    assert processor.job_status(job_id) == JOB_DONE
+
 @pytest.fixture(scope="module")
 def root():
     _root = TkinterDnD.Tk()
@@ -71,4 +184,4 @@ def test_safe_message_integration(mock_showinfo, root):
         mock_after.assert_called_once()
         callback = mock_after.call_args[0][1]
         callback()
-        mock_showinfo.assert_called_with("Title", "Message")
\ No newline at end of file
+        mock_showinfo.assert_called_with("Title", "Message")
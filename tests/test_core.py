@@ -1,3 +1,4 @@
+import os
 import pytest
 from unittest.mock import MagicMock, patch, ANY
 from core.operations import editor_logic, extract_logic, merge_logic, rotate_mirror_logic
@@ -140,14 +141,14 @@ def test_merge_logic_calls(mock_open, mock_save, mock_writer_cls):
 @patch('core.operations.PdfWriter')
 @patch('core.operations.save_pdf')
 # Порядок: 1. save_pdf -> mock_save, 2. PdfWriter -> mock_writer_cls, 3. fixture -> mock_reader
-def test_rotate_mirror_logic_rotation(mock_save, mock_writer_cls, mock_reader):
+def test_rotate_mirror_logic_rotation(mock_save, mock_writer_cls, mock_reader, tmp_path):
     """Проверка поворота выбранных страниц на 90 градусов[cite: 59]."""
     from core.operations import rotate_mirror_logic
     mock_writer = mock_writer_cls.return_value
     
     query = "1"
     # Передаем реальный mock_reader (фиксчуру)
-    rotate_mirror_logic(mock_reader, "/out.pdf", query, 'rotate', "90", lambda x: None)
+    rotate_mirror_logic(mock_reader, str(tmp_path / "out.pdf"), query, 'rotate', "90", lambda x: None)
     
     # Теперь mock_reader[0] — это объект из фиксчуры, который прошел через логику [cite: 60]
     mock_reader.pages[0].rotate.assert_called_with(90)
@@ -156,7 +157,7 @@ def test_rotate_mirror_logic_rotation(mock_save, mock_writer_cls, mock_reader):
 
 @patch('core.operations.PdfWriter')
 @patch('core.operations.save_pdf')
-def test_rotate_mirror_logic_mirror_h(mock_save, mock_writer_cls, mock_reader):
+def test_rotate_mirror_logic_mirror_h(mock_save, mock_writer_cls, mock_reader, tmp_path):
     """Проверка горизонтального отражения через add_transformation (совместимость с pypdf 3.0+)."""
     from core.operations import rotate_mirror_logic
     mock_writer = mock_writer_cls.return_value
@@ -167,7 +168,7 @@ def test_rotate_mirror_logic_mirror_h(mock_save, mock_writer_cls, mock_reader):
     target_page.mediabox.height = 800
     
     query = "2"
-    rotate_mirror_logic(mock_reader, "/out.pdf", query, 'mirror', "h", lambda x: None)
+    rotate_mirror_logic(mock_reader, str(tmp_path / "out.pdf"), query, 'mirror', "h", lambda x: None)
     
     # Проверяем, что вместо удаленного метода .mirror() вызывается .add_transformation() 
     target_page.add_transformation.assert_called_once()
@@ -181,7 +182,7 @@ def test_rotate_mirror_logic_mirror_h(mock_save, mock_writer_cls, mock_reader):
 
 @patch('core.operations.PdfWriter')
 @patch('core.operations.save_pdf')
-def test_rotate_mirror_logic_mirror_v(mock_save, mock_writer_cls, mock_reader):
+def test_rotate_mirror_logic_mirror_v(mock_save, mock_writer_cls, mock_reader, tmp_path):
     """Проверка вертикального отражения (зеркало по оси Y)[cite: 31, 33]."""
     from core.operations import rotate_mirror_logic
     mock_writer = mock_writer_cls.return_value
@@ -193,7 +194,7 @@ def test_rotate_mirror_logic_mirror_v(mock_save, mock_writer_cls, mock_reader):
     
     query = "1"
     # Запуск логики трансформации [cite: 31]
-    rotate_mirror_logic(mock_reader, "/out.pdf", query, 'mirror', "v", lambda x: None)
+    rotate_mirror_logic(mock_reader, str(tmp_path / "out.pdf"), query, 'mirror', "v", lambda x: None)
     
     # Проверяем, что была вызвана трансформация [cite: 32]
     target_page.add_transformation.assert_called_once()
@@ -229,4 +230,70 @@ def test_transform_logic_unique_path_call(mock_writer_cls, mock_save, mock_get_u
     
     # Путь должен быть обработан через get_safe_unique_path 
     mock_get_unique.assert_called_once()
-    mock_save.assert_called_once_with(ANY, "/fake/dir/transformed_1.pdf")
\ No newline at end of file
+    mock_save.assert_called_once_with(ANY, "/fake/dir/transformed_1.pdf")
+
+def test_extract_logic_parallel_keeps_order_and_unique_names(tmp_path, make_pdf):
+    """Параллельный режим: порядок прогресса, уникальные имена и содержимое блоков."""
+    from pypdf import PdfReader
+    src = make_pdf(tmp_path / "src.pdf", 6, width=100)
+
+    out_dir = tmp_path / "out"
+    query = [("1-2", "part", False), ("6-5", "part", False), ("1-5", "tail", True)]
+    progress = []
+    with open(src, "rb") as fh:
+        result = extract_logic(PdfReader(fh), str(out_dir), query, progress.append, workers=2)
+
+    assert progress == [1, 2, 3]
+    assert [os.path.basename(p) for p in result["outputs"]] == ["part.pdf", "part_1.pdf", "tail.pdf"]
+    assert result["pages"] == 5
+    widths = [[int(p.mediabox.width) for p in PdfReader(path).pages] for path in result["outputs"]]
+    assert widths == [[100, 101], [105, 104], [105]]
+
+
+def test_extract_parallel_failure_waits_for_running_blocks(tmp_path, make_pdf):
+    """Ошибка одного блока: имена освобождаются только после завершения остальных блоков."""
+    from core.io_handler import get_safe_unique_path
+    from core.parallel import extract_blocks_parallel
+    src = make_pdf(tmp_path / "src.pdf", 3)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    plan = [([99], get_safe_unique_path(str(out_dir), "broken"))]
+    plan += [([i], get_safe_unique_path(str(out_dir), name)) for i, name in ((0, "b"), (1, "c"), (2, "d"))]
+
+    with pytest.raises(IndexError):
+        extract_blocks_parallel(src, plan, 2, lambda v: None)
+
+    # Остальные блоки дописаны до конца, меток имен и временных файлов не осталось
+    assert sorted(os.listdir(out_dir)) == ["b.pdf", "c.pdf", "d.pdf"]
+
+
+def test_operations_stop_on_cancel(tmp_path, mock_reader):
+    """Отмена прерывает операции между страницами и между входными файлами."""
+    from core.task_manager import CancellationToken, OperationCancelled
+    token = CancellationToken()
+    token.cancel()
+    with patch('core.operations.PdfWriter') as mock_writer_cls, patch('core.operations.save_pdf') as mock_save:
+        with pytest.raises(OperationCancelled):
+            editor_logic(mock_reader, "/out.pdf", "1-3", lambda x: None, cancel_token=token)
+        with pytest.raises(OperationCancelled):
+            rotate_mirror_logic(mock_reader, "/out.pdf", "1", "rotate", "90", lambda x: None, cancel_token=token)
+        with pytest.raises(OperationCancelled):
+            merge_logic(["a.pdf", "b.pdf"], "/out.pdf", lambda x: None, cancel_token=token)
+        assert mock_writer_cls.return_value.add_page.call_count == 0
+        assert mock_writer_cls.return_value.append.call_count == 0
+        mock_save.assert_not_called()
+
+
+def test_extract_logic_cancel_removes_written_blocks(tmp_path, mock_reader):
+    """Файлы уже сохраненных блоков удаляются при отмене."""
+    from core.task_manager import CancellationToken, OperationCancelled
+    token = CancellationToken()
+
+    def fake_save(writer, path):
+        open(path, "wb").close()
+
+    with patch('core.operations.PdfWriter'), patch('core.operations.save_pdf', side_effect=fake_save):
+        with pytest.raises(OperationCancelled):
+            extract_logic(mock_reader, str(tmp_path), [("1", "a", False), ("2", "b", False)],
+                          lambda v: token.cancel(), cancel_token=token)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,82 @@
+import os
+from pypdf import PdfWriter, PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject, StreamObject
+from core.dedup import deduplicate_objects
+from core.operations import merge_logic
+
+LOGO = os.urandom(4096)
+
+
+def make_invoice(path, number):
+    """Счет по одному шаблону: общий логотип и шрифт, свой текст на странице."""
+    writer = PdfWriter()
+    logo = StreamObject()
+    logo.set_data(LOGO)
+    logo.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Form"),
+                 NameObject("/BBox"): ArrayObject([NumberObject(0)] * 4)})
+    font_file = StreamObject()
+    font_file.set_data(b"font-program" * 200)
+    descriptor = DictionaryObject({NameObject("/Type"): NameObject("/FontDescriptor"),
+                                   NameObject("/FontFile2"): writer._add_object(font_file)})
+    font = DictionaryObject({NameObject("/Type"): NameObject("/Font"), NameObject("/Subtype"): NameObject("/TrueType"),
+                             NameObject("/FontDescriptor"): writer._add_object(descriptor)})
+    page = writer.add_blank_page(width=595, height=842)
+    content = StreamObject()
+    content.set_data(f"BT /F1 12 Tf (Invoice {number}) Tj ET /Logo Do".encode())
+    page[NameObject("/Contents")] = writer._add_object(content)
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/XObject"): DictionaryObject({NameObject("/Logo"): writer._add_object(logo)}),
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): writer._add_object(font)}),
+    })
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_merge_dedup_collapses_shared_resources(tmp_path):
+    files = [make_invoice(tmp_path / f"inv{n}.pdf", n) for n in range(5)]
+    plain = merge_logic(files, str(tmp_path / "plain.pdf"), lambda v: None)
+    result = merge_logic(files, str(tmp_path / "dedup.pdf"), lambda v: None, dedup=True)
+
+    stats = result["dedup"]
+    # Логотип, файл шрифта, дескриптор и шрифт — по 4 лишних копии каждого
+    assert stats["objects_removed"] == 16
+    assert stats["bytes_saved"] > 4 * len(LOGO)
+    assert stats["hash_seconds"] >= 0
+    assert os.path.getsize(result["outputs"][0]) < os.path.getsize(plain["outputs"][0]) - 4 * len(LOGO)
+
+    reader = PdfReader(result["outputs"][0])
+    assert len(reader.pages) == 5
+    logos = {p["/Resources"]["/XObject"].raw_get("/Logo").idnum for p in reader.pages}
+    fonts = {p["/Resources"]["/Font"].raw_get("/F1").idnum for p in reader.pages}
+    assert len(logos) == 1 and len(fonts) == 1
+    assert reader.pages[3].get_contents().get_data() == b"BT /F1 12 Tf (Invoice 3) Tj ET /Logo Do"
+    assert reader.pages[0]["/Resources"]["/XObject"]["/Logo"].get_data() == LOGO
+
+
+def test_dedup_keeps_identical_pages_distinct():
+    writer = PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    writer.add_blank_page(width=100, height=100)
+
+    stats = deduplicate_objects(writer)
+
+    assert stats.objects_removed == 0
+    assert len(writer.pages) == 2
+
+
+def test_merge_dedup_with_outline(tmp_path):
+    writer = PdfWriter()
+    for i in range(2):
+        writer.add_blank_page(width=100 + i, height=200)
+    chapter = writer.add_outline_item("Глава", 0)
+    writer.add_outline_item("Раздел", 1, parent=chapter)
+    src = tmp_path / "outline.pdf"
+    with open(src, "wb") as f:
+        writer.write(f)
+
+    result = merge_logic([str(src), str(src)], str(tmp_path / "out.pdf"), lambda v: None, dedup=True)
+
+    reader = PdfReader(result["outputs"][0])
+    assert len(reader.pages) == 4
+    assert len(reader.outline) >= 1
@@ -0,0 +1,122 @@
+import os
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject
+from core.operations import editor_logic, rotate_mirror_logic
+from core.task_manager import CancellationToken, OperationCancelled
+
+
+def make_nested(path):
+    """Дерево страниц из двух промежуточных узлов; у второго унаследованный /Rotate 90."""
+    writer = PdfWriter()
+    for i in range(4):
+        writer.add_blank_page(width=100 + i, height=200)
+    root_ref = writer._root_object.raw_get("/Pages")
+    root = root_ref.get_object()
+    kids = list(root["/Kids"])
+    nodes = []
+    for group, extra in ((kids[:2], {}), (kids[2:], {NameObject("/Rotate"): NumberObject(90)})):
+        node = DictionaryObject({NameObject("/Type"): NameObject("/Pages"), NameObject("/Parent"): root_ref,
+                                 NameObject("/Kids"): ArrayObject(group), NameObject("/Count"): NumberObject(2)})
+        node.update(extra)
+        node_ref = writer._add_object(node)
+        for kid in group:
+            kid.get_object()[NameObject("/Parent")] = node_ref
+        nodes.append(node_ref)
+    root[NameObject("/Kids")] = ArrayObject(nodes)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def widths(path):
+    return [int(p.mediabox.width) for p in PdfReader(path).pages]
+
+
+def test_incremental_rotate_appends_only_changed_pages(tmp_path, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 6)
+    original = open(src, "rb").read()
+
+    result = rotate_mirror_logic(PdfReader(src), str(tmp_path / "out.pdf"), "2, 5", "rotate", "90",
+                                 lambda v: None, incremental=True, source=src)
+
+    out = result["outputs"][0]
+    data = open(out, "rb").read()
+    assert result["incremental"] and result["changed_objects"] == 2
+    assert data.startswith(original)
+    reader = PdfReader(out, strict=True)
+    assert [p.get("/Rotate", 0) for p in reader.pages] == [0, 90, 0, 0, 90, 0]
+
+
+def test_incremental_reorder_flattens_nested_tree(tmp_path):
+    src = make_nested(tmp_path / "src.pdf")
+    reader = PdfReader(src)
+
+    result = editor_logic(reader, str(tmp_path / "out.pdf"), "4-1", lambda v: None, incremental=True, source=src)
+
+    out = result["outputs"][0]
+    assert result["incremental"]
+    assert widths(out) == [103, 102, 101, 100]
+    # Унаследованный поворот сохранился после переноса страниц в корневой узел
+    assert [p.get("/Rotate", 0) for p in PdfReader(out).pages] == [90, 90, 0, 0]
+
+
+def test_incremental_reorder_falls_back_on_duplicates(tmp_path, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 3)
+    result = editor_logic(PdfReader(src), str(tmp_path / "out.pdf"), "1, 1", lambda v: None,
+                          incremental=True, source=src)
+    assert "incremental" not in result
+    assert widths(result["outputs"][0]) == [100, 100, 101, 102]
+
+
+def test_incremental_cancel_leaves_no_output(tmp_path, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 3)
+    token = CancellationToken()
+    with pytest.raises(OperationCancelled):
+        rotate_mirror_logic(PdfReader(src), str(tmp_path / "out.pdf"), "1-3", "rotate", "90",
+                            lambda v: token.cancel(), cancel_token=token, incremental=True, source=src)
+    assert not (tmp_path / "out.pdf").exists()
+
+
+def test_incremental_mirror_appends_prefix_streams(tmp_path, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 3)
+    original = open(src, "rb").read()
+
+    result = rotate_mirror_logic(PdfReader(src), str(tmp_path / "out.pdf"), "3", "mirror", "h",
+                                 lambda v: None, incremental=True, source=src)
+
+    out = result["outputs"][0]
+    assert result["incremental"] and result["changed_objects"] == 3
+    assert open(out, "rb").read().startswith(original)
+    page = PdfReader(out, strict=True).pages[2]
+    assert page.get_contents().get_data().startswith(b"q -1 0 0 1 102 0 cm\n")
+
+
+@pytest.mark.parametrize("copy_range", ["missing", "fails"])
+def test_incremental_copy_falls_back_to_buffered_copy(tmp_path, monkeypatch, copy_range, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 3)
+    original = open(src, "rb").read()
+    if copy_range == "missing":
+        monkeypatch.delattr(os, "copy_file_range", raising=False)
+    else:
+        def fails(*args):
+            raise OSError(18, "Invalid cross-device link")
+        monkeypatch.setattr(os, "copy_file_range", fails, raising=False)
+
+    result = rotate_mirror_logic(PdfReader(src), str(tmp_path / "out.pdf"), "1", "rotate", "90",
+                                 lambda v: None, incremental=True, source=src)
+
+    assert open(result["outputs"][0], "rb").read().startswith(original)
+    assert PdfReader(result["outputs"][0], strict=True).pages[0]["/Rotate"] == 90
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_transform_rejects_bad_angle_and_unknown_action(tmp_path, incremental, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 2)
+    with pytest.raises(ValueError, match="multiple of 90"):
+        rotate_mirror_logic(PdfReader(src), str(tmp_path / "out.pdf"), "1", "rotate", "45",
+                            lambda v: None, incremental=incremental, source=src)
+    with pytest.raises(ValueError, match="flip"):
+        rotate_mirror_logic(PdfReader(src), str(tmp_path / "out.pdf"), "1", "flip", "h",
+                            lambda v: None, incremental=incremental, source=src)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["src.pdf"]
@@ -1,6 +1,8 @@
 import os
+import time
 import pytest
-from core.io_handler import get_reader, save_pdf, get_safe_unique_path
+from core.io_handler import atomic_output, get_reader, save_pdf, get_safe_unique_path
+from core.name_allocator import lock_path
 from unittest.mock import MagicMock, patch
 from utils.constants import ERR_ENCRYPTED
 
@@ -59,7 +61,7 @@ def test_get_unique_path_collision(tmp_path):
     assert os.path.basename(path_2) == "report_2.pdf"
 
 
-def test_save_pdf_no_directory_path(tmp_path):
+def test_save_pdf_no_directory_path(tmp_path, monkeypatch):
     """
     Проверка сохранения файла, когда путь не содержит папок (текущая директория).
     Это предотвращает WinError 3 при пустом os.path.dirname.
@@ -68,19 +70,196 @@ def test_save_pdf_no_directory_path(tmp_path):
     # Имя файла без указания папки
     filename = "local_result.pdf"
     
-    # Используем patch, чтобы подменить open и предотвратить реальную запись на диск,
+    # Пишем в tmp_path как в текущую папку,
     # но проверяем, что os.makedirs не вызывается с пустой строкой.
-    with patch("os.makedirs") as mock_makedirs, \
-         patch("builtins.open", MagicMock()) as mock_open:
-        
+    monkeypatch.chdir(tmp_path)
+    with patch("os.makedirs") as mock_makedirs:
         save_pdf(mock_writer, filename)
-        
-        # Проверяем, что makedirs не вызывался для пустой строки
-        # (или вообще не вызывался, если путь плоский)
-        for call in mock_makedirs.call_args_list:
-            assert call[0][0] != ""
-        
-        # Проверяем, что файл все равно попытались открыть для записи
-        mock_open.assert_called_once_with(filename, "wb")
-        # И writer был закрыт 
-        mock_writer.close.assert_called_once()
\ No newline at end of file
+
+    # Проверяем, что makedirs не вызывался для пустой строки
+    # (или вообще не вызывался, если путь плоский)
+    for call in mock_makedirs.call_args_list:
+        assert call[0][0] != ""
+
+    # Файл создан в текущей папке, временных файлов не осталось
+    assert os.listdir(tmp_path) == [filename]
+    # И writer был закрыт
+    mock_writer.close.assert_called_once()
+
+def test_mapped_source_pread_is_zero_copy(tmp_path):
+    from core.io_handler import MappedSource
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"0123456789")
+    with MappedSource(str(path)) as src:
+        chunk = src.pread(2, 4)
+        assert isinstance(chunk, memoryview)
+        assert chunk.obj is src.view.obj  # срез ссылается на то же отображение
+        assert bytes(chunk) == b"2345"
+        chunk.release()
+
+        stream = src.open_stream()
+        assert stream.read(3) == b"012"
+        stream.seek(-2, os.SEEK_END)
+        assert stream.read() == b"89"
+        assert stream.tell() == 10
+
+
+def test_mapped_source_concurrent_readers(tmp_path, make_pdf):
+    """Несколько потоков читают один источник через собственные потоки-позиции."""
+    import threading
+    from core.io_handler import MappedSource
+    src = MappedSource(make_pdf(tmp_path / "src.pdf", 30))
+    results = []
+
+    def worker():
+        reader = get_reader(src.open_stream())
+        results.append([int(p.mediabox.width) for p in reader.pages])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [list(range(100, 130))] * 4
+
+
+def test_map_stream_falls_back_for_unmappable(tmp_path, make_pdf):
+    """Пустые файлы и не файловые объекты возвращаются без изменений."""
+    from core.io_handler import map_stream, MappedStream
+    empty = tmp_path / "empty.pdf"
+    empty.write_bytes(b"")
+    with open(empty, "rb") as fh:
+        assert map_stream(fh) is fh
+    fake = MagicMock()
+    assert map_stream(fake) is fake
+    with open(make_pdf(tmp_path / "ok.pdf", 1), "rb") as fh:
+        assert isinstance(map_stream(fh), MappedStream)
+
+
+def test_save_pdf_is_atomic_and_reports_throughput(tmp_path, make_pdf):
+    from pypdf import PdfWriter
+    writer = PdfWriter(clone_from=make_pdf(tmp_path / "src.pdf", 1))
+    target = tmp_path / "out.pdf"
+
+    stats = save_pdf(writer, str(target), fsync=True)
+
+    assert sorted(os.listdir(tmp_path)) == ["out.pdf", "src.pdf"]
+    assert stats.bytes_written == target.stat().st_size > 0
+    assert stats.bytes_per_sec > 0
+
+
+@pytest.mark.skipif(os.name != "posix", reason="права файлов POSIX")
+def test_atomic_output_respects_umask_and_syncs_directory(tmp_path):
+    from core.io_handler import atomic_output
+    old = os.umask(0o027)
+    try:
+        with patch("core.io_handler._fsync_dir") as fsync_dir:
+            with atomic_output(str(tmp_path / "out.pdf"), fsync=True) as f_out:
+                f_out.write(b"%PDF-1.7")
+    finally:
+        os.umask(old)
+    assert (tmp_path / "out.pdf").stat().st_mode & 0o777 == 0o640
+    fsync_dir.assert_called_once_with(str(tmp_path))
+
+
+def test_save_pdf_failure_leaves_no_file(tmp_path):
+    mock_writer = MagicMock()
+    def broken_write(fh):
+        fh.write(b"%PDF-1.7 truncated")
+        raise OSError("disk full")
+    mock_writer.write.side_effect = broken_write
+
+    with pytest.raises(OSError):
+        save_pdf(mock_writer, str(tmp_path / "out.pdf"))
+    assert os.listdir(tmp_path) == []
+
+
+def test_name_allocator_concurrent_jobs_get_distinct_names(tmp_path):
+    import threading
+    from core.name_allocator import NameAllocator
+    allocator = NameAllocator()
+    (tmp_path / "part.pdf").write_bytes(b"old")
+    results = []
+
+    def job():
+        for _ in range(50):
+            results.append(allocator.allocate(str(tmp_path), "part.pdf"))
+
+    with patch("core.name_allocator.os.listdir", wraps=os.listdir) as listdir:
+        threads = [threading.Thread(target=job) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert len(set(results)) == 200
+    assert os.path.join(str(tmp_path), "part.pdf") not in results
+    # Папка прочитана один раз: собственные заглушки не вызывают перечитывание
+    assert listdir.call_count == 1
+    # Имена заняты на диске скрытыми метками, под самими именами ничего нет
+    assert all(os.path.exists(lock_path(p)) and not os.path.exists(p) for p in results)
+
+
+def test_name_allocator_sees_foreign_files_and_releases_placeholders(tmp_path):
+    from core.name_allocator import NameAllocator
+    allocator = NameAllocator()
+    first = allocator.allocate(str(tmp_path), "doc.pdf")
+    # Другой процесс занял следующее имя в обход индекса
+    (tmp_path / "doc_1.pdf").write_bytes(b"foreign")
+    second = allocator.allocate(str(tmp_path), "doc.pdf")
+    assert os.path.basename(second) == "doc_2.pdf"
+
+    allocator.release(first)
+    allocator.release(second)
+    assert sorted(os.listdir(tmp_path)) == ["doc_1.pdf"]
+
+
+def test_save_pdf_replaces_placeholder(tmp_path):
+    mock_writer = MagicMock()
+    mock_writer.write.side_effect = lambda fh: fh.write(b"%PDF-1.7")
+    path = get_safe_unique_path(str(tmp_path), "out.pdf")
+    # До успешной записи под итоговым именем ничего нет (даже если процесс упадет)
+    assert os.listdir(tmp_path) == [".out.pdf.lock"]
+
+    save_pdf(mock_writer, path)
+    assert open(path, "rb").read() == b"%PDF-1.7"
+    assert os.listdir(tmp_path) == ["out.pdf"]
+
+
+def test_repeated_saves_list_directory_once(tmp_path):
+    from core.name_allocator import name_allocator
+    name_allocator.forget(str(tmp_path))
+    (tmp_path / "old.pdf").write_bytes(b"old")
+    with patch("core.name_allocator.os.listdir", wraps=os.listdir) as listdir:
+        for _ in range(30):
+            path = get_safe_unique_path(str(tmp_path), "report.pdf")
+            with atomic_output(path) as f_out:
+                f_out.write(b"%PDF-1.7")
+        # Чужой файл — повод перечитать папку, но номера продолжаются с прежнего места
+        (tmp_path / "report_40.pdf").write_bytes(b"foreign")
+        path = get_safe_unique_path(str(tmp_path), "report.pdf")
+
+    # Собственные метки, временные файлы и переименования не вызывают перечитывание
+    assert listdir.call_count == 2
+    assert os.path.basename(path) == "report_30.pdf"
+    assert len([n for n in os.listdir(tmp_path) if n.startswith("report")]) == 31
+    name_allocator.release(path)
+
+
+def test_name_allocator_reclaims_stale_locks(tmp_path, monkeypatch):
+    import core.name_allocator as name_allocator_module
+    from core.name_allocator import NameAllocator
+    allocator = NameAllocator()
+    # Метка процесса, который упал между выбором имени и записью
+    (tmp_path / ".dead.pdf.lock").write_text("999999999")
+    monkeypatch.setattr(name_allocator_module, "_pid_alive", lambda pid: pid != 999999999)
+    assert os.path.basename(allocator.allocate(str(tmp_path), "dead.pdf")) == "dead.pdf"
+
+    # Метка живого процесса имя занимает
+    (tmp_path / ".busy.pdf.lock").write_text("1")
+    assert os.path.basename(allocator.allocate(str(tmp_path), "busy.pdf")) == "busy_1.pdf"
+    # ...пока не устарела
+    old = time.time() - name_allocator_module.STALE_LOCK_SECONDS - 10
+    os.utime(tmp_path / ".busy.pdf.lock", (old, old))
+    allocator.forget()
+    assert os.path.basename(allocator.allocate(str(tmp_path), "busy.pdf")) == "busy.pdf"
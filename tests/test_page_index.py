@@ -0,0 +1,119 @@
+import os
+import pytest
+from pypdf import PdfReader, PdfWriter
+from pypdf.annotations import Link
+from pypdf.generic import DecodedStreamObject, NameObject
+import core.page_index as page_index
+from core.jobs import run_job
+from core.operations import extract_logic, merge_logic
+from core.page_index import PageIndexStore, build_index, page_fingerprint, select_unique
+
+
+def make_pdf(path, labels, padding=0, links=None):
+    """
+    PDF со страницами, содержимое которых задают labels; padding сдвигает номера объектов,
+    links — адрес ссылки на каждой странице (None — без ссылки).
+    """
+    writer = PdfWriter()
+    for _ in range(padding):
+        writer._add_object(DecodedStreamObject())
+    for n, label in enumerate(labels):
+        page = writer.add_blank_page(width=200, height=200)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 10 10 Td ({label}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        if links and links[n]:
+            writer.add_annotation(n, Link(rect=(10, 10, 100, 30), url=links[n]))
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def page_texts(path):
+    return [page.get_contents().get_data().split(b"(")[1].split(b")")[0].decode()
+            for page in PdfReader(path).pages]
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    store = PageIndexStore(str(tmp_path / "index"))
+    monkeypatch.setattr(page_index, "page_index_store", store)
+    return store
+
+
+def test_fingerprint_ignores_object_numbers(tmp_path):
+    a = PdfReader(make_pdf(tmp_path / "a.pdf", ["x", "y"]))
+    b = PdfReader(make_pdf(tmp_path / "b.pdf", ["y", "x"], padding=5))
+    fa = [page_fingerprint(p) for p in a.pages]
+    fb = [page_fingerprint(p) for p in b.pages]
+    assert fa == fb[::-1]
+    assert fa[0] != fa[1]
+
+
+def test_fingerprint_covers_annotations(tmp_path):
+    path = make_pdf(tmp_path / "a.pdf", ["x", "x", "x", "x"],
+                    links=[None, "https://a.example", "https://b.example", "https://a.example"])
+    fingerprints = [page_fingerprint(p) for p in PdfReader(path).pages]
+    # Страницы, отличающиеся только ссылкой, не дубликаты; одинаковые ссылки — дубликаты
+    assert len(set(fingerprints[:3])) == 3
+    assert fingerprints[1] == fingerprints[3]
+
+    result = merge_logic([path], str(tmp_path / "out.pdf"), lambda v: None, drop_duplicates=True)
+    assert result["pages"] == 3 and result["duplicates_removed"] == 1
+
+
+def test_index_is_persisted_and_invalidated(tmp_path, store, monkeypatch):
+    path = make_pdf(tmp_path / "a.pdf", ["x", "x", "y"])
+    index = build_index([path])
+    assert store.load(path) == index[path]
+    assert index[path][0] == index[path][1] != index[path][2]
+
+    # Повторный запуск берет индекс с диска, файл не разбирается
+    monkeypatch.setattr(page_index, "_fingerprint_file", lambda p: pytest.fail("индекс не сохранен"))
+    assert build_index([path]) == index
+
+    make_pdf(path, ["z"])
+    assert store.load(path) is None
+
+
+def test_select_unique_across_files(tmp_path):
+    files = [make_pdf(tmp_path / "a.pdf", ["1", "2", "1"]), make_pdf(tmp_path / "b.pdf", ["2", "3"])]
+    selection, dropped = select_unique(files, build_index(files))
+    assert selection == [[0, 1], [1]]
+    assert dropped == 2
+
+
+@pytest.mark.parametrize("options", [{}, {"streaming": True}, {"workers": 2, "batch_size": 1}])
+def test_merge_drops_duplicate_pages(tmp_path, options):
+    files = [
+        make_pdf(tmp_path / "a.pdf", ["1", "2"]),
+        make_pdf(tmp_path / "b.pdf", ["2", "3", "1"], padding=3),
+        make_pdf(tmp_path / "c.pdf", ["3"]),
+        make_pdf(tmp_path / "d.pdf", ["4", "4"]),
+    ]
+    progress = []
+    result = merge_logic(files, str(tmp_path / "out.pdf"), progress.append, drop_duplicates=True, **options)
+    assert page_texts(result["outputs"][0]) == ["1", "2", "3", "4"]
+    assert result["pages"] == 4 and result["duplicates_removed"] == 4
+    assert progress[-1] == len(files)
+    assert [item["pages"] for item in result["inputs"]] == [2, 1, 0, 1]
+
+
+def test_extract_drops_repeats_within_block(tmp_path):
+    src = make_pdf(tmp_path / "src.pdf", ["a", "b", "a", "c"])
+    query = [("1-4", "all", False), ("3,1", "twice", False)]
+    result = extract_logic(PdfReader(src), str(tmp_path / "out"), query, lambda _: None,
+                           source=src, drop_duplicates=True)
+    assert [page_texts(p) for p in result["outputs"]] == [["a", "b", "c"], ["a"]]
+    assert result["duplicates_removed"] == 2
+
+
+def test_job_option(tmp_path):
+    files = [make_pdf(tmp_path / "a.pdf", ["1"]), make_pdf(tmp_path / "b.pdf", ["1", "2"])]
+    out = str(tmp_path / "merged.pdf")
+    result = run_job({"op": "merge", "files": files, "out": out, "drop_duplicates": True})
+    assert page_texts(result["outputs"][0]) == ["1", "2"]
+    assert result["duplicates_removed"] == 1
+    plain = run_job({"op": "merge", "files": files, "out": out})
+    assert "duplicates_removed" not in plain and plain["pages"] == 3
+    assert os.path.basename(plain["outputs"][0]) == "merged_1.pdf"
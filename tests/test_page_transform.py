@@ -0,0 +1,54 @@
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, NameObject, StreamObject
+from core.operations import rotate_mirror_logic
+
+
+def make_drawing(path, pages=3):
+    """Документ со сжатым потоком содержимого на каждой странице."""
+    writer = PdfWriter()
+    for i in range(pages):
+        page = writer.add_blank_page(width=500, height=800)
+        content = StreamObject()
+        content.set_data(f"{i} 0 m 200 300 l S\n".encode() * 50)
+        page[NameObject("/Contents")] = writer._add_object(content.flate_encode())
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def raw_streams(page):
+    contents = page.raw_get("/Contents").get_object()
+    refs = contents if isinstance(contents, ArrayObject) else [page.raw_get("/Contents")]
+    return [ref.get_object() for ref in refs]
+
+
+def test_fast_mirror_keeps_streams_compressed(tmp_path):
+    src = make_drawing(tmp_path / "src.pdf")
+    original = PdfReader(src).pages[1].raw_get("/Contents").get_object()._data
+    reader = PdfReader(src)
+
+    result = rotate_mirror_logic(reader, str(tmp_path / "out.pdf"), "2", "mirror", "h", lambda v: None,
+                                 fast_mirror=True)
+
+    out = PdfReader(result["outputs"][0])
+    streams = raw_streams(out.pages[1])
+    assert len(streams) == 3
+    assert streams[0].get_data() == b"q -1 0 0 1 500 0 cm\n"
+    assert streams[1]._data == original
+    assert streams[2].get_data() == b"\nQ"
+    # Прочие страницы и страницы ридера не тронуты
+    assert len(raw_streams(out.pages[0])) == 1
+    assert b"cm" not in reader.pages[1].get_contents().get_data()
+
+
+def test_fast_mirror_matches_add_transformation(tmp_path):
+    src = make_drawing(tmp_path / "src.pdf", pages=1)
+    fast = rotate_mirror_logic(PdfReader(src), str(tmp_path / "fast.pdf"), "1", "mirror", "v", lambda v: None,
+                               fast_mirror=True)
+    slow = rotate_mirror_logic(PdfReader(src), str(tmp_path / "slow.pdf"), "1", "mirror", "v", lambda v: None)
+
+    def ops(path):
+        content = PdfReader(path).pages[0].get_contents()
+        return [(list(args), op) for args, op in content.operations]
+
+    assert ops(fast["outputs"][0]) == ops(slow["outputs"][0])
@@ -60,7 +60,8 @@ def test_process_reverse_flow(mock_open, mock_val, mock_logic, mock_reader):
     time.sleep(0.1)
     
     # Проверяем, что вызван editor_logic с запросом "10-1"
-    mock_logic.assert_called_once_with(ANY, "out.pdf", "10-1", ANY)
+    mock_logic.assert_called_once_with(ANY, "out.pdf", "10-1", ANY, cancel_token=ANY,
+                                       incremental=ANY, source=ANY, raw_copy=ANY)
 
 @patch('core.processor.get_reader')
 @patch('core.processor.editor_logic')
@@ -79,7 +80,8 @@ def test_process_reverse_single_page(mock_open, mock_val, mock_logic, mock_reade
     time.sleep(0.1)
 
     # Для одной страницы запрос должен быть "1-1" 
-    mock_logic.assert_called_once_with(ANY, "out.pdf", "1", ANY)
+    mock_logic.assert_called_once_with(ANY, "out.pdf", "1", ANY, cancel_token=ANY,
+                                       incremental=ANY, source=ANY, raw_copy=ANY)
 
 @patch('core.processor.get_reader')
 @patch('core.processor.rotate_mirror_logic')
@@ -95,6 +97,67 @@ def test_process_transform_flow(mock_open, mock_val, mock_logic, mock_reader):
     time.sleep(0.1) # Ожидание выполнения потока [cite: 44]
     
     mock_val.assert_called_once_with("in.pdf")
-    mock_logic.assert_called_once_with(ANY, "out.pdf", "1-3", "rotate", "180", ANY)
+    mock_logic.assert_called_once_with(ANY, "out.pdf", "1-3", "rotate", "180", ANY, cancel_token=ANY,
+                                       incremental=ANY, source=ANY, fast_mirror=ANY)
     # Проверка уведомления об успехе [cite: 34]
     mock_app.safe_message.assert_called_with("info", "Готово", "Файл успешно трансформирован.")
+
+
+@patch('core.processor.get_reader')
+@patch('core.processor.split_logic')
+@patch('core.processor.validate_file_exists')
+@patch('core.processor.open', create=True)
+def test_process_split_flow(mock_open, mock_val, mock_logic, mock_reader):
+    """Деление по размеру: мегабайты переводятся в байты, имя частей — от имени файла."""
+    mock_app = MagicMock()
+    processor = PdfProcessor(mock_app)
+
+    processor.process_split("/data/scan.pdf", "/out", max_mb=2)
+
+    time.sleep(0.1)
+
+    mock_logic.assert_called_once_with(ANY, "/out", "scan", ANY, pages_per_file=None, max_bytes=2 * 1024 * 1024,
+                                       cancel_token=ANY, raw_copy=ANY)
+
+
+def test_process_cancel_running_job(tmp_path, make_pdf):
+    """cancel(job_id) прерывает выполняющееся задание, результат не создается."""
+    from core.task_manager import JOB_CANCELLED
+    src = make_pdf(tmp_path / "src.pdf", 5)
+
+    mock_app = MagicMock()
+    processor = PdfProcessor(mock_app)
+    job_ids = []
+    # Отменяем задание изнутри колбэка прогресса после первой страницы
+    mock_app.update_progress_snapshot.side_effect = lambda snap: snap.done == 1 and processor.cancel(job_ids[0])
+    job_ids.append(processor.process_transform(src, str(tmp_path / "out.pdf"), "1-5", "rotate", "90"))
+    processor.scheduler.wait(job_ids[0], timeout=5)
+
+    assert processor.job_status(job_ids[0]) == JOB_CANCELLED
+    assert not (tmp_path / "out.pdf").exists()
+    mock_app.safe_message.assert_called_with("warning", "Внимание", "Операция отменена.")
+
+@patch('core.processor.map_stream')
+@patch('core.processor.get_reader')
+@patch('core.processor.open', create=True)
+def test_load_reader_closes_file_on_parse_error(mock_open, mock_reader, mock_map):
+    """Файл, который не удалось разобрать (шифрование, повреждение), не остается открытым."""
+    mock_reader.side_effect = ValueError("Файл зашифрован")
+    processor = PdfProcessor(MagicMock())
+    with pytest.raises(ValueError):
+        processor._load_reader("locked.pdf")
+    mock_open.return_value.close.assert_called_once()
+
+def test_final_progress_snapshot_is_not_throttled():
+    """Последнее обновление, отброшенное ограничением частоты, все равно доходит до UI."""
+    mock_app = MagicMock()
+    processor = PdfProcessor(mock_app)
+
+    def task():
+        reporter = processor._reporter(None, "стр.")
+        for done in range(1, 4):
+            reporter(done)
+
+    job_id = processor._execute_safe(task, "ok")
+    processor.scheduler.wait(job_id, timeout=1.0)
+    assert mock_app.update_progress_snapshot.call_args[0][0].done == 3
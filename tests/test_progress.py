@@ -0,0 +1,61 @@
+import pytest
+from core.progress import ProgressReporter, ProgressSnapshot, format_snapshot
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reporter_coalesces_updates_to_max_rate():
+    """50 000 обновлений за 1 секунду дают не больше ~20 срезов + финальный."""
+    clock = FakeClock()
+    snapshots = []
+    reporter = ProgressReporter(snapshots.append, total=50000, max_rate_hz=20, clock=clock)
+
+    for i in range(1, 50001):
+        clock.now = i / 50000
+        reporter(i)
+
+    assert len(snapshots) <= 22
+    assert snapshots[-1].done == 50000
+    assert reporter.emitted == len(snapshots)
+
+
+def test_reporter_rate_bytes_and_eta():
+    clock = FakeClock()
+    snapshots = []
+    reporter = ProgressReporter(snapshots.append, total=100, total_bytes=1000, max_rate_hz=0, clock=clock)
+
+    clock.now = 2.0
+    reporter.update(50)
+    snap = snapshots[-1]
+
+    assert snap.rate == pytest.approx(25.0)
+    assert snap.bytes_done == 500
+    assert snap.bytes_per_sec == pytest.approx(250.0)
+    assert snap.eta == pytest.approx(2.0)
+
+    # Явно переданные байты имеют приоритет над оценкой
+    reporter.update(60, bytes_done=900)
+    assert snapshots[-1].bytes_done == 900
+
+
+def test_reporter_compatible_with_update_progress_signature():
+    """Вызов reporter(value, maximum) задает новый максимум, как app.update_progress."""
+    snapshots = []
+    reporter = ProgressReporter(snapshots.append, max_rate_hz=0)
+    reporter(0, 10)
+    reporter(10)
+    assert snapshots[-1].total == 10 and snapshots[-1].done == 10
+    reporter.finish()
+    assert len(snapshots) == 3
+
+
+def test_format_snapshot():
+    snap = ProgressSnapshot(done=120, total=500, unit="стр.", rate=40.0, bytes_done=0,
+                            bytes_per_sec=2 * 1024 * 1024, eta=9.5, elapsed=3.0)
+    assert format_snapshot(snap) == "120/500 стр. · 40.0 стр./с · 2.0 МБ/с · осталось 0:10"
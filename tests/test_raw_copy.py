@@ -0,0 +1,86 @@
+import io
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, NumberObject, StreamObject
+from core.io_handler import get_reader
+from core.operations import editor_logic, extract_logic
+from core.raw_copy import raw_copier, scan_body
+from core.streaming import StreamingPdfWriter
+
+
+def make_source(path, pages=4):
+    """Страницы с общим изображением и собственными потоками содержимого."""
+    writer = PdfWriter()
+    image = StreamObject()
+    image.set_data(bytes(range(256)) * 16)
+    image.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+                  NameObject("/Width"): NumberObject(64), NameObject("/Height"): NumberObject(64),
+                  NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                  NameObject("/BitsPerComponent"): NumberObject(8)})
+    image_ref = writer._add_object(image.flate_encode())
+    for i in range(pages):
+        page = writer.add_blank_page(width=200, height=200)
+        content = StreamObject()
+        content.set_data(f"q 64 0 0 64 {i} 0 cm /Im1 Do Q".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/Im1"): image_ref})})
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_scan_body_finds_refs_type_and_length():
+    data = b" << /Type /XObject /Length 12 0 R /S (a 1 0 R \\) (x)) /K [3 0 R] >>\nstream\n"
+    body = scan_body(data, 0)
+    assert body.stream and body.type == b"/XObject" and body.length == (12, 0)
+    # Ссылка внутри строки не считается
+    assert [(num, gen) for _, _, num, gen in body.refs] == [(12, 0), (3, 0)]
+    assert data[body.end:].startswith(b"stream")
+
+    body = scan_body(b"<< /Length 5 /Filter /FlateDecode >>stream", 0)
+    assert body.length == 5
+    assert scan_body(b"<< /A 1 0 R", 0) is None
+
+
+def test_raw_copy_keeps_stream_bytes(tmp_path):
+    src = make_source(tmp_path / "src.pdf")
+    with open(src, "rb") as fh:
+        reader = get_reader(fh)
+        out = io.BytesIO()
+        writer = StreamingPdfWriter(out)
+        writer.add_pages(reader, [3, 1], raw=True)
+        writer.close()
+
+    assert writer.raw_objects >= 3  # изображение и два потока содержимого
+    result = PdfReader(io.BytesIO(out.getvalue()), strict=True)
+    source = PdfReader(src)
+    assert [p.get_contents().get_data() for p in result.pages] == \
+        [source.pages[3].get_contents().get_data(), source.pages[1].get_contents().get_data()]
+    image = result.pages[0]["/Resources"]["/XObject"]["/Im1"]
+    assert image._data == source.pages[0]["/Resources"]["/XObject"]["/Im1"]._data
+
+
+def test_raw_copy_skipped_for_encrypted(tmp_path):
+    writer = PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    writer.encrypt("", "owner")
+    path = tmp_path / "enc.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    with open(path, "rb") as fh:
+        assert raw_copier(get_reader(fh)) is None
+
+
+def test_extract_and_editor_raw_copy(tmp_path):
+    src = make_source(tmp_path / "src.pdf")
+    with open(src, "rb") as fh:
+        reader = get_reader(fh)
+        extracted = extract_logic(reader, str(tmp_path), [("2-3", "part", False)], lambda v: None, raw_copy=True)
+        edited = editor_logic(reader, str(tmp_path / "edit.pdf"), "4, 4", lambda v: None, raw_copy=True)
+
+    part = PdfReader(extracted["outputs"][0], strict=True)
+    assert extracted["pages"] == 2 and len(part.pages) == 2
+    edit = PdfReader(edited["outputs"][0], strict=True)
+    assert edited["pages"] == len(edit.pages) == 5
+    firsts = [p.get_contents().get_data() for p in edit.pages]
+    assert firsts[0] == firsts[1] and firsts[0].endswith(b"3 0 cm /Im1 Do Q")
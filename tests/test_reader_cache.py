@@ -0,0 +1,76 @@
+import os
+import pytest
+from core.reader_cache import ReaderCache, load_reader
+
+
+def counting_loader(calls):
+    def loader(path):
+        calls.append(path)
+        return load_reader(path)
+    return loader
+
+
+def test_reader_cache_hit_and_miss(tmp_path, make_pdf):
+    cache = ReaderCache(budget_bytes=10 * 2 ** 20, max_entries=4)
+    path = make_pdf(tmp_path / "a.pdf", 3)
+    calls = []
+
+    with cache.lease(path, counting_loader(calls)) as first:
+        assert len(first.pages) == 3
+    with cache.lease(path, counting_loader(calls)) as second:
+        assert second is first
+
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_reader_cache_invalidates_changed_file(tmp_path, make_pdf):
+    cache = ReaderCache(budget_bytes=10 * 2 ** 20, max_entries=4)
+    path = make_pdf(tmp_path / "a.pdf", 3)
+    with cache.lease(path) as reader:
+        assert len(reader.pages) == 3
+
+    make_pdf(tmp_path / "a.pdf", 5)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    with cache.lease(path) as reader:
+        assert len(reader.pages) == 5
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_reader_cache_lru_eviction_by_entries_and_budget(tmp_path, make_pdf):
+    paths = [make_pdf(tmp_path / f"{n}.pdf", 1) for n in range(3)]
+    size = os.path.getsize(paths[0])
+
+    cache = ReaderCache(budget_bytes=10 * 2 ** 20, max_entries=2)
+    for p in paths:
+        with cache.lease(p):
+            pass
+    assert cache.stats()["entries"] == 2 and cache.stats()["evictions"] == 1
+
+    # Бюджет на два файла: обращение к первому делает его «свежим», вытесняется второй
+    cache = ReaderCache(budget_bytes=size * 2, max_entries=10)
+    calls = []
+    for p in [paths[0], paths[1], paths[0], paths[2], paths[0]]:
+        with cache.lease(p, counting_loader(calls)):
+            pass
+    assert calls == [paths[0], paths[1], paths[2]]
+
+
+def test_reader_cache_reset_after_mutation(tmp_path, make_pdf):
+    cache = ReaderCache(budget_bytes=10 * 2 ** 20, max_entries=4)
+    path = make_pdf(tmp_path / "a.pdf", 2)
+    with cache.lease(path, mutates=True) as reader:
+        reader.pages[0].rotate(90)
+    with cache.lease(path) as reader:
+        assert reader.pages[0].get("/Rotate") is None
+    assert cache.stats()["misses"] == 1
+
+
+def test_reader_cache_bypasses_unknown_files(tmp_path):
+    cache = ReaderCache(budget_bytes=10 * 2 ** 20, max_entries=4)
+    with pytest.raises(FileNotFoundError):
+        with cache.lease(str(tmp_path / "missing.pdf")):
+            pass
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,136 @@
+import os
+import pytest
+from pypdf import PdfReader
+import core.jobs as jobs
+import core.result_cache as result_cache_module
+from core.jobs import run_job
+from core.result_cache import ResultCache, normalize_query
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=1024 * 1024)
+    monkeypatch.setattr(result_cache_module, "result_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Считает реальные запуски операций."""
+    counter = {"extract": 0, "editor": 0, "transform": 0}
+
+    def counting(name, func):
+        def wrapper(*args, **kwargs):
+            counter[name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(jobs, "extract_logic", counting("extract", jobs.extract_logic))
+    monkeypatch.setattr(jobs, "editor_logic", counting("editor", jobs.editor_logic))
+    monkeypatch.setattr(jobs, "rotate_mirror_logic", counting("transform", jobs.rotate_mirror_logic))
+    return counter
+
+
+@pytest.mark.parametrize("query, ordered, expected", [
+    ("1,2,3, 5", True, "1-3,5"),
+    ("1-3,5", True, "1-3,5"),
+    ("5-4,3", True, "5-3"),
+    ("1, 3-1", True, "1,3-1"),
+    ("2,1,2", True, "2-1,2"),
+    ("5,1-3,2", False, "1-3,5"),
+    ("3-1, 4", False, "1-4"),
+    ("x-1", True, "x-1"),
+])
+def test_normalize_query(query, ordered, expected):
+    assert normalize_query(query, ordered) == expected
+
+
+def test_repeat_edit_is_served_from_cache_without_new_file(tmp_path, cache, calls, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 4)
+    out = str(tmp_path / "out" / "edited.pdf")
+    job = {"op": "edit", "src": src, "out": out, "pages": "4, 1-2", "cache": True}
+    first = run_job(job)
+    assert "cached" not in first and calls["editor"] == 1
+
+    # Та же строка в другой записи — тот же ключ
+    second = run_job(dict(job, pages="4,1,2"))
+    assert second["cached"] is True and calls["editor"] == 1
+    # Результат уже лежит под запрошенным именем (жесткая ссылка) — новый файл _1 не нужен
+    assert second["outputs"] == first["outputs"] == [out]
+    assert os.listdir(tmp_path / "out") == ["edited.pdf"]
+    assert second["pages"] == first["pages"]
+    assert cache.hits == 1 and cache.misses == 1
+
+    # Запрос в другую папку получает ссылку на тот же результат
+    third = run_job(dict(job, out=str(tmp_path / "other" / "copy.pdf")))
+    assert third["cached"] and os.path.samefile(third["outputs"][0], out)
+    assert [p.mediabox.width for p in PdfReader(third["outputs"][0]).pages] == [103, 100, 101, 102]
+
+
+def test_changed_source_or_options_miss(tmp_path, cache, calls, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 3)
+    job = {"op": "transform", "src": src, "out": str(tmp_path / "rot.pdf"), "pages": "1-2",
+           "action": "rotate", "value": "90", "cache": True}
+    run_job(job)
+    run_job(dict(job, pages="2,1"))
+    assert calls["transform"] == 1
+    run_job(dict(job, value="180"))
+    assert calls["transform"] == 2
+    make_pdf(src, 3, width=300)
+    run_job(job)
+    assert calls["transform"] == 3
+
+
+def test_extract_hit_uses_requested_names(tmp_path, cache, calls, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 5)
+    job = {"op": "extract", "src": src, "dest": str(tmp_path / "a"), "cache": True,
+           "blocks": [["1-2", "intro", False], ["1-4", "rest", True]]}
+    run_job(job)
+    result = run_job(dict(job, dest=str(tmp_path / "b"), blocks=[["1,2", "one", False], ["4-1", "two", True]]))
+    assert calls["extract"] == 1 and result["cached"]
+    assert [os.path.basename(p) for p in result["outputs"]] == ["one.pdf", "two.pdf"]
+    assert len(PdfReader(result["outputs"][1]).pages) == 1
+
+
+def test_output_modified_in_place_invalidates_entry(tmp_path, cache, calls, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 2)
+    out = tmp_path / "rev.pdf"
+    job = {"op": "reverse", "src": src, "out": str(out), "cache": True}
+    run_job(job)
+    with open(out, "ab") as f:
+        f.write(b"\n% edited")
+    result = run_job(job)
+    assert calls["editor"] == 2 and "cached" not in result
+    assert os.path.basename(result["outputs"][0]) == "rev_1.pdf"
+
+
+def test_copy_mode_and_disabled_cache(tmp_path, monkeypatch, calls, make_pdf):
+    cache = ResultCache(str(tmp_path / "cache"), link=False)
+    monkeypatch.setattr(result_cache_module, "result_cache", cache)
+    src = make_pdf(tmp_path / "src.pdf", 2)
+    job = {"op": "reverse", "src": src, "out": str(tmp_path / "rev.pdf"), "cache": True}
+    first = run_job(job)
+    second = run_job(job)
+    assert second["cached"] and not os.path.samefile(first["outputs"][0], second["outputs"][0])
+    assert open(first["outputs"][0], "rb").read() == open(second["outputs"][0], "rb").read()
+
+    run_job(dict(job, cache=False))
+    assert calls["editor"] == 2
+
+
+def test_lru_eviction(tmp_path, make_pdf):
+    srcs = [make_pdf(tmp_path / f"{i}.pdf", 1, width=100 + i) for i in range(3)]
+    # Помещаются две записи из трех
+    cache = ResultCache(str(tmp_path / "cache"), max_bytes=os.path.getsize(srcs[0]) * 5 // 2)
+    keys = [cache.key(src, "noop", {}) for src in srcs]
+    for key, src in zip(keys[:2], srcs[:2]):
+        cache.put(key, {"pages": 1, "outputs": [src]})
+    # Первая запись использована позже второй — вытесняется вторая
+    meta = os.path.join(cache._entry_dir(keys[1]), "meta.json")
+    os.utime(meta, ns=(1, 1))
+    assert cache.get(keys[0], [str(tmp_path / "hit.pdf")])["cached"]
+    cache.put(keys[2], {"pages": 1, "outputs": [srcs[2]]})
+    assert os.path.exists(cache._entry_dir(keys[0]))
+    assert not os.path.exists(cache._entry_dir(keys[1]))
+    assert os.path.exists(cache._entry_dir(keys[2]))
+    assert cache.get(keys[1], [str(tmp_path / "miss.pdf")]) is None
@@ -0,0 +1,199 @@
+import io
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import pytest
+from pypdf import PdfReader
+import core.server as server_module
+from core.server import JobService, ServiceMetrics, make_server, render_prometheus, _percentile
+
+
+@pytest.fixture
+def running_server(tmp_path):
+    """Запускает сервис на свободном порту; фабрика принимает параметры JobService."""
+    started = []
+
+    def start(**kwargs):
+        service = JobService(work_dir=str(tmp_path / "work"), **kwargs)
+        httpd = make_server(service, "127.0.0.1", 0)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        started.append((httpd, service))
+        return service, f"http://127.0.0.1:{httpd.server_address[1]}"
+
+    yield start
+    for httpd, service in started:
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
+
+
+def request(method, url, body=None, headers=None):
+    """(код, тело) ответа; ошибки HTTP не выбрасываются."""
+    if isinstance(body, dict):
+        body = json.dumps(body).encode()
+    req = urllib.request.Request(url, data=body, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, resp.read(), dict(resp.headers)
+    except urllib.error.HTTPError as e:
+        return e.code, e.read(), dict(e.headers)
+
+
+def test_upload_extract_download_and_metrics(tmp_path, running_server, make_pdf):
+    service, base = running_server(workers=1)
+    src = make_pdf(tmp_path / "src.pdf", 4)
+    with open(src, "rb") as f:
+        status, body, _ = request("POST", f"{base}/files?name=scan.pdf", f.read())
+    assert status == 201
+    uploaded = json.loads(body)["path"]
+
+    job = {"op": "extract", "src": uploaded, "blocks": [["2-3", "part", False]]}
+    status, body, headers = request("POST", f"{base}/jobs", job)
+    assert status == 202
+    job_id = json.loads(body)["id"]
+    assert headers["Location"] == f"/jobs/{job_id}"
+
+    status, body, _ = request("GET", f"{base}/jobs/{job_id}?wait=10")
+    info = json.loads(body)
+    assert info["status"] == "done"
+    assert info["result"]["pages"] == 2
+    assert info["result"]["outputs"][0].startswith(service.results_dir)
+
+    status, body, headers = request("GET", f"{base}/jobs/{job_id}/outputs/0")
+    assert status == 200 and headers["Content-Type"] == "application/pdf"
+    (tmp_path / "downloaded.pdf").write_bytes(body)
+    assert [p.mediabox.width for p in PdfReader(str(tmp_path / "downloaded.pdf")).pages] == [101, 102]
+
+    status, body, _ = request("GET", f"{base}/metrics?format=json")
+    metrics = json.loads(body)
+    assert metrics["queue_depth"] == 0
+    assert metrics["jobs"]["done"] == 1
+    assert metrics["pages_total"] == 2 and metrics["pages_per_sec"] > 0
+    assert set(metrics["latency_seconds"]) == {"0.5", "0.9", "0.99"}
+
+    status, body, headers = request("GET", f"{base}/metrics")
+    assert headers["Content-Type"].startswith("text/plain")
+    assert 'pdf_jobs_total{status="done"} 1' in body.decode()
+
+
+def test_queue_full_returns_429_and_cancel(monkeypatch, running_server):
+    gate = threading.Event()
+    monkeypatch.setattr(server_module, "run_job",
+                        lambda job, progress_cb=None, cancel_token=None: gate.wait(5) and {"pages": 1})
+    service, base = running_server(workers=1, max_queue=1)
+    job = {"op": "reverse", "src": "a.pdf", "out": "b.pdf"}
+    status, body, _ = request("POST", f"{base}/jobs", job)
+    running_id = json.loads(body)["id"]
+    while service.scheduler.running_count() != 1:
+        time.sleep(0.001)
+    status, body, _ = request("POST", f"{base}/jobs", job)
+    queued_id = json.loads(body)["id"]
+
+    status, _, headers = request("POST", f"{base}/jobs", job)
+    assert status == 429 and headers["Retry-After"] == "1"
+    metrics = json.loads(request("GET", f"{base}/metrics?format=json")[1])
+    assert metrics["queue_depth"] == 1 and metrics["running"] == 1
+    assert metrics["jobs"]["rejected"] == 1
+
+    status, body, _ = request("DELETE", f"{base}/jobs/{queued_id}")
+    assert json.loads(body)["cancelled"] is True
+    assert json.loads(request("GET", f"{base}/jobs/{queued_id}")[1])["status"] == "cancelled"
+    gate.set()
+    assert json.loads(request("GET", f"{base}/jobs/{running_id}?wait=5")[1])["status"] == "done"
+    metrics = json.loads(request("GET", f"{base}/metrics?format=json")[1])
+    assert metrics["jobs"]["cancelled"] == 1 and metrics["jobs"]["done"] == 1
+
+
+def test_bad_requests(running_server):
+    _, base = running_server()
+    assert request("POST", f"{base}/jobs", {"op": "unknown"})[0] == 400
+    assert request("POST", f"{base}/jobs", b"{not json")[0] == 400
+    assert request("GET", f"{base}/jobs/999")[0] == 404
+    assert request("DELETE", f"{base}/jobs/999")[0] == 404
+    assert request("GET", f"{base}/nowhere")[0] == 404
+
+    job = {"op": "reverse", "src": "missing.pdf"}
+    job_id = json.loads(request("POST", f"{base}/jobs", job)[1])["id"]
+    info = json.loads(request("GET", f"{base}/jobs/{job_id}?wait=5")[1])
+    assert info["status"] == "failed" and info["error"]
+    assert request("GET", f"{base}/jobs/{job_id}/outputs/0")[0] == 404
+
+
+def test_upload_size_limit(running_server):
+    _, base = running_server(max_upload_mb=0.001)
+    assert request("POST", f"{base}/files?name=big.pdf", b"x" * 2048)[0] == 413
+
+
+def test_finished_jobs_are_forgotten(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_module, "run_job", lambda job, progress_cb=None, cancel_token=None: {"pages": 1})
+    service = JobService(workers=1, work_dir=str(tmp_path), keep_finished=2)
+    ids = [service.submit({"op": "reverse", "src": "a.pdf", "out": "b.pdf"}) for _ in range(4)]
+    service.scheduler.wait(ids[-1], timeout=5)
+    service.close()
+    assert service.scheduler.get_job(ids[0]) is None
+    assert service.scheduler.get_job(ids[-1]) is not None
+
+
+def test_forgotten_jobs_remove_their_files(tmp_path, monkeypatch):
+    def fake_run(job, progress_cb=None, cancel_token=None):
+        os.makedirs(os.path.dirname(job["out"]), exist_ok=True)
+        open(job["out"], "wb").close()
+        return {"pages": 1, "outputs": [job["out"]]}
+
+    monkeypatch.setattr(server_module, "run_job", fake_run)
+    now = [0.0]
+    service = JobService(workers=1, work_dir=str(tmp_path / "work"), keep_finished=1, upload_ttl=60,
+                         clock=lambda: now[0])
+    shared = service.store_upload(io.BytesIO(b"%PDF"), 4, "shared.pdf")
+    single = service.store_upload(io.BytesIO(b"%PDF"), 4, "single.pdf")
+    orphan = service.store_upload(io.BytesIO(b"%PDF"), 4, "orphan.pdf")
+    custom = str(tmp_path / "custom" / "out.pdf")
+
+    def run(job):
+        job_id = service.submit(job)
+        service.scheduler.wait(job_id, timeout=5)
+        return service.describe(job_id)["result"]["outputs"][0]
+
+    first = run({"op": "merge", "files": [shared, single]})
+    second = run({"op": "reverse", "src": shared, "out": custom})
+    # Первое задание забыто: его результат и загрузка single удалены, shared еще нужна второму
+    assert not os.path.exists(first) and not os.path.exists(os.path.dirname(first))
+    assert not os.path.exists(single) and os.path.exists(shared)
+    assert os.path.exists(orphan)
+
+    now[0] = 61.0
+    third = run({"op": "reverse", "src": str(tmp_path / "elsewhere.pdf")})
+    assert not os.path.exists(shared) and not os.path.exists(orphan)
+    # Путь результата, заданный клиентом, сервису не принадлежит
+    assert os.path.exists(second) and os.path.exists(third)
+    service.close()
+
+
+def test_job_body_size_limit(running_server):
+    _, base = running_server(max_job_kb=1)
+    job = {"op": "reverse", "src": "a.pdf", "out": "b.pdf", "note": "x" * 2048}
+    assert request("POST", f"{base}/jobs", job)[0] == 413
+
+
+def test_metrics_percentiles_and_rate_window():
+    now = [100.0]
+    metrics = ServiceMetrics(window=10, clock=lambda: now[0])
+    for i in range(1, 101):
+        metrics.finished("done", i / 100, i / 200, pages=1)
+    now[0] = 105.0
+    snap = metrics.snapshot()
+    assert snap["latency_seconds"] == {"0.5": 0.5, "0.9": 0.9, "0.99": 0.99}
+    assert snap["pages_per_sec"] == pytest.approx(100 / 5)
+    now[0] = 120.0
+    assert metrics.pages_per_sec() == 0
+    assert metrics.snapshot()["pages_total"] == 100
+    assert _percentile([], 0.5) == 0.0
+
+    snap.update(queue_depth=3, running=1)
+    text = render_prometheus(snap)
+    assert "pdf_jobs_queue_depth 3" in text
+    assert 'pdf_job_latency_seconds{quantile="0.99"} 0.99' in text
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+from ui.tkinter_gui import LazyProcessor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_gui_import_does_not_load_pypdf():
+    code = "import sys, ui.tkinter_gui; print('pypdf' in sys.modules, 'core.processor' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.split() == ["False", "False"]
+
+
+def test_lazy_processor_loads_on_first_use():
+    app = MagicMock()
+    proxy = LazyProcessor(app)
+    assert proxy.app is app
+
+    # Отмена и завершение до первой операции не создают обработчик
+    proxy.cancel_all()
+    proxy.shutdown()
+    assert not proxy.loaded
+
+    assert proxy.job_status("missing") is None
+    assert proxy.loaded
+    proxy.shutdown()
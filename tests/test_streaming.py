@@ -0,0 +1,142 @@
+import io
+import pytest
+from pypdf import PdfWriter, PdfReader
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject, NumberObject, StreamObject
+import os
+from core.operations import merge_logic, split_logic
+from core.streaming import StreamingPdfWriter
+from core.task_manager import CancellationToken, OperationCancelled
+
+
+def make_pdf(path, pages, tag):
+    """PDF с общим для всех страниц ресурсом и собственным потоком содержимого на странице."""
+    writer = PdfWriter()
+    shared = StreamObject()
+    shared.set_data(b"0 0 m 10 10 l S")
+    shared.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Form"),
+                   NameObject("/BBox"): ArrayObject([NumberObject(0)] * 4)})
+    shared_ref = writer._add_object(shared)
+    for i in range(pages):
+        page = writer.add_blank_page(width=100 + i, height=200)
+        content = StreamObject()
+        content.set_data(f"BT ({tag}{i}) Tj ET /X0 Do".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/X0"): shared_ref})
+        })
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_streaming_merge_preserves_order_and_content(tmp_path):
+    a = make_pdf(tmp_path / "a.pdf", 3, "A")
+    b = make_pdf(tmp_path / "b.pdf", 2, "B")
+    progress = []
+
+    result = merge_logic([a, b, a], str(tmp_path / "merged.pdf"), progress.append, streaming=True)
+
+    reader = PdfReader(result["outputs"][0])
+    assert result["pages"] == 8 and len(reader.pages) == 8
+    assert progress == [1, 2, 3]
+    assert [int(p.mediabox.width) for p in reader.pages] == [100, 101, 102, 100, 101, 100, 101, 102]
+    assert reader.pages[3].get_contents().get_data() == b"BT (B0) Tj ET /X0 Do"
+    # Общий ресурс одного входного файла записан один раз и разделяется его страницами
+    x0 = [p["/Resources"]["/XObject"].raw_get("/X0").idnum for p in reader.pages[:3]]
+    assert len(set(x0)) == 1
+
+
+def test_streaming_writer_subset_and_duplicates(tmp_path):
+    src = make_pdf(tmp_path / "src.pdf", 4, "S")
+    buf = io.BytesIO()
+    writer = StreamingPdfWriter(buf)
+    writer.add_pages(PdfReader(src), [3, 0, 0])
+    writer.close()
+
+    reader = PdfReader(io.BytesIO(buf.getvalue()))
+    assert [int(p.mediabox.width) for p in reader.pages] == [103, 100, 100]
+    assert writer.bytes_written == len(buf.getvalue())
+
+
+def test_streaming_merge_cancel_removes_output(tmp_path):
+    a = make_pdf(tmp_path / "a.pdf", 2, "A")
+    token = CancellationToken()
+    with pytest.raises(OperationCancelled):
+        merge_logic([a, a], str(tmp_path / "merged.pdf"), lambda v: token.cancel(),
+                    cancel_token=token, streaming=True)
+    assert not (tmp_path / "merged.pdf").exists()
+
+
+def test_split_every_n_pages(tmp_path):
+    src = make_pdf(tmp_path / "src.pdf", 5, "S")
+    progress = []
+
+    result = split_logic(PdfReader(src), str(tmp_path / "out"), "src", progress.append, pages_per_file=2)
+
+    assert [os.path.basename(p) for p in result["outputs"]] == ["src_part_1.pdf", "src_part_2.pdf", "src_part_3.pdf"]
+    widths = [[int(p.mediabox.width) for p in PdfReader(path, strict=True).pages] for path in result["outputs"]]
+    assert widths == [[100, 101], [102, 103], [104]]
+    assert result["pages"] == 5 and progress[-1] == 5
+    assert result["write"]["files"] == 3
+
+
+def test_split_by_size_keeps_parts_under_limit(tmp_path):
+    writer = PdfWriter()
+    for i in range(12):
+        page = writer.add_blank_page(width=100 + i, height=200)
+        content = StreamObject()
+        content.set_data(f"% {i}\n".encode() + b"0 0 m 10 10 l S\n" * 600)
+        page[NameObject("/Contents")] = writer._add_object(content)
+    src = tmp_path / "big.pdf"
+    with open(src, "wb") as f:
+        writer.write(f)
+    limit = 40 * 1024
+
+    result = split_logic(PdfReader(str(src)), str(tmp_path), "big", lambda v: None, max_bytes=limit)
+
+    sizes = [os.path.getsize(p) for p in result["outputs"]]
+    assert len(sizes) > 1 and all(size <= limit for size in sizes)
+    assert sum(len(PdfReader(p).pages) for p in result["outputs"]) == 12
+
+
+def test_split_cancel_removes_parts(tmp_path):
+    src = make_pdf(tmp_path / "src.pdf", 6, "S")
+    token = CancellationToken()
+
+    def progress(done):
+        if done == 3:
+            token.cancel()
+
+    with pytest.raises(OperationCancelled):
+        split_logic(PdfReader(src), str(tmp_path / "out"), "src", progress, pages_per_file=2, cancel_token=token)
+    assert os.listdir(tmp_path / "out") == []
+
+
+def test_parallel_merge_keeps_order_and_reports_inputs(tmp_path, monkeypatch):
+    import core.parallel
+    # Маленький шаг дерева, чтобы проверить и промежуточный уровень склейки
+    monkeypatch.setattr(core.parallel, "MERGE_FAN_IN", 2)
+    files = [make_pdf(tmp_path / f"in_{i}.pdf", 1 + i % 3, f"F{i}") for i in range(7)]
+    progress = []
+
+    result = merge_logic(files, str(tmp_path / "merged.pdf"), progress.append, workers=2, batch_size=2)
+
+    reader = PdfReader(result["outputs"][0], strict=True)
+    expected = [f"BT (F{i}{j}) Tj ET /X0 Do".encode() for i in range(7) for j in range(1 + i % 3)]
+    assert [p.get_contents().get_data() for p in reader.pages] == expected
+    assert result["pages"] == len(expected)
+    assert [item["file"] for item in result["inputs"]] == files
+    assert [item["pages"] for item in result["inputs"]] == [1 + i % 3 for i in range(7)]
+    assert progress == [2, 4, 6, 7]
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(f) for f in files] + ["merged.pdf"])
+
+
+def test_parallel_merge_creates_missing_directory(tmp_path):
+    files = [make_pdf(tmp_path / f"in_{i}.pdf", 2, f"F{i}") for i in range(3)]
+    out = tmp_path / "new" / "dir" / "m.pdf"
+
+    result = merge_logic(files, str(out), lambda v: None, workers=2, batch_size=1)
+
+    assert result["outputs"] == [str(out)]
+    assert len(PdfReader(str(out)).pages) == 6
+    assert os.listdir(out.parent) == ["m.pdf"]
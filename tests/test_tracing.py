@@ -0,0 +1,49 @@
+import json
+import pytest
+from core import tracing
+from core.jobs import run_job
+
+
+@pytest.fixture
+def trace_to():
+    def enable(path):
+        tracing.configure(str(path))
+        return path
+    yield enable
+    tracing.configure("")
+
+
+def test_tracing_off_returns_noop():
+    assert not tracing.enabled()
+    assert tracing.span("x") is tracing.stage("y")
+
+
+def test_job_trace_jsonl_has_stages_and_counts(tmp_path, trace_to, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 4)
+    trace = trace_to(tmp_path / "trace.jsonl")
+
+    run_job({"op": "edit", "src": src, "out": str(tmp_path / "out.pdf"), "pages": "3-1"})
+
+    events = [json.loads(line) for line in trace.read_text(encoding="utf-8").splitlines()]
+    root = events[-1]
+    assert root["name"] == "job:edit" and root["parent"] is None
+    assert {e["trace"] for e in events} == {root["trace"]}
+    stages = root["stages"]
+    assert stages["page_lookup"]["calls"] == 4 and stages["add_page"]["calls"] == 4
+    assert stages["editor"]["pages"] == 4
+    assert stages["get_reader"]["bytes"] == (tmp_path / "src.pdf").stat().st_size
+    assert stages["save_pdf"]["bytes"] == (tmp_path / "out.pdf").stat().st_size
+    # Шаги на каждую страницу не пишутся отдельными событиями
+    assert "page_lookup" not in {e["name"] for e in events}
+
+
+def test_job_trace_chrome_format(tmp_path, trace_to, make_pdf):
+    src = make_pdf(tmp_path / "src.pdf", 2)
+    trace = trace_to(tmp_path / "trace.json")
+
+    run_job({"op": "reverse", "src": src, "out": str(tmp_path / "out.pdf")})
+
+    events = json.loads(trace.read_text(encoding="utf-8").rstrip().rstrip(",") + "]")
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+    assert events[-1]["name"] == "job:reverse"
+    assert "save_pdf" in events[-1]["args"]["stages"]
@@ -105,4 +105,33 @@ def test_parse_to_blocks_out_of_bounds():
         parse_to_blocks("11", 10)
     
     with pytest.raises(ValueError):
-        parse_to_blocks("1-15", 10)
\ No newline at end of file
+        parse_to_blocks("1-15", 10)
+
+def test_page_range_is_lazy_and_keeps_direction():
+    from utils.parser import PageRange
+    block = parse_to_blocks("5-3", 10)[0]
+    assert isinstance(block, PageRange)
+    assert list(block) == [4, 3, 2] and len(block) == 3
+    assert 3 in block and 5 not in block
+    assert list(reversed(block)) == [2, 3, 4]
+
+
+def test_page_set_operations_match_python_sets():
+    import random
+    from utils.parser import PageSet
+    rnd = random.Random(7)
+    for _ in range(200):
+        a = {rnd.randrange(40) for _ in range(rnd.randrange(20))}
+        b = {rnd.randrange(40) for _ in range(rnd.randrange(20))}
+        pa, pb = PageSet.from_blocks([sorted(a)]), PageSet.from_blocks([sorted(b)])
+        assert list(pa | pb) == sorted(a | b)
+        assert list(pa - pb) == sorted(a - b)
+        assert list(pa.complement(40)) == sorted(set(range(40)) - a)
+        assert all((i in pa) == (i in a) for i in range(-1, 41))
+
+
+def test_parse_to_blocks_exclude_large_document():
+    max_p = 100_000
+    result = parse_to_blocks("2-99999, 5", max_p, exclude_mode=True)
+    assert result == [[0, 99_999]]
+    assert result[0].spans == ((0, 1), (99_999, 100_000))
@@ -0,0 +1,147 @@
+import json
+import os
+import sys
+import time
+import pytest
+from pypdf import PdfReader
+from core.watcher import Debouncer, FolderWatcher, InotifyBackend, PollingBackend, Rule, WatchState, load_rules
+
+
+def run_until(watcher, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "задания не выполнены вовремя"
+        watcher.poll_once(timeout=0.02)
+
+
+def test_debouncer_waits_until_file_stops_changing(tmp_path):
+    now = [0.0]
+    debouncer = Debouncer(2.0, clock=lambda: now[0])
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(b"%PDF-1.4\n")
+    debouncer.touch(str(path))
+    now[0] = 1.5
+    assert debouncer.ready() == []
+    with open(path, "ab") as f:
+        f.write(b"more")
+    # Изменение сбрасывает отсчет
+    now[0] = 2.5
+    assert debouncer.ready() == []
+    now[0] = 4.0
+    assert debouncer.ready() == []
+    now[0] = 4.6
+    assert debouncer.ready() == [str(path)]
+    assert len(debouncer) == 0
+
+    debouncer.touch(str(path))
+    os.remove(path)
+    now[0] = 10.0
+    assert debouncer.ready() == [] and len(debouncer) == 0
+
+
+def test_rules_validation(tmp_path):
+    with pytest.raises(ValueError, match="совпадает"):
+        Rule.from_dict({"folder": str(tmp_path), "op": "reverse", "out": str(tmp_path)})
+    with pytest.raises(ValueError, match="Неизвестная операция"):
+        Rule.from_dict({"folder": str(tmp_path / "in"), "op": "shred", "out": str(tmp_path / "out")})
+    with pytest.raises(ValueError, match="dest"):
+        Rule.from_dict({"folder": str(tmp_path / "in"), "op": "split", "every": 2})
+    rules_file = tmp_path / "rules.json"
+    rules_file.write_text(json.dumps({"rules": [
+        {"folder": str(tmp_path / "in"), "op": "split", "dest": str(tmp_path / "out"), "every": 2},
+    ]}), encoding="utf-8")
+    (rule,) = load_rules(str(rules_file))
+    assert rule.options == {"dest": str(tmp_path / "out"), "every": 2}
+    assert rule.matches(str(tmp_path / "in" / "Scan.PDF"))
+    assert not rule.matches(str(tmp_path / "in" / ".scan.pdf.part"))
+
+
+def test_watcher_processes_new_files_and_skips_them_after_restart(tmp_path, make_pdf):
+    reverse_in, merge_in, out = tmp_path / "reverse", tmp_path / "merge", tmp_path / "out"
+    rules = [
+        Rule.from_dict({"folder": str(reverse_in), "op": "reverse", "out": str(out)}),
+        Rule.from_dict({"folder": str(merge_in), "op": "merge", "out": str(out), "quiet": 0.1}),
+    ]
+    state = str(tmp_path / "state.json")
+    results = []
+    reverse_in.mkdir()
+    make_pdf(reverse_in / "existing.pdf", 3)
+
+    watcher = FolderWatcher(rules, state_path=state, debounce=0.05,
+                            backend=PollingBackend([r.folder for r in rules], interval=0.01),
+                            on_result=results.append)
+    watcher.start()
+    merge_in.mkdir(exist_ok=True)
+    make_pdf(merge_in / "b.pdf", 1, width=300)
+    make_pdf(merge_in / "a.pdf", 2, width=200)
+    run_until(watcher, lambda: len(results) == 2)
+    watcher.close()
+
+    by_op = {r["op"]: r for r in results}
+    assert all(r["status"] == "ok" for r in results)
+    reversed_pages = PdfReader(by_op["reverse"]["outputs"][0]).pages
+    assert [p.mediabox.width for p in reversed_pages] == [102, 101, 100]
+    assert os.path.basename(by_op["reverse"]["outputs"][0]) == "existing.pdf"
+    merged_pages = PdfReader(by_op["merge"]["outputs"][0]).pages
+    assert [p.mediabox.width for p in merged_pages] == [200, 201, 300]
+
+    # После перезапуска те же файлы (и их копии под другим именем) не обрабатываются
+    (reverse_in / "copy.pdf").write_bytes((reverse_in / "existing.pdf").read_bytes())
+    again = []
+    watcher = FolderWatcher(rules, state_path=state, debounce=0.05,
+                            backend=PollingBackend([r.folder for r in rules], interval=0.01),
+                            on_result=again.append)
+    watcher.start()
+    run_until(watcher, lambda: watcher.counts["skipped"] == 4)
+    watcher.close()
+    assert again == []
+    # Журнал состояния: по строке на обработанный файл, без переписывания истории
+    entries = [json.loads(line) for line in open(state, encoding="utf-8")]
+    assert len(entries) == 3 and {e["rule"] for e in entries} == {r.name for r in rules}
+
+
+def test_watch_state_log_survives_torn_line_and_old_format(tmp_path):
+    state = tmp_path / "state.json"
+    log = WatchState(str(state))
+    log.mark("scans", ["a", "b"], {"files": ["a.pdf"]})
+    log.mark("scans", ["c"], {"files": ["c.pdf"]})
+    # Падение посреди записи строки
+    with open(state, "a", encoding="utf-8") as f:
+        f.write('{"rule": "scans", "sha2')
+    restored = WatchState(str(state))
+    assert all(restored.is_processed("scans", d) for d in "abc")
+    restored.mark("scans", ["d"], {})
+    assert WatchState(str(state)).is_processed("scans", "d")
+    assert len(state.read_text(encoding="utf-8").splitlines()) == 4
+
+    state.write_text(json.dumps({"processed": {"old": {"x": {}}}}), encoding="utf-8")
+    assert WatchState(str(state)).is_processed("old", "x")
+    assert json.loads(state.read_text(encoding="utf-8")) == {"rule": "old", "sha256": "x", "info": {}}
+
+
+def test_failed_job_is_reported_and_not_recorded(tmp_path):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    (folder / "broken.pdf").write_bytes(b"not a pdf")
+    rule = Rule.from_dict({"folder": str(folder), "op": "reverse", "out": str(tmp_path / "out")})
+    results = []
+    watcher = FolderWatcher([rule], state_path=str(tmp_path / "state.json"), debounce=0.0,
+                            backend=PollingBackend([rule.folder], interval=0.01), on_result=results.append)
+    watcher.start()
+    run_until(watcher, lambda: results)
+    watcher.close()
+    assert results[0]["status"] == "error"
+    assert watcher.counts["failed"] == 1
+    assert not os.path.exists(tmp_path / "state.json")
+    assert os.listdir(tmp_path / "out") == []
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify есть только в Linux")
+def test_inotify_backend_reports_new_files(tmp_path):
+    backend = InotifyBackend([str(tmp_path)])
+    try:
+        assert backend.wait(0.01) == []
+        (tmp_path / "scan.pdf").write_bytes(b"%PDF")
+        assert backend.wait(1.0) == [str(tmp_path / "scan.pdf")]
+    finally:
+        backend.close()
@@ -11,6 +11,8 @@ class ExtractorTab(BasePdfTab):
         self.ext_source = tk.StringVar()
         self.ext_dest = tk.StringVar()
         self.block_entries = []
+        self.split_mode = tk.StringVar(value="pages")
+        self.split_value = tk.StringVar(value="10")
         
         # Следим за изменением пути, чтобы обновить имена файлов (DRY)
         self.ext_source.trace_add("write", self._update_block_names)
@@ -61,6 +63,17 @@ class ExtractorTab(BasePdfTab):
                   font=FONT_SMALL_BOLD, command=self.add_block_field).pack(side="left")
         tk.Button(btn_f, text=get_msg("btn_clear_all"), command=self.clear_blocks).pack(side="left", padx=10)
         
+        # Деление всего файла на части без списка блоков
+        split = tk.LabelFrame(self, text=f" {get_msg('label_split')} ", padx=FRAME_PADDING, pady=FRAME_PADDING)
+        split.pack(fill="x", padx=15, pady=(0, 5))
+        tk.Radiobutton(split, text=get_msg("label_split_pages"), variable=self.split_mode,
+                       value="pages").pack(side="left")
+        tk.Radiobutton(split, text=get_msg("label_split_mb"), variable=self.split_mode,
+                       value="mb").pack(side="left")
+        tk.Entry(split, textvariable=self.split_value, width=8).pack(side="left", padx=5)
+        tk.Button(split, text=get_msg("btn_split_run"), font=FONT_SMALL_BOLD,
+                  command=self._run_split).pack(side="right")
+
         tk.Button(self, text=get_msg("btn_extract_run"), bg=COLOR_EXTRACT, 
                   fg="white", font=FONT_BOLD, command=self._run_extractor).pack(pady=10)
         
@@ -150,4 +163,25 @@ class ExtractorTab(BasePdfTab):
         if not configs:
             return self.processor.app.safe_message("warning", "Внимание", ERR_PAGES_REQUIRED)
             
-        self.processor.process_extraction(source, dest, configs)
\ No newline at end of file
+        self.processor.process_extraction(source, dest, configs)
+
+    def _run_split(self):
+        """Делит исходный файл на части по числу страниц или по размеру."""
+        from utils.constants import ERR_PATHS_REQUIRED
+
+        source = self.ext_source.get()
+        dest = self.ext_dest.get()
+        if not source or not dest:
+            return self.processor.app.safe_message("warning", "Внимание", ERR_PATHS_REQUIRED)
+
+        try:
+            value = float(self.split_value.get().replace(",", "."))
+        except ValueError:
+            value = 0
+        if value <= 0:
+            return self.processor.app.safe_message("warning", "Внимание", get_msg("err_split_mode"))
+
+        if self.split_mode.get() == "pages":
+            self.processor.process_split(source, dest, pages_per_file=max(1, int(value)))
+        else:
+            self.processor.process_split(source, dest, max_mb=value)
@@ -1,41 +1,118 @@
+import importlib
 import os
+import threading
 import tkinter as tk
 from tkinter import messagebox, ttk
 from ui.styles import *
-from ui.extractor_tab import ExtractorTab
-from ui.merge_tab import MergeTab
-from ui.editor_tab import EditorTab
-from ui.transform_tab import TransformTab
-from core.processor import PdfProcessor
+from core.progress import format_snapshot
 from utils.messages import get_msg
-from utils.constants import APP_TITLE, APP_GEOMETRY, DEFAULT_SAVE_DIR
+from utils.constants import APP_TITLE, APP_GEOMETRY, DEFAULT_SAVE_DIR, LAZY_STARTUP
+
+# Вкладки в порядке отображения: ключ, модуль, класс.
+# Модули импортируются при первом выборе вкладки (в ленивом режиме)
+TAB_SPECS = (
+    ("extractor", "ui.extractor_tab", "ExtractorTab"),
+    ("merge", "ui.merge_tab", "MergeTab"),
+    ("editor", "ui.editor_tab", "EditorTab"),
+    ("transform", "ui.transform_tab", "TransformTab"),
+)
+
+
+class LazyProcessor:
+    """
+    Заместитель PdfProcessor: core.processor, а вместе с ним и pypdf, импортируются
+    при первом обращении к обработчику, а не при запуске окна.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._target = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._target is not None
+
+    def _load(self):
+        with self._lock:
+            if self._target is None:
+                from core.processor import PdfProcessor
+                self._target = PdfProcessor(self.app)
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def cancel_all(self):
+        # Пока обработчик не создан, отменять нечего
+        if self._target is not None:
+            self._target.cancel_all()
+
+    def shutdown(self, wait=True):
+        if self._target is not None:
+            self._target.shutdown(wait=wait)
+
 
 class PdfProApp:
-    def __init__(self, root):
+    def __init__(self, root, lazy=None):
         self.root = root
         self.root.title(APP_TITLE) 
         self.root.geometry(APP_GEOMETRY) 
         self.shared_output_dir = DEFAULT_SAVE_DIR
         os.makedirs(DEFAULT_SAVE_DIR, exist_ok=True)
-        self.processor = PdfProcessor(self)
+        self.lazy = LAZY_STARTUP if lazy is None else lazy
+        if self.lazy:
+            self.processor = LazyProcessor(self)
+        else:
+            from core.processor import PdfProcessor
+            self.processor = PdfProcessor(self)
 
-        # Виджеты прогресса
-        self.progress = ttk.Progressbar(self.root, orient="horizontal", mode="determinate")
-        self.progress.pack(fill="x", padx=20, pady=10, side=tk.BOTTOM)
+        # Виджеты прогресса и отмены текущих заданий
+        bottom = tk.Frame(self.root)
+        bottom.pack(fill="x", padx=20, pady=10, side=tk.BOTTOM)
+        tk.Button(bottom, text=get_msg("btn_cancel"), fg=COLOR_CLEAR,
+                  command=lambda: self.processor.cancel_all()).pack(side=tk.RIGHT, padx=(10, 0))
+        self.progress = ttk.Progressbar(bottom, orient="horizontal", mode="determinate")
+        self.progress.pack(fill="x", expand=True, side=tk.LEFT)
+        self.status_var = tk.StringVar()
+        tk.Label(self.root, textvariable=self.status_var, anchor="w").pack(fill="x", padx=20, side=tk.BOTTOM)
 
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(expand=True, fill="both")
 
-        # SRP: Каждая вкладка — отдельный класс
-        self.tabs = {
-            "extractor": ExtractorTab(self.notebook, self.processor),
-            "merge": MergeTab(self.notebook, self.processor),
-            "editor": EditorTab(self.notebook, self.processor),
-            "transform": TransformTab(self.notebook, self.processor)
-        }
-        
-        for key, tab_obj in self.tabs.items():
-            self.notebook.add(tab_obj, text=get_msg(f"tab_{key}")) 
+        # SRP: Каждая вкладка — отдельный класс. В ленивом режиме в блокноте сначала
+        # пустые рамки, а виджеты вкладки строятся при ее первом выборе
+        self.tabs = {}
+        self._tab_frames = {}
+        for key, _, _ in TAB_SPECS:
+            frame = ttk.Frame(self.notebook)
+            self._tab_frames[key] = frame
+            self.notebook.add(frame, text=get_msg(f"tab_{key}"))
+
+        if self.lazy:
+            self.notebook.bind("<<NotebookTabChanged>>", lambda e: self._build_selected_tab())
+            # Первая вкладка строится после того, как окно показано
+            self.root.after_idle(self._build_selected_tab)
+        else:
+            for key, _, _ in TAB_SPECS:
+                self.get_tab(key)
+
+    def get_tab(self, key):
+        """Вкладка по ключу; строится при первом обращении."""
+        tab = self.tabs.get(key)
+        if tab is None:
+            _, module_name, class_name = next(spec for spec in TAB_SPECS if spec[0] == key)
+            tab_cls = getattr(importlib.import_module(module_name), class_name)
+            tab = tab_cls(self._tab_frames[key], self.processor)
+            tab.pack(expand=True, fill="both")
+            self.tabs[key] = tab
+        return tab
+
+    def _build_selected_tab(self):
+        selected = self.notebook.select()
+        for key, frame in self._tab_frames.items():
+            if str(frame) == selected:
+                self.get_tab(key)
+                break
 
     def safe_message(self, type_, title, message):
         """Потокобезопасный вызов сообщений."""
@@ -47,4 +124,13 @@ class PdfProApp:
         def _update():
             if maximum is not None: self.progress["maximum"] = maximum
             self.progress["value"] = value
+            if not value: self.status_var.set("")
+        self.root.after(0, _update)
+
+    def update_progress_snapshot(self, snapshot):
+        """Применяет срез ProgressReporter (значение, скорость, ETA) одним вызовом в потоке UI."""
+        def _update():
+            if snapshot.total: self.progress["maximum"] = snapshot.total
+            self.progress["value"] = snapshot.done
+            self.status_var.set(format_snapshot(snapshot))
         self.root.after(0, _update)
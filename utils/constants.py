@@ -7,6 +7,81 @@ APP_GEOMETRY = "700x650"
 # Формируем путь и нормализуем его для корректного отображения слэшей
 DEFAULT_SAVE_DIR = os.path.normpath(os.path.join(os.path.expanduser("~"), "Documents")) + os.sep
 
+# Число процессов для извлечения блоков (1 — последовательный режим, >1 — параллельный)
+EXTRACT_WORKERS = 1
+
+# Потоковая склейка с ограниченной памятью (без переноса закладок исходных файлов)
+MERGE_STREAMING = False
+
+# Схлопывать одинаковые объекты (шрифты, изображения) разных файлов при обычной склейке
+MERGE_DEDUP = True
+
+# Число процессов для склейки (1 — последовательно; >1 — файлы разбираются пакетами
+# в пуле процессов, закладки при этом не переносятся)
+MERGE_WORKERS = 1
+
+# Кэш разобранных PDF: бюджет (по размеру исходных файлов) и максимум записей
+READER_CACHE_BUDGET_MB = 1024
+READER_CACHE_MAX_ENTRIES = 8
+
+# Запись результатов: размер буфера временного файла и fsync перед переименованием
+SAVE_BUFFER_KB = 1024
+SAVE_FSYNC = False
+
+# Файл трассировки этапов заданий (None — выключено; переменная окружения PDF_MASTER_TRACE
+# имеет приоритет). Расширение .json — формат Chrome Trace, иначе JSON Lines
+TRACE_PATH = None
+
+# Быстрый запуск: вкладки строятся при первом выборе, pypdf загружается при первой операции
+LAZY_STARTUP = True
+
+# Поворот и перестановка страниц дописываются к копии исходного файла (инкрементальное
+# обновление) вместо полной пересборки
+INCREMENTAL_SAVE = True
+
+# Отражение страниц без распаковки потоков содержимого: матрица кладется в отдельный
+# маленький поток перед исходными
+MIRROR_FAST_PATH = True
+
+# Извлечение и перестановка страниц копируют объекты байтами исходного файла,
+# без разбора и пережатия потоков
+RAW_COPY = True
+
+# Кэш результатов: повторное извлечение, перестановка или поворот того же файла с теми же
+# параметрами отдается жесткой ссылкой (или копией) из кэша вместо пересборки
+RESULT_CACHE = False
+RESULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf_master_pro", "results")
+RESULT_CACHE_MAX_MB = 2048
+
+# Склейка и извлечение без повторяющихся страниц (по отпечаткам содержимого страниц);
+# индексы отпечатков файлов сохраняются в PAGE_INDEX_DIR
+DROP_DUPLICATE_PAGES = False
+PAGE_INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pdf_master_pro", "page_index")
+
+# Сколько заданий из UI выполняется одновременно (остальные ждут в очереди)
+MAX_CONCURRENT_JOBS = 1
+
+# HTTP-сервис заданий (python -m core.cli serve): адрес, пул и очередь
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_WORKERS = 2
+SERVER_MAX_QUEUE = 64
+# Предельный размер загружаемого PDF (МБ) и сколько завершенных заданий помнит сервис
+SERVER_MAX_UPLOAD_MB = 512
+SERVER_KEEP_FINISHED = 1000
+# Предельный размер тела POST /jobs (КБ) и сколько хранится загрузка, на которую
+# не ссылается ни одно задание (секунд)
+SERVER_MAX_JOB_KB = 1024
+SERVER_UPLOAD_TTL = 3600
+
+# Горячие папки (python -m core.cli watch): сколько секунд файл не должен меняться,
+# чтобы считаться дописанным, и период опроса, если inotify недоступен
+WATCH_DEBOUNCE_SECONDS = 2.0
+WATCH_POLL_INTERVAL = 1.0
+
+# Максимальная частота обновления прогресс-бара (раз в секунду)
+PROGRESS_MAX_RATE_HZ = 20
+
 # Цвета кнопок
 COLOR_EXTRACT = "#FF9800"
 COLOR_MERGE = "#2196F3"
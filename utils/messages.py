@@ -12,6 +12,10 @@ MESSAGES = {
         "label_save_dir": "Папка сохранения:",
         "label_block_composition": "Состав блоков (каждый блок - отдельный файл):",
         "label_file_prefix": "Файл",
+        "label_split": "Разделить весь файл на части",
+        "label_split_pages": "по страниц:",
+        "label_split_mb": "до МБ:",
+        "btn_split_run": "РАЗДЕЛИТЬ",
         
         # Вкладки
         "tab_extractor": "Извлечь страницы",
@@ -35,6 +39,7 @@ MESSAGES = {
         "msg_merge_success": "Файлы успешно склеены.",
         "msg_editor_success": "Новый файл успешно создан.",
         "msg_extract_success": "Создано файлов: {}",
+        "msg_split_success": "Файл успешно разделен на части.",
         
         # Ошибки и предупреждения
         "msg_warning_title": "Внимание",
@@ -46,7 +51,10 @@ MESSAGES = {
         "err_file_not_found": "Файл не найден",
         "err_encrypted": "Файл зашифрован или защищен паролем.",
         "err_no_pages_extracted": "Ни одна страница не была извлечена. Проверьте правильность номеров страниц.",
-        "err_page_numbers": "Ошибка в номерах страниц"
+        "err_page_numbers": "Ошибка в номерах страниц",
+        "err_split_mode": "Укажите число страниц или размер части",
+        "msg_cancelled": "Операция отменена.",
+        "btn_cancel": "Отменить"
     },
     "en": {
         # General UI
@@ -61,6 +69,10 @@ MESSAGES = {
         "label_save_dir": "Save Directory:",
         "label_block_composition": "Block Composition (each block is a separate file):",
         "label_file_prefix": "File",
+        "label_split": "Split the whole file into parts",
+        "label_split_pages": "pages each:",
+        "label_split_mb": "up to MB:",
+        "btn_split_run": "SPLIT",
         
         # Tabs
         "tab_extractor": "Block Extractor",
@@ -84,6 +96,7 @@ MESSAGES = {
         "msg_merge_success": "Files merged successfully.",
         "msg_editor_success": "New file created successfully.",
         "msg_extract_success": "Files created: {}",
+        "msg_split_success": "File split into parts successfully.",
         
         # Errors & Warnings
         "msg_warning_title": "Warning",
@@ -95,7 +108,10 @@ MESSAGES = {
         "err_file_not_found": "File not found",
         "err_encrypted": "File is encrypted or password protected.",
         "err_no_pages_extracted": "No pages were extracted. Check page numbers.",
-        "err_page_numbers": "Error in page numbers"
+        "err_page_numbers": "Error in page numbers",
+        "err_split_mode": "Enter a page count or a part size",
+        "msg_cancelled": "Operation cancelled.",
+        "btn_cancel": "Cancel"
     }
 }
 
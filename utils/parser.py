@@ -1,11 +1,177 @@
+from bisect import bisect_right
+from itertools import chain
 from pathlib import Path
 
 def clean_path(path):
     """Очистка пути от артефактов Drag-and-Drop"""
     return str(Path(path.strip('{}').strip('"')))
 
+
+class PageRange:
+    """
+    Ленивый непрерывный диапазон индексов страниц в порядке ввода (в т.ч. обратном: '5-3').
+    Не хранит список страниц; сравнивается со списками поэлементно.
+    """
+    __slots__ = ("start", "end")
+
+    def __init__(self, start, end):
+        # Оба конца включительно, 0-indexed
+        self.start = start
+        self.end = end
+
+    @property
+    def _range(self):
+        step = 1 if self.start <= self.end else -1
+        return range(self.start, self.end + step, step)
+
+    @property
+    def low(self):
+        return min(self.start, self.end)
+
+    @property
+    def high(self):
+        return max(self.start, self.end)
+
+    def __iter__(self):
+        return iter(self._range)
+
+    def __reversed__(self):
+        return reversed(self._range)
+
+    def __len__(self):
+        return self.high - self.low + 1
+
+    def __contains__(self, idx):
+        return self.low <= idx <= self.high
+
+    def __getitem__(self, i):
+        return self._range[i]
+
+    def __eq__(self, other):
+        if isinstance(other, PageRange):
+            return (self.start, self.end) == (other.start, other.end)
+        try:
+            return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash((self.start, self.end))
+
+    def __repr__(self):
+        return f"PageRange({self.start}, {self.end})"
+
+
+class PageSet:
+    """
+    Множество индексов страниц в виде отсортированных непересекающихся интервалов [a, b).
+    Объединение, разность и дополнение работают с интервалами, а не со списками страниц:
+    исключение '2-99999' из документа на 100 000 страниц — это пара интервалов.
+    Итерация — по возрастанию, без построения списка.
+    """
+    __slots__ = ("_spans", "_starts")
+
+    def __init__(self, spans=()):
+        merged = []
+        for a, b in sorted(spans):
+            if a >= b:
+                continue
+            if merged and a <= merged[-1][1]:
+                if b > merged[-1][1]:
+                    merged[-1] = (merged[-1][0], b)
+            else:
+                merged.append((a, b))
+        self._spans = tuple(merged)
+        self._starts = [a for a, _ in merged]
+
+    @classmethod
+    def full(cls, max_pages):
+        return cls([(0, max_pages)])
+
+    @classmethod
+    def from_blocks(cls, blocks):
+        """Множество страниц, входящих хотя бы в один блок (PageRange или список индексов)."""
+        spans = []
+        for block in blocks:
+            if isinstance(block, PageRange):
+                spans.append((block.low, block.high + 1))
+            elif isinstance(block, PageSet):
+                spans.extend(block._spans)
+            else:
+                spans.extend((i, i + 1) for i in block)
+        return cls(spans)
+
+    @property
+    def spans(self):
+        return self._spans
+
+    def union(self, other):
+        return PageSet(self._spans + other._spans)
+
+    def difference(self, other):
+        result = []
+        spans = other._spans
+        j = 0
+        for a, b in self._spans:
+            # Пропускаем вычитаемые интервалы, целиком лежащие левее текущего
+            while j < len(spans) and spans[j][1] <= a:
+                j += 1
+            k = j
+            while a < b:
+                if k >= len(spans) or spans[k][0] >= b:
+                    result.append((a, b))
+                    break
+                if spans[k][0] > a:
+                    result.append((a, spans[k][0]))
+                a = max(a, spans[k][1])
+                k += 1
+        return PageSet(result)
+
+    def complement(self, max_pages):
+        """Страницы документа из max_pages страниц, не входящие в множество."""
+        return PageSet.full(max_pages).difference(self)
+
+    __or__ = union
+    __sub__ = difference
+
+    def __iter__(self):
+        return chain.from_iterable(range(a, b) for a, b in self._spans)
+
+    def __len__(self):
+        return sum(b - a for a, b in self._spans)
+
+    def __bool__(self):
+        return bool(self._spans)
+
+    def __contains__(self, idx):
+        pos = bisect_right(self._starts, idx) - 1
+        return pos >= 0 and idx < self._spans[pos][1]
+
+    def __eq__(self, other):
+        if isinstance(other, PageSet):
+            return self._spans == other._spans
+        try:
+            return len(other) == len(self) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash(self._spans)
+
+    def __repr__(self):
+        return f"PageSet({list(self._spans)})"
+
+
+def flatten_blocks(blocks):
+    """Ленивый поток индексов всех блоков по порядку."""
+    return chain.from_iterable(blocks)
+
+
 def parse_to_blocks(query, max_pages, exclude_mode=False):
-    """Разбор строки с диапазонами страниц (например '1, 3-5', "5-3") в индексы"""
+    """
+    Разбор строки с диапазонами страниц (например '1, 3-5', "5-3") в блоки индексов.
+    Блоки — ленивые PageRange; в exclude_mode — один PageSet с оставшимися страницами.
+    """
     blocks = []
     if not query.strip(): 
         raise ValueError("Строка с номерами страниц пуста")
@@ -23,34 +189,23 @@ def parse_to_blocks(query, max_pages, exclude_mode=False):
             start, end = int(nums_raw[0]), int(nums_raw[1])
             if not (1 <= start <= max_pages and 1 <= end <= max_pages):
                 raise ValueError(f"Out of range: {start}-{end}")                
-            # Если start > end, идем в обратном порядке (step = -1)
-            # Для включения страницы 'end' в range, stop должен быть end - 2 при шаге -1
-            s_idx, e_idx = start - 1, end - 1
-            if s_idx <= e_idx:
-                blocks.append(list(range(s_idx, e_idx + 1, 1)))
-            else:
-                blocks.append(list(range(s_idx, e_idx - 1, -1)))
-            # step = 1 if start <= end else -1
-            # stop = end if start <= end else end - 2
-            # blocks.append(list(range(start - 1, stop, step)))
+            # Если start > end, диапазон идет в обратном порядке ('5-3' -> 4, 3, 2)
+            blocks.append(PageRange(start - 1, end - 1))
         else:
             if part.isdigit():
                 idx = int(part) - 1
                 if 0 <= idx < max_pages: 
-                    blocks.append([idx])
+                    blocks.append(PageRange(idx, idx))
                 else:
                     raise ValueError("Page out of range")
             else:
                 raise ValueError("Not a digit")
-    final_indices = [p for sublist in blocks for p in sublist]
-    
     if exclude_mode:
-        all_indices = list(range(max_pages))
-        result_indices = [i for i in all_indices if i not in final_indices]
-        if not result_indices:
+        result = PageSet.from_blocks(blocks).complement(max_pages)
+        if not result:
             raise ValueError("Нельзя исключить все страницы документа.")
-        return [result_indices]
+        return [result]
 
-    if not final_indices:
+    if not blocks:
         raise ValueError("Не указаны корректные номера страниц.")
     return blocks